@@ -1,8 +1,10 @@
 """Flask application factory"""
+import hmac
 import os
-from flask import Flask, send_from_directory
+from flask import Flask, abort, request
 from app.config import config
 from app.extensions import db, migrate, jwt, cors, socketio
+from app.utils.socketio_queue import socketio_options
 
 
 def create_app(config_name=None):
@@ -12,26 +14,62 @@ def create_app(config_name=None):
 
     app = Flask(__name__)
     app.config.from_object(config[config_name])
+    app.config['CONFIG_NAME'] = config_name  # lets child processes build the same app
+
+    # Take the client address from X-Forwarded-For set by the reverse proxy
+    if app.config['TRUSTED_PROXY_COUNT']:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXY_COUNT'])
+    else:
+        _warn_on_forwarded_requests(app)
 
     # Initialize extensions
     db.init_app(app)
     migrate.init_app(app, db)
     jwt.init_app(app)
     cors.init_app(app, origins=app.config['CORS_ORIGINS'])
-    socketio.init_app(app)
+    socketio.init_app(app, **socketio_options(app.config))
 
-    # Create upload folder if it doesn't exist
-    upload_folder = os.path.join(app.root_path, '..', app.config['UPLOAD_FOLDER'])
-    os.makedirs(upload_folder, exist_ok=True)
+    # Initialize cache
+    from app.services.cache import cache
+    cache.init_app(app)
+
+    # Initialize write-behind buffers
+    from app.services.play_counter import play_counter
+    from app.services.log_sink import behavior_log_sink
+    play_counter.init_app(app)
+    behavior_log_sink.init_app(app)
+
+    # Initialize password hashing pool and login rate limiter
+    from app.services.password_hasher import password_hasher
+    from app.services.rate_limiter import login_limiter
+    password_hasher.init_app(app)
+    login_limiter.init_app(app)
+
+    # Initialize avatar processing pool
+    from app.services.avatar_service import avatar_processor
+    avatar_processor.init_app(app)
+
+    # Initialize periodic jobs
+    from app.services.trending_service import trending_job
+    from app.services.counter_service import counter_reconciler
+    from app.services.suggestion_service import suggestion_job
+    from app.services.recommendation_service import recommendation_job
+    from app.services.avatar_service import avatar_gc
+    trending_job.init_app(app)
+    counter_reconciler.init_app(app)
+    suggestion_job.init_app(app)
+    recommendation_job.init_app(app)
+    avatar_gc.init_app(app)
 
-    # Serve uploaded files
-    @app.route('/uploads/<path:filename>')
-    def uploaded_file(filename):
-        upload_folder = os.path.join(app.root_path, '..', app.config['UPLOAD_FOLDER'])
-        return send_from_directory(upload_folder, filename)
+    # Create upload folder if it doesn't exist (resolved once, used for serving and storing uploads)
+    upload_folder = os.path.abspath(os.path.join(app.root_path, '..', app.config['UPLOAD_FOLDER']))
+    os.makedirs(upload_folder, exist_ok=True)
+    app.config['UPLOAD_PATH'] = upload_folder
 
     # Register blueprints
-    from app.api import auth, user, music, social, interaction, feed, message, wechat_auth
+    from app.api import auth, user, music, social, interaction, feed, message, recommendation, wechat_auth, uploads
+    app.register_blueprint(uploads.bp, url_prefix='/uploads')
     app.register_blueprint(auth.bp, url_prefix='/api/auth')
     app.register_blueprint(user.bp, url_prefix='/api/users')
     app.register_blueprint(music.bp, url_prefix='/api')
@@ -39,14 +77,48 @@ def create_app(config_name=None):
     app.register_blueprint(interaction.bp, url_prefix='/api')
     app.register_blueprint(feed.bp, url_prefix='/api/feed')
     app.register_blueprint(message.bp, url_prefix='/api')
+    app.register_blueprint(recommendation.bp, url_prefix='/api')
     app.register_blueprint(wechat_auth.bp, url_prefix='/api/auth')
 
     # Register socket events
     from app import socket_events
 
-    # Health check endpoint
+    # Health check endpoint (liveness only)
     @app.route('/health')
     def health_check():
         return {'status': 'healthy'}, 200
 
+    # Worker internals, only for callers presenting INTERNAL_STATS_TOKEN
+    @app.route('/internal/stats')
+    def internal_stats():
+        token = app.config['INTERNAL_STATS_TOKEN']
+        if not token or not hmac.compare_digest(request.headers.get('X-Internal-Token', ''), token):
+            abort(404)
+        return {
+            'behavior_log_sink': behavior_log_sink.stats(),
+            'password_hasher': password_hasher.stats(),
+            'login_limiter': login_limiter.stats()
+        }, 200
+
     return app
+
+
+def _warn_on_forwarded_requests(app):
+    """
+    Warn once when requests arrive through a proxy that is not trusted
+
+    Without ``TRUSTED_PROXY_COUNT`` every request seems to come from the
+    proxy, so all clients share one login rate limit bucket.
+    """
+    warned = []
+
+    @app.before_request
+    def warn_untrusted_proxy():
+        if not warned and 'X-Forwarded-For' in request.headers:
+            warned.append(True)
+            app.logger.warning(
+                'Request from %s carries X-Forwarded-For but TRUSTED_PROXY_COUNT is 0: '
+                'all clients behind the proxy share one login rate limit bucket. '
+                'Set TRUSTED_PROXY_COUNT to the number of reverse proxies.',
+                request.remote_addr
+            )
@@ -1,4 +1,5 @@
 """Authentication API routes"""
+import math
 from flask import Blueprint, request, jsonify
 from marshmallow import ValidationError
 from sqlalchemy.exc import IntegrityError
@@ -10,6 +11,8 @@ from app.models.user import User
 from app.schemas.auth import RegisterSchema, LoginSchema
 from app.utils.jwt_helper import generate_tokens
 from app.services.log_service import LogService
+from app.services.password_hasher import PasswordHasherBusy
+from app.services.rate_limiter import login_limiter
 
 bp = Blueprint('auth', __name__)
 
@@ -56,6 +59,9 @@ def register():
 
     except ValidationError as e:
         return jsonify({'error': 'Validation error', 'details': e.messages}), 400
+    except PasswordHasherBusy:
+        db.session.rollback()
+        return jsonify({'error': 'Server is busy, please try again later'}), 503, {'Retry-After': '1'}
     except IntegrityError:
         db.session.rollback()
         return jsonify({'error': 'User already exists'}), 400
@@ -72,19 +78,34 @@ def login():
         schema = LoginSchema()
         data = schema.load(request.json)
 
-        # Find user by email or username (case-insensitive for username)
         identifier = data['identifier']
+
+        # Rate limit per IP and per account before touching the database or bcrypt
+        allowed, retry_after = login_limiter.check(request.remote_addr, identifier)
+        if not allowed:
+            headers = {'Retry-After': str(max(1, math.ceil(retry_after)))}
+            return jsonify({'error': '登录尝试过于频繁，请稍后再试'}), 429, headers
+
+        # Find user by email or username (case-insensitive for username)
         user = User.query.filter(
             (User.email == identifier) | (func.lower(User.username) == func.lower(identifier))
         ).first()
 
         # Check if user exists
         if not user:
+            login_limiter.failed(identifier)
             return jsonify({'error': '用户不存在，请先注册'}), 404
 
         # Check password
         if not user.check_password(data['password']):
+            login_limiter.failed(identifier, user)
             return jsonify({'error': '密码错误'}), 401
+        login_limiter.succeeded(identifier, user)
+
+        # Upgrade the stored hash after BCRYPT_ROUNDS was changed
+        if user.password_needs_rehash():
+            user.set_password(data['password'])
+            db.session.commit()
 
         # Generate tokens
         tokens = generate_tokens(user.id)
@@ -100,7 +121,11 @@ def login():
 
     except ValidationError as e:
         return jsonify({'error': 'Validation error', 'details': e.messages}), 400
+    except PasswordHasherBusy:
+        db.session.rollback()
+        return jsonify({'error': '服务器繁忙，请稍后重试'}), 503, {'Retry-After': '1'}
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 
@@ -1,12 +1,11 @@
 """Feed API routes"""
-from flask import Blueprint, jsonify, request
-from sqlalchemy import desc
-from app.extensions import db
-from app.models.user import User
-from app.models.music import Song
-from app.models.social import Follow
-from app.models.log import UserBehaviorLog
+from flask import Blueprint, jsonify
+from sqlalchemy.orm import joinedload
+from app.models.feed import FeedItem
+from app.models.music import Song, Album
+from app.services.feed_service import FeedService
 from app.utils.decorators import login_required
+from app.utils.pagination import paginate, InvalidCursor
 
 bp = Blueprint('feed', __name__)
 
@@ -16,59 +15,29 @@ bp = Blueprint('feed', __name__)
 def get_friends_activity(current_user_id):
     """Get friends' activity feed (likes and plays)"""
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
-
-        # Get list of users that current user is following
-        following = Follow.query.filter_by(follower_id=current_user_id).all()
-        following_ids = [f.following_id for f in following]
-
-        if not following_ids:
-            return jsonify({
-                'activities': [],
-                'total': 0,
-                'page': page,
-                'per_page': per_page
-            }), 200
-
-        # Get friends' activities (like and play actions)
-        activities_query = UserBehaviorLog.query.filter(
-            UserBehaviorLog.user_id.in_(following_ids),
-            UserBehaviorLog.action_type.in_(['like', 'play']),
-            UserBehaviorLog.song_id.isnot(None)
-        ).order_by(desc(UserBehaviorLog.created_at))
-
-        # Paginate
-        offset = (page - 1) * per_page
-        total = activities_query.count()
-        activities = activities_query.limit(per_page).offset(offset).all()
+        # Read the materialized timeline (fanned out on write, capped per user)
+        timeline_query = FeedItem.query.filter_by(owner_id=current_user_id).options(
+            joinedload(FeedItem.actor),
+            joinedload(FeedItem.song).joinedload(Song.artist),
+            joinedload(FeedItem.song).joinedload(Song.album).joinedload(Album.artist)
+        )
+        cap = FeedService.cap_filter(current_user_id)
+        if cap is not None:
+            timeline_query = timeline_query.filter(cap)
+        page = paginate(timeline_query, (FeedItem.created_at, FeedItem.id))
 
         # Format activities
-        activities_list = []
-        for activity in activities:
-            user = db.session.get(User, activity.user_id)
-            song = db.session.get(Song, activity.song_id)
-
-            if user and song:
-                activities_list.append({
-                    'id': activity.id,
-                    'action_type': activity.action_type,
-                    'created_at': activity.created_at.isoformat(),
-                    'user': {
-                        'id': user.id,
-                        'username': user.username,
-                        'nickname': user.nickname,
-                        'avatar_url': user.avatar_url
-                    },
-                    'song': song.to_dict()
-                })
+        activities_list = [activity.to_dict() for activity in page.items]
 
         return jsonify({
             'activities': activities_list,
-            'total': total,
-            'page': page,
-            'per_page': per_page
+            'total': page.total,
+            'page': page.page,
+            'per_page': page.per_page,
+            'next_cursor': page.next_cursor
         }), 200
 
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
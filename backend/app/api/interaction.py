@@ -2,14 +2,27 @@
 from flask import Blueprint, request, jsonify
 from app.extensions import db
 from app.models.music import Song
-from app.models.social import Like, Comment, CommentLike
+from app.models.social import Like, Comment
 from app.utils.decorators import login_required
+from app.services.comment_service import CommentService, REPLIES_PER_COMMENT, MAX_REPLIES_PER_COMMENT
+from app.services.counter_service import CounterService, counter_reconciler
+from app.services.like_service import LikeService, MAX_LIKE_STATUS_IDS
 from app.services.log_service import LogService
-from sqlalchemy import desc
+from app.services.play_counter import play_counter
+from app.services.response_cache import invalidate, song_tag
+from app.utils.pagination import paginate, InvalidCursor
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
 
 bp = Blueprint('interaction', __name__)
 
 
+def ensure_reconciler():
+    """Start this worker's counter reconciliation thread once counters are written"""
+    if counter_reconciler.enabled:
+        counter_reconciler.ensure_started()
+
+
 @bp.route('/songs/<int:song_id>/play', methods=['POST'])
 @login_required
 def record_play(current_user_id, song_id):
@@ -19,19 +32,27 @@ def record_play(current_user_id, song_id):
         if not song:
             return jsonify({'error': 'Song not found'}), 404
 
-        data = request.json or {}
+        data = request.get_json(silent=True) or {}
         duration = data.get('duration', 0)
+        approximate = str(data.get('approximate', request.args.get('approximate', 'true'))).lower() != 'false'
+        persisted_count = song.play_count or 0
 
-        # Log play action
+        # Buffer the play count increment (flushed in batches by the play counter)
+        play_counter.increment(song_id)
+
+        # Log play action (commits the play log)
         LogService.log_play(current_user_id, song_id, duration)
 
-        # Update song play count
-        song.play_count = (song.play_count or 0) + 1
-        db.session.commit()
+        if approximate and play_counter.enabled:
+            # Persisted count plus this worker's unflushed plays, no extra round trip
+            play_count = persisted_count + play_counter.pending(song_id)
+        else:
+            play_counter.flush([song_id])
+            play_count = db.session.scalar(select(Song.play_count).where(Song.id == song_id))
 
         return jsonify({
             'message': 'Play recorded successfully',
-            'play_count': song.play_count
+            'play_count': play_count
         }), 200
 
     except Exception as e:
@@ -48,30 +69,22 @@ def like_song(current_user_id, song_id):
         if not song:
             return jsonify({'error': 'Song not found'}), 404
 
-        # Check if already liked
-        existing_like = Like.query.filter_by(
-            user_id=current_user_id,
-            song_id=song_id
-        ).first()
-
-        if existing_like:
+        # Insert the like unless it exists and bump the counter atomically
+        liked, like_count = CounterService.like_song(current_user_id, song_id)
+        if not liked:
+            db.session.rollback()
             return jsonify({'error': 'Already liked'}), 400
 
-        # Create like
-        like = Like(user_id=current_user_id, song_id=song_id)
-        db.session.add(like)
-
-        # Update song like count
-        song.like_count = Like.query.filter_by(song_id=song_id).count() + 1
-
         db.session.commit()
+        invalidate(song_tag(song_id))
+        ensure_reconciler()
 
         # Log like action
         LogService.log_like(current_user_id, song_id)
 
         return jsonify({
             'message': 'Song liked successfully',
-            'like_count': song.like_count
+            'like_count': like_count
         }), 200
 
     except Exception as e:
@@ -88,28 +101,22 @@ def unlike_song(current_user_id, song_id):
         if not song:
             return jsonify({'error': 'Song not found'}), 404
 
-        # Find and delete like
-        like = Like.query.filter_by(
-            user_id=current_user_id,
-            song_id=song_id
-        ).first()
-
-        if not like:
+        # Delete the like and decrement the counter atomically
+        removed, like_count = CounterService.unlike_song(current_user_id, song_id)
+        if not removed:
+            db.session.rollback()
             return jsonify({'error': 'Not liked yet'}), 400
 
-        db.session.delete(like)
-
-        # Update song like count
-        song.like_count = max(0, Like.query.filter_by(song_id=song_id).count() - 1)
-
         db.session.commit()
+        invalidate(song_tag(song_id))
+        ensure_reconciler()
 
         # Log unlike action
         LogService.log_unlike(current_user_id, song_id)
 
         return jsonify({
             'message': 'Song unliked successfully',
-            'like_count': song.like_count
+            'like_count': like_count
         }), 200
 
     except Exception as e:
@@ -135,6 +142,29 @@ def get_like_status(current_user_id, song_id):
         return jsonify({'error': str(e)}), 500
 
 
+@bp.route('/songs/like-status', methods=['GET'])
+@login_required
+def get_like_statuses(current_user_id):
+    """Check which of several songs the user has liked (?ids=1,2,3)"""
+    try:
+        try:
+            song_ids = [int(song_id) for song_id in request.args.get('ids', '').split(',') if song_id.strip()]
+        except ValueError:
+            return jsonify({'error': 'ids must be a comma-separated list of song ids'}), 400
+
+        if len(song_ids) > MAX_LIKE_STATUS_IDS:
+            return jsonify({'error': f'At most {MAX_LIKE_STATUS_IDS} ids per request'}), 400
+
+        liked = LikeService.liked_song_ids(current_user_id, song_ids)
+
+        return jsonify({
+            'statuses': {str(song_id): song_id in liked for song_id in song_ids}
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @bp.route('/songs/<int:song_id>/comments', methods=['GET'])
 def get_comments(song_id):
     """Get comments for a song"""
@@ -143,35 +173,67 @@ def get_comments(song_id):
         if not song:
             return jsonify({'error': 'Song not found'}), 404
 
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
-
-        # Get top-level comments (no parent)
-        pagination = Comment.query.filter_by(
-            song_id=song_id,
-            parent_id=None
-        ).order_by(desc(Comment.created_at)).paginate(
-            page=page, per_page=per_page, error_out=False
+        # Get top-level comments (no parent), authors joined in the same query
+        page = paginate(
+            Comment.query.filter_by(song_id=song_id, parent_id=None).options(joinedload(Comment.user)),
+            (Comment.created_at, Comment.id)
         )
 
+        # First replies of every comment on the page in one query
+        limit = min(request.args.get('replies_per_comment', REPLIES_PER_COMMENT, type=int), MAX_REPLIES_PER_COMMENT)
+        replies = CommentService.first_replies([comment.id for comment in page.items], limit)
+
         comments = []
-        for comment in pagination.items:
+        for comment in page.items:
             comment_dict = comment.to_dict()
-            # Get replies
-            replies = Comment.query.filter_by(parent_id=comment.id).order_by(
-                Comment.created_at
-            ).all()
-            comment_dict['replies'] = [reply.to_dict() for reply in replies]
+            thread = replies.get(comment.id)
+            comment_dict['replies'] = [reply.to_dict() for reply in thread.replies] if thread else []
+            comment_dict['reply_count'] = thread.reply_count if thread else 0
+            comment_dict['replies_next_cursor'] = thread.next_cursor if thread else None
             comments.append(comment_dict)
 
         return jsonify({
             'comments': comments,
-            'total': pagination.total,
-            'page': page,
-            'per_page': per_page,
-            'pages': pagination.pages
+            'total': page.total,
+            'page': page.page,
+            'per_page': page.per_page,
+            'pages': page.pages,
+            'next_cursor': page.next_cursor
         }), 200
 
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/comments/<int:comment_id>/replies', methods=['GET'])
+def get_replies(comment_id):
+    """Get replies to a comment, oldest first"""
+    try:
+        comment = db.session.get(Comment, comment_id)
+        if not comment:
+            return jsonify({'error': 'Comment not found'}), 404
+
+        # Paginate (page number or keyset cursor, e.g. replies_next_cursor)
+        page = paginate(
+            Comment.query.filter_by(parent_id=comment_id).options(joinedload(Comment.user)),
+            (Comment.created_at, Comment.id),
+            descending=False
+        )
+
+        return jsonify({
+            'replies': [reply.to_dict() for reply in page.items],
+            'total': page.total,
+            'page': page.page,
+            'per_page': page.per_page,
+            'pages': page.pages,
+            'has_next': page.has_next,
+            'next_cursor': page.next_cursor
+        }), 200
+
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -212,12 +274,11 @@ def add_comment(current_user_id, song_id):
 
         # Update song comment count (only for top-level comments)
         if not parent_id:
-            song.comment_count = Comment.query.filter_by(
-                song_id=song_id,
-                parent_id=None
-            ).count() + 1
+            CounterService.comment_added(song_id)
 
         db.session.commit()
+        if not parent_id:
+            invalidate(song_tag(song_id))
 
         # Log comment action
         LogService.log_comment(current_user_id, song_id, comment.id, parent_id)
@@ -252,14 +313,11 @@ def delete_comment(current_user_id, comment_id):
 
         # Update song comment count (only for top-level comments)
         if is_top_level:
-            song = db.session.get(Song, song_id)
-            if song:
-                song.comment_count = max(0, Comment.query.filter_by(
-                    song_id=song_id,
-                    parent_id=None
-                ).count() - 1)
+            CounterService.comment_removed(song_id)
 
         db.session.commit()
+        if is_top_level:
+            invalidate(song_tag(song_id))
 
         return jsonify({'message': 'Comment deleted successfully'}), 200
 
@@ -278,29 +336,17 @@ def like_comment(current_user_id, comment_id):
         if not comment:
             return jsonify({'error': 'Comment not found'}), 404
 
-        # Check if already liked
-        existing_like = CommentLike.query.filter_by(
-            user_id=current_user_id,
-            comment_id=comment_id
-        ).first()
-
-        if existing_like:
+        # Insert the like unless it exists and bump the counter atomically
+        liked, like_count = CounterService.like_comment(current_user_id, comment_id)
+        if not liked:
+            db.session.rollback()
             return jsonify({'error': 'Comment already liked'}), 400
 
-        # Create like
-        comment_like = CommentLike(
-            user_id=current_user_id,
-            comment_id=comment_id
-        )
-        db.session.add(comment_like)
-
-        # Update comment like count
-        comment.like_count += 1
         db.session.commit()
 
         return jsonify({
             'message': 'Comment liked successfully',
-            'like_count': comment.like_count
+            'like_count': like_count
         }), 200
 
     except Exception as e:
@@ -317,25 +363,17 @@ def unlike_comment(current_user_id, comment_id):
         if not comment:
             return jsonify({'error': 'Comment not found'}), 404
 
-        # Find the like
-        comment_like = CommentLike.query.filter_by(
-            user_id=current_user_id,
-            comment_id=comment_id
-        ).first()
-
-        if not comment_like:
+        # Delete the like and decrement the counter atomically
+        removed, like_count = CounterService.unlike_comment(current_user_id, comment_id)
+        if not removed:
+            db.session.rollback()
             return jsonify({'error': 'Comment not liked yet'}), 400
 
-        # Delete like
-        db.session.delete(comment_like)
-
-        # Update comment like count
-        comment.like_count = max(0, comment.like_count - 1)
         db.session.commit()
 
         return jsonify({
             'message': 'Comment unliked successfully',
-            'like_count': comment.like_count
+            'like_count': like_count
         }), 200
 
     except Exception as e:
@@ -3,11 +3,15 @@ import json
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from sqlalchemy import or_, and_, func
+from sqlalchemy.orm import contains_eager
 from app.extensions import db, socketio
-from app.models.message import Message
-from app.models.social import Follow
+from app.models.message import Message, Conversation
 from app.models.user import User
-from app.models.log import UserBehaviorLog
+from app.services.conversation_service import ConversationService
+from app.services.follow_service import FollowService
+from app.services.log_service import LogService
+from app.services.unread_service import UnreadService
+from app.utils.pagination import paginate, InvalidCursor
 
 bp = Blueprint('message', __name__)
 
@@ -33,14 +37,7 @@ def send_message():
 
     # Check if users are mutually following each other (only if enabled in config)
     if current_app.config.get('REQUIRE_MUTUAL_FOLLOW_FOR_MESSAGE', False):
-        mutual_follow = db.session.query(Follow).filter(
-            or_(
-                and_(Follow.follower_id == current_user_id, Follow.following_id == receiver_id),
-                and_(Follow.follower_id == receiver_id, Follow.following_id == current_user_id)
-            )
-        ).count()
-
-        if mutual_follow < 2:
+        if not FollowService.is_mutual(current_user_id, receiver_id):
             return jsonify({'error': '只能给互相关注的好友发送私信'}), 403
 
     # Create message
@@ -51,6 +48,8 @@ def send_message():
     )
 
     db.session.add(message)
+    db.session.flush()
+    ConversationService.record_message(message)
     db.session.commit()
 
     # Check if this is a song share and log the behavior
@@ -60,19 +59,15 @@ def send_message():
             song_id = content_data['song'].get('id')
             if song_id:
                 # Log share behavior
-                share_log = UserBehaviorLog(
-                    user_id=current_user_id,
-                    action_type='share',
+                LogService.log_behavior(
+                    current_user_id,
+                    'share',
                     song_id=song_id,
-                    extra_data={
+                    metadata={
                         'shared_to_user_id': receiver_id,
                         'share_method': 'private_message'
-                    },
-                    ip_address=request.remote_addr,
-                    user_agent=request.headers.get('User-Agent')
+                    }
                 )
-                db.session.add(share_log)
-                db.session.commit()
     except (json.JSONDecodeError, KeyError):
         # Not a song share message, skip logging
         pass
@@ -80,6 +75,7 @@ def send_message():
     # Emit WebSocket event to receiver
     message_data = message.to_dict()
     socketio.emit('new_message', message_data, room=f'user_{receiver_id}')
+    UnreadService.adjust(receiver_id, 1)
 
     return jsonify(message_data), 201
 
@@ -90,49 +86,37 @@ def get_conversations():
     """Get conversation list with recent contacts"""
     current_user_id = int(get_jwt_identity())
 
-    # Get all messages involving current user
-    messages = db.session.query(Message).filter(
-        or_(Message.sender_id == current_user_id, Message.receiver_id == current_user_id)
-    ).order_by(Message.created_at.desc()).all()
-
-    # Group by conversation partner
-    conversations_dict = {}
-    for msg in messages:
-        # Determine the other user
-        other_user_id = msg.receiver_id if msg.sender_id == current_user_id else msg.sender_id
-
-        # Only keep the most recent message for each conversation
-        if other_user_id not in conversations_dict:
-            conversations_dict[other_user_id] = msg
-
-    # Build conversation list
-    conversations = []
-    for other_user_id, last_message in conversations_dict.items():
-        # Get unread count
-        unread_count = db.session.query(Message).filter(
-            Message.sender_id == other_user_id,
-            Message.receiver_id == current_user_id,
-            Message.is_read == False
-        ).count()
-
-        # Get other user info
-        other_user = db.session.query(User).get(other_user_id)
-
-        if other_user:
-            conversations.append({
-                'user': other_user.to_dict(),
-                'last_message': {
-                    'content': last_message.content,
-                    'created_at': last_message.created_at.isoformat(),
-                    'is_from_me': last_message.sender_id == current_user_id
-                },
-                'unread_count': unread_count
-            })
-
-    # Sort by last message time
-    conversations.sort(key=lambda x: x['last_message']['created_at'], reverse=True)
-
-    return jsonify(conversations), 200
+    # One row per partner with the latest message and unread count
+    conversations_query = db.session.query(Conversation).join(
+        User, Conversation.partner
+    ).outerjoin(
+        Message, Conversation.last_message
+    ).options(
+        contains_eager(Conversation.partner),
+        contains_eager(Conversation.last_message)
+    ).filter(Conversation.user_id == current_user_id)
+
+    # Without pagination arguments, keep returning the plain list
+    if not any(arg in request.args for arg in ('page', 'per_page', 'cursor')):
+        conversations = conversations_query.order_by(
+            Conversation.last_message_at.desc(), Conversation.id.desc()
+        ).all()
+        return jsonify([conversation.to_dict() for conversation in conversations]), 200
+
+    # Paginate (page number or keyset cursor)
+    try:
+        page = paginate(conversations_query, (Conversation.last_message_at, Conversation.id))
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({
+        'conversations': [conversation.to_dict() for conversation in page.items],
+        'total': page.total,
+        'page': page.page,
+        'per_page': page.per_page,
+        'has_next': page.has_next,
+        'next_cursor': page.next_cursor
+    }), 200
 
 
 @bp.route('/messages/conversation/<int:user_id>', methods=['GET'])
@@ -141,27 +125,29 @@ def get_conversation(user_id):
     """Get conversation history with a specific user"""
     current_user_id = int(get_jwt_identity())
 
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
-
     # Get messages between current user and specified user
     messages_query = db.session.query(Message).filter(
         or_(
             and_(Message.sender_id == current_user_id, Message.receiver_id == user_id),
             and_(Message.sender_id == user_id, Message.receiver_id == current_user_id)
         )
-    ).order_by(Message.created_at.desc())
+    )
+
+    # Paginate (page number or keyset cursor)
+    try:
+        page = paginate(messages_query, (Message.created_at, Message.id))
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
 
-    # Paginate
-    pagination = messages_query.paginate(page=page, per_page=per_page, error_out=False)
-    messages = [msg.to_dict() for msg in pagination.items]
+    messages = [msg.to_dict() for msg in page.items]
 
     return jsonify({
         'messages': messages,
-        'total': pagination.total,
-        'page': page,
-        'per_page': per_page,
-        'has_next': pagination.has_next
+        'total': page.total,
+        'page': page.page,
+        'per_page': page.per_page,
+        'has_next': page.has_next,
+        'next_cursor': page.next_cursor
     }), 200
 
 
@@ -178,9 +164,15 @@ def mark_message_as_read(message_id):
     if message.receiver_id != current_user_id:
         return jsonify({'error': '无权操作此消息'}), 403
 
-    message.is_read = True
+    was_unread = not message.is_read
+    if was_unread:
+        message.is_read = True
+        ConversationService.mark_read(current_user_id, message.sender_id, count=1)
     db.session.commit()
 
+    if was_unread:
+        UnreadService.adjust(current_user_id, -1)
+
     return jsonify({'message': '已标记为已读'}), 200
 
 
@@ -190,14 +182,18 @@ def mark_conversation_as_read(user_id):
     """Mark all messages from a user as read"""
     current_user_id = int(get_jwt_identity())
 
-    db.session.query(Message).filter(
+    marked = db.session.query(Message).filter(
         Message.sender_id == user_id,
         Message.receiver_id == current_user_id,
         Message.is_read == False
     ).update({'is_read': True})
+    ConversationService.mark_read(current_user_id, user_id)
 
     db.session.commit()
 
+    if marked:
+        UnreadService.adjust(current_user_id, -marked)
+
     return jsonify({'message': '已标记所有消息为已读'}), 200
 
 
@@ -207,10 +203,7 @@ def get_unread_count():
     """Get unread message count"""
     current_user_id = int(get_jwt_identity())
 
-    count = db.session.query(Message).filter(
-        Message.receiver_id == current_user_id,
-        Message.is_read == False
-    ).count()
+    count = UnreadService.get(current_user_id)
 
     return jsonify({'count': count}), 200
 
@@ -228,7 +221,15 @@ def delete_message(message_id):
     if message.sender_id != current_user_id and message.receiver_id != current_user_id:
         return jsonify({'error': '无权删除此消息'}), 403
 
+    was_unread = not message.is_read
+    receiver_id = message.receiver_id
+
     db.session.delete(message)
+    db.session.flush()
+    ConversationService.refresh(message.sender_id, message.receiver_id)
     db.session.commit()
 
+    if was_unread:
+        UnreadService.adjust(receiver_id, -1)
+
     return jsonify({'message': '消息已删除'}), 200
@@ -1,50 +1,89 @@
 """Music API routes"""
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from app.extensions import db
-from app.models.music import Song, Artist
+from app.models.music import Song, Artist, Album
+from app.schemas.music import song_rows_query, song_row_to_dict
 from app.services.log_service import LogService
-from sqlalchemy import desc, or_
+from app.services.response_cache import response_cache, song_tag, tag_response
+from app.services.search_service import SearchService
+from app.services.trending_service import TrendingService, trending_job, WINDOWS, DEFAULT_WINDOW
+from app.services.suggest_index import suggest_index, KINDS
+from app.utils.decorators import with_like_status
+from app.utils.pagination import paginate, InvalidCursor
+from sqlalchemy import desc
+from sqlalchemy.orm import joinedload
 
 bp = Blueprint('music', __name__)
 
 
+def _tag_songs(rows):
+    """Expire the cached response when the counters of one of its songs change"""
+    tag_response(*[song_tag(row.id) for row in rows])
+
+
 @bp.route('/songs', methods=['GET'])
+@with_like_status
 def get_songs():
     """Get songs list with pagination"""
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
+        # Query songs with pagination (page number or keyset cursor)
+        page = paginate(song_rows_query(), (Song.created_at, Song.id))
 
-        # Query songs with pagination
-        pagination = Song.query.order_by(desc(Song.created_at)).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
-
-        songs = [song.to_dict() for song in pagination.items]
+        songs = [song_row_to_dict(row) for row in page.items]
 
         return jsonify({
             'songs': songs,
-            'total': pagination.total,
-            'page': page,
-            'per_page': per_page,
-            'pages': pagination.pages
+            'total': page.total,
+            'page': page.page,
+            'per_page': page.per_page,
+            'pages': page.pages,
+            'next_cursor': page.next_cursor
         }), 200
 
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
 @bp.route('/songs/trending', methods=['GET'])
+@with_like_status
+@response_cache.cached(tags=('songs', 'trending'))
 def get_trending_songs():
     """Get trending songs"""
     try:
-        limit = request.args.get('limit', 10, type=int)
-
-        # Get songs ordered by play count
-        songs = Song.query.order_by(desc(Song.play_count)).limit(limit).all()
-
+        limit = min(request.args.get('limit', 10, type=int), current_app.config['TRENDING_CHART_SIZE'])
+        window = request.args.get('window', DEFAULT_WINDOW)
+        genre = request.args.get('genre') or None
+
+        if window != 'all' and window not in WINDOWS:
+            return jsonify({'error': f"window must be one of: all, {', '.join(WINDOWS)}"}), 400
+
+        song_ids = []
+        if window != 'all':
+            if trending_job.enabled:
+                trending_job.ensure_started()
+            song_ids = TrendingService.chart(window, genre, limit)
+
+        rows = []
+        if song_ids:
+            rows_by_id = {row.id: row for row in song_rows_query().filter(Song.id.in_(song_ids))}
+            rows = [rows_by_id[song_id] for song_id in song_ids if song_id in rows_by_id]
+
+        if len(rows) < limit:
+            # Fill short (or all-time) charts with the most played songs
+            popular = song_rows_query().order_by(desc(Song.play_count))
+            if genre:
+                popular = popular.filter(Song.genre == genre)
+            if rows:
+                popular = popular.filter(Song.id.notin_([row.id for row in rows]))
+            rows.extend(popular.limit(limit - len(rows)).all())
+
+        _tag_songs(rows)
         return jsonify({
-            'songs': [song.to_dict() for song in songs]
+            'songs': [song_row_to_dict(row) for row in rows],
+            'window': window,
+            'genre': genre
         }), 200
 
     except Exception as e:
@@ -52,16 +91,19 @@ def get_trending_songs():
 
 
 @bp.route('/songs/latest', methods=['GET'])
+@with_like_status
+@response_cache.cached(tags=('songs',))
 def get_latest_songs():
     """Get latest songs"""
     try:
         limit = request.args.get('limit', 10, type=int)
 
         # Get latest songs
-        songs = Song.query.order_by(desc(Song.created_at)).limit(limit).all()
+        rows = song_rows_query().order_by(desc(Song.created_at)).limit(limit).all()
 
+        _tag_songs(rows)
         return jsonify({
-            'songs': [song.to_dict() for song in songs]
+            'songs': [song_row_to_dict(row) for row in rows]
         }), 200
 
     except Exception as e:
@@ -69,10 +111,14 @@ def get_latest_songs():
 
 
 @bp.route('/songs/<int:song_id>', methods=['GET'])
+@with_like_status
 def get_song_detail(song_id):
     """Get song detail"""
     try:
-        song = db.session.get(Song, song_id)
+        song = db.session.get(Song, song_id, options=[
+            joinedload(Song.artist),
+            joinedload(Song.album).joinedload(Album.artist)
+        ])
         if not song:
             return jsonify({'error': 'Song not found'}), 404
 
@@ -93,6 +139,7 @@ def get_song_detail(song_id):
 
 
 @bp.route('/artists', methods=['GET'])
+@response_cache.cached(tags=('artists',))
 def get_artists():
     """Get artists list"""
     try:
@@ -107,6 +154,7 @@ def get_artists():
 
 
 @bp.route('/artists/<int:artist_id>', methods=['GET'])
+@response_cache.cached(tags=('artists',))
 def get_artist_detail(artist_id):
     """Get artist detail"""
     try:
@@ -121,6 +169,8 @@ def get_artist_detail(artist_id):
 
 
 @bp.route('/artists/<int:artist_id>/songs', methods=['GET'])
+@with_like_status
+@response_cache.cached(tags=('artists', 'songs'))
 def get_artist_songs(artist_id):
     """Get artist's songs"""
     try:
@@ -129,13 +179,14 @@ def get_artist_songs(artist_id):
             return jsonify({'error': 'Artist not found'}), 404
 
         # Get artist's top songs by play count
-        songs = Song.query.filter_by(artist_id=artist_id).order_by(
+        rows = song_rows_query().filter(Song.artist_id == artist_id).order_by(
             desc(Song.play_count)
         ).limit(20).all()
 
+        _tag_songs(rows)
         return jsonify({
             'artist': artist.to_dict(),
-            'songs': [song.to_dict() for song in songs]
+            'songs': [song_row_to_dict(row) for row in rows]
         }), 200
 
     except Exception as e:
@@ -143,13 +194,12 @@ def get_artist_songs(artist_id):
 
 
 @bp.route('/search', methods=['GET'])
+@with_like_status
 def search():
     """Search songs and artists"""
     try:
         query = request.args.get('q', '')
         type_filter = request.args.get('type', 'all')  # all, songs, artists
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
 
         if not query or len(query.strip()) < 1:
             return jsonify({
@@ -161,33 +211,22 @@ def search():
         results = {'songs': [], 'artists': []}
         total = 0
 
-        # Search songs
+        # Search songs (ranked by relevance, then popularity)
         if type_filter in ['all', 'songs']:
-            song_query = Song.query.filter(
-                or_(
-                    Song.title.ilike(f'%{query}%'),
-                    Song.lyrics.ilike(f'%{query}%')
-                )
-            )
+            song_query, rank = SearchService.search_songs(song_rows_query(), query)
 
-            pagination = song_query.order_by(desc(Song.play_count)).paginate(
-                page=page, per_page=per_page, error_out=False
-            )
+            page = paginate(song_query.add_columns(rank), (rank, Song.play_count, Song.id))
 
-            results['songs'] = [song.to_dict() for song in pagination.items]
-            results['songs_total'] = pagination.total
-            total += pagination.total
+            results['songs'] = [song_row_to_dict(row) for row in page.items]
+            results['songs_total'] = page.total
+            results['songs_next_cursor'] = page.next_cursor
+            total += page.total or 0
 
         # Search artists
         if type_filter in ['all', 'artists']:
-            artist_query = Artist.query.filter(
-                or_(
-                    Artist.name.ilike(f'%{query}%'),
-                    Artist.bio.ilike(f'%{query}%')
-                )
-            )
-
-            artists = artist_query.order_by(Artist.name).limit(10).all()
+            artist_query, rank = SearchService.search_artists(Artist.query, query)
+
+            artists = artist_query.order_by(desc(rank), Artist.name).limit(10).all()
             results['artists'] = [artist.to_dict() for artist in artists]
             results['artists_total'] = len(artists)
             total += len(artists)
@@ -196,6 +235,26 @@ def search():
 
         return jsonify(results), 200
 
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+
+@bp.route('/search/suggest', methods=['GET'])
+def search_suggest():
+    """Search-as-you-type suggestions for songs, artists and users (served from memory)"""
+    try:
+        query = request.args.get('q', '')
+        type_filter = request.args.get('type', 'all')  # all, songs, artists, users
+        limit = min(request.args.get('limit', 5, type=int), 20)
+
+        if not query.strip():
+            return jsonify({kind: [] for kind in KINDS}), 200
+
+        kinds = KINDS if type_filter == 'all' else [kind for kind in KINDS if kind == type_filter]
+
+        return jsonify(suggest_index.suggest(query, kinds, limit)), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,50 @@
+"""Recommendation API routes"""
+from flask import Blueprint, jsonify, request
+from sqlalchemy import desc, exists
+from app.models.music import Song
+from app.models.social import Like
+from app.schemas.music import song_rows_query, song_row_to_dict
+from app.services.recommendation_service import RecommendationService, recommendation_job
+from app.utils.decorators import login_required, with_like_status
+
+bp = Blueprint('recommendation', __name__)
+
+# Most songs returned by one request
+MAX_RECOMMENDATIONS = 100
+
+
+@bp.route('/recommendations', methods=['GET'])
+@with_like_status
+@login_required
+def get_recommendations(current_user_id):
+    """Get songs recommended for the current user"""
+    try:
+        if recommendation_job.enabled:
+            recommendation_job.ensure_started()
+
+        limit = min(max(request.args.get('limit', 20, type=int), 1), MAX_RECOMMENDATIONS)
+        song_ids = RecommendationService.recommend(current_user_id, limit)
+
+        rows = []
+        if song_ids:
+            rows_by_id = {row.id: row for row in song_rows_query().filter(Song.id.in_(song_ids))}
+            rows = [rows_by_id[song_id] for song_id in song_ids if song_id in rows_by_id]
+        source = 'personalized' if rows else 'popular'
+
+        if len(rows) < limit:
+            # Users the model does not know yet get (or are topped up with) the most played songs
+            # they have not liked yet
+            seen = {row.id for row in rows}
+            popular = song_rows_query().filter(
+                ~exists().where(Like.user_id == current_user_id, Like.song_id == Song.id)
+            ).order_by(desc(Song.play_count), Song.id).limit(limit + len(seen))
+            rows.extend(row for row in popular if row.id not in seen)
+            rows = rows[:limit]
+
+        return jsonify({
+            'songs': [song_row_to_dict(row) for row in rows],
+            'source': source
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -1,10 +1,16 @@
 """Social features API routes"""
-from flask import Blueprint, jsonify
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
 from app.extensions import db
 from app.models.user import User
 from app.models.social import Follow
 from app.utils.decorators import login_required
+from app.services.counter_service import CounterService
 from app.services.log_service import LogService
+from app.services.feed_service import FeedService
+from app.services.follow_service import FollowService
+from app.services.suggestion_service import SuggestionService, suggestion_job
+from app.utils.pagination import paginate, InvalidCursor
 
 bp = Blueprint('social', __name__)
 
@@ -23,18 +29,13 @@ def follow_user(current_user_id, user_id):
         if not target_user:
             return jsonify({'error': 'User not found'}), 404
 
-        # 检查是否已经关注
-        existing_follow = Follow.query.filter_by(
-            follower_id=current_user_id,
-            following_id=user_id
-        ).first()
-
-        if existing_follow:
+        # 创建关注关系并更新双方的关注计数（已关注则不重复计数）
+        if not CounterService.follow(current_user_id, user_id):
+            db.session.rollback()
             return jsonify({'error': 'Already following'}), 400
 
-        # 创建关注关系
-        follow = Follow(follower_id=current_user_id, following_id=user_id)
-        db.session.add(follow)
+        # 把被关注用户最近的动态回填到自己的时间线
+        FeedService.backfill(current_user_id, user_id)
         db.session.commit()
 
         # Log follow action
@@ -55,16 +56,13 @@ def follow_user(current_user_id, user_id):
 def unfollow_user(current_user_id, user_id):
     """Unfollow a user"""
     try:
-        # 查找关注关系
-        follow = Follow.query.filter_by(
-            follower_id=current_user_id,
-            following_id=user_id
-        ).first()
-
-        if not follow:
+        # 删除关注关系并更新双方的关注计数
+        if not CounterService.unfollow(current_user_id, user_id):
+            db.session.rollback()
             return jsonify({'error': 'Not following'}), 400
 
-        db.session.delete(follow)
+        # 从自己的时间线中移除该用户的动态
+        FeedService.purge(current_user_id, user_id)
         db.session.commit()
 
         # Log unfollow action
@@ -85,78 +83,94 @@ def unfollow_user(current_user_id, user_id):
 def is_following(current_user_id, user_id):
     """Check if current user is following another user"""
     try:
-        follow = Follow.query.filter_by(
-            follower_id=current_user_id,
-            following_id=user_id
-        ).first()
-
         return jsonify({
-            'is_following': follow is not None
+            'is_following': FollowService.is_following(current_user_id, user_id)
         }), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-@bp.route('/followers/<int:user_id>', methods=['GET'])
-def get_followers(user_id):
-    """Get user's followers list"""
+@bp.route('/suggestions', methods=['GET'])
+@login_required
+def get_suggestions(current_user_id):
+    """Get accounts the current user may want to follow"""
     try:
-        user = db.session.get(User, user_id)
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
-
-        followers = Follow.query.filter_by(following_id=user_id).all()
-        followers_list = []
-
-        for follow in followers:
-            follower = db.session.get(User, follow.follower_id)
-            if follower:
-                followers_list.append({
-                    'id': follower.id,
-                    'username': follower.username,
-                    'nickname': follower.nickname,
-                    'avatar_url': follower.avatar_url,
-                    'bio': follower.bio,
-                    'followed_at': follow.created_at.isoformat()
-                })
+        if suggestion_job.enabled:
+            suggestion_job.ensure_started()
 
+        limit = min(max(request.args.get('limit', 10, type=int), 1), current_app.config['SUGGESTIONS_PER_USER'])
         return jsonify({
-            'followers': followers_list,
-            'total': len(followers_list)
+            'suggestions': SuggestionService.suggestions(current_user_id, limit)
         }), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-@bp.route('/following/<int:user_id>', methods=['GET'])
-def get_following(user_id):
-    """Get user's following list"""
+def _viewer_id():
+    """Id of the authenticated user, if any"""
     try:
-        user = db.session.get(User, user_id)
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
+        verify_jwt_in_request(optional=True)
+        current_user_id = get_jwt_identity()
+        return int(current_user_id) if current_user_id else None
+    except Exception:
+        return None
 
-        following = Follow.query.filter_by(follower_id=user_id).all()
-        following_list = []
-
-        for follow in following:
-            followed_user = db.session.get(User, follow.following_id)
-            if followed_user:
-                following_list.append({
-                    'id': followed_user.id,
-                    'username': followed_user.username,
-                    'nickname': followed_user.nickname,
-                    'avatar_url': followed_user.avatar_url,
-                    'bio': followed_user.bio,
-                    'followed_at': follow.created_at.isoformat()
-                })
 
-        return jsonify({
-            'following': following_list,
-            'total': len(following_list)
-        }), 200
+def _follow_list(user_id, direction):
+    """
+    Followers/following of a user, newest first, with ``is_following`` for the viewer
+
+    Without pagination arguments the whole list is streamed as it is read;
+    with ``page``/``per_page``/``cursor`` one page is returned.
+    """
+    user = db.session.get(User, user_id)
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+
+    query = FollowService.list_query(user_id, direction)
+    total = user.followers_count if direction == 'followers' else user.following_count
+    viewer_id = _viewer_id()
+
+    if not any(arg in request.args for arg in ('page', 'per_page', 'cursor')):
+        def generate():
+            yield '{"%s":[' % direction
+            for i, item in enumerate(FollowService.iter_dicts(query, viewer_id)):
+                yield (',' if i else '') + current_app.json.dumps(item)
+            yield '],"total":%d}' % total
 
+        return Response(stream_with_context(generate()), mimetype='application/json')
+
+    try:
+        page = paginate(query, (Follow.created_at, Follow.id), total=total,
+                        key=lambda row: [row.followed_at, row.follow_id])
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({
+        direction: FollowService.to_dicts(page.items, viewer_id),
+        'total': page.total,
+        'page': page.page,
+        'per_page': page.per_page,
+        'has_next': page.has_next,
+        'next_cursor': page.next_cursor
+    }), 200
+
+
+@bp.route('/followers/<int:user_id>', methods=['GET'])
+def get_followers(user_id):
+    """Get user's followers list"""
+    try:
+        return _follow_list(user_id, 'followers')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/following/<int:user_id>', methods=['GET'])
+def get_following(user_id):
+    """Get user's following list"""
+    try:
+        return _follow_list(user_id, 'following')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
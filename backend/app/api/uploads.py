@@ -0,0 +1,56 @@
+"""Uploaded file serving"""
+import mimetypes
+import os
+from flask import Blueprint, current_app, abort, send_from_directory
+from werkzeug.security import safe_join
+from app.utils.avatars import AVATAR_DIR, parse_rendition
+
+bp = Blueprint('uploads', __name__)
+
+# Content-addressed files never change under the same name
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def is_immutable(filename):
+    """Whether an upload path names a content-addressed file (avatar rendition)"""
+    directory, _, name = filename.rpartition('/')
+    return directory == AVATAR_DIR and parse_rendition(name) is not None
+
+
+def _accel_response(folder, filename):
+    """Empty response telling nginx to send the file from its internal location"""
+    path = safe_join(folder, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    response = current_app.response_class(
+        mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    )
+    response.headers['X-Accel-Redirect'] = current_app.config['UPLOADS_X_ACCEL_PREFIX'] + filename
+    return response
+
+
+@bp.route('/<path:filename>')
+def uploaded_file(filename):
+    """
+    Serve an uploaded file
+
+    ``UPLOADS_SERVE_MODE``:
+      flask      - the worker sends the file (ETag/Last-Modified conditional
+                   requests and Range are handled by send_file; the body goes
+                   through wsgi.file_wrapper, i.e. sendfile(2) under gunicorn)
+      x-sendfile - the front server sends it (``USE_X_SENDFILE``)
+      x-accel    - nginx sends it from an internal location, including
+                   conditional and Range handling; the worker only stats it
+    """
+    folder = current_app.config['UPLOAD_PATH']
+    if current_app.config['UPLOADS_SERVE_MODE'] == 'x-accel':
+        response = _accel_response(folder, filename)
+    else:
+        response = send_from_directory(folder, filename)
+
+    # Set as a string: every response.cache_control attribute access re-parses the header
+    if is_immutable(filename):
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    else:
+        response.headers['Cache-Control'] = f"public, max-age={current_app.config['UPLOADS_CACHE_MAX_AGE']}"
+    return response
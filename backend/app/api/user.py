@@ -1,7 +1,4 @@
 """User management API routes"""
-import os
-import uuid
-from datetime import datetime
 from io import BytesIO
 from PIL import Image
 from flask import Blueprint, request, jsonify, current_app
@@ -12,7 +9,11 @@ from sqlalchemy import or_
 from app.extensions import db
 from app.models.user import User
 from app.utils.decorators import login_required
+from app.services.avatar_service import avatar_gc, avatar_processor
 from app.services.log_service import LogService
+from app.services.password_hasher import PasswordHasherBusy
+from app.utils.avatars import avatar_srcset
+from app.utils.pagination import paginate, InvalidCursor
 
 bp = Blueprint('user', __name__)
 
@@ -23,64 +24,34 @@ def allowed_file(filename):
            filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']
 
 
-def compress_image(image_file, max_size_kb=150):
-    """
-    Compress image to ensure it's under max_size_kb
-    Returns compressed image as BytesIO object
-    """
-    # Open image
-    img = Image.open(image_file)
-
-    # Handle EXIF orientation to fix rotated images
+@bp.route('/me', methods=['GET'])
+@login_required
+def get_my_profile(current_user_id):
+    """Get current user profile"""
     try:
-        from PIL import ImageOps
-        img = ImageOps.exif_transpose(img)
-    except Exception:
-        # If EXIF processing fails, continue without rotation
-        pass
-
-    # Convert RGBA to RGB if necessary
-    if img.mode in ('RGBA', 'LA', 'P'):
-        background = Image.new('RGB', img.size, (255, 255, 255))
-        if img.mode == 'P':
-            img = img.convert('RGBA')
-        background.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
-        img = background
-
-    # Resize if image is too large (max 800x800)
-    max_dimension = 800
-    if img.width > max_dimension or img.height > max_dimension:
-        img.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
-
-    # Compress with quality adjustment
-    output = BytesIO()
-    quality = 95
-
-    while quality > 20:
-        output.seek(0)
-        output.truncate()
-        img.save(output, format='JPEG', quality=quality, optimize=True)
-        size_kb = output.tell() / 1024
-
-        if size_kb <= max_size_kb:
-            break
+        user = db.session.get(User, current_user_id)
+        if not user:
+            return jsonify({'error': 'User not found'}), 404
 
-        quality -= 5
+        return jsonify({'user': user.to_dict(include_private=True)}), 200
 
-    output.seek(0)
-    return output
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
 
-@bp.route('/me', methods=['GET'])
+@bp.route('/me/avatar/status', methods=['GET'])
 @login_required
-def get_my_profile(current_user_id):
-    """Get current user profile"""
+def get_avatar_status(current_user_id):
+    """Get the status of the current user's latest avatar upload"""
     try:
         user = db.session.get(User, current_user_id)
         if not user:
             return jsonify({'error': 'User not found'}), 404
 
-        return jsonify({'user': user.to_dict(include_private=True)}), 200
+        job = avatar_processor.status(current_user_id) or {'status': 'ready'}
+        if job['status'] == 'ready':
+            job = {**job, 'avatar_url': user.avatar_url, 'avatar_srcset': avatar_srcset(user.avatar_url)}
+        return jsonify(job), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -162,6 +133,9 @@ def change_password(current_user_id):
 
         return jsonify({'message': 'Password changed successfully'}), 200
 
+    except PasswordHasherBusy:
+        db.session.rollback()
+        return jsonify({'error': 'Server is busy, please try again later'}), 503, {'Retry-After': '1'}
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -190,48 +164,30 @@ def upload_avatar(current_user_id):
         if not allowed_file(file.filename):
             return jsonify({'error': 'File type not allowed. Only png, jpg, jpeg, gif are allowed'}), 400
 
-        # Compress image
+        # Only the header is parsed here; decoding and re-encoding run in the avatar process pool
+        data = file.read()
         try:
-            compressed_image = compress_image(file, max_size_kb=150)
+            Image.open(BytesIO(data))
         except Exception as e:
             return jsonify({'error': f'Image compression failed: {str(e)}'}), 400
 
-        # Generate unique filename using timestamp and UUID (always save as .jpg after compression)
-        timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-        unique_id = str(uuid.uuid4())[:8]
-        filename = f"avatar_{current_user_id}_{timestamp}_{unique_id}.jpg"
-
-        # Save compressed file
-        upload_folder = os.path.join(current_app.root_path, '..', current_app.config['UPLOAD_FOLDER'])
-        os.makedirs(upload_folder, exist_ok=True)
-        filepath = os.path.join(upload_folder, filename)
-
-        with open(filepath, 'wb') as f:
-            f.write(compressed_image.read())
-
-        # Delete old avatar file if exists
-        if user.avatar_url:
-            old_filename = user.avatar_url.split('/')[-1]
-            old_filepath = os.path.join(upload_folder, old_filename)
-            if os.path.exists(old_filepath):
-                try:
-                    os.remove(old_filepath)
-                except Exception as e:
-                    # Log but don't fail if old file can't be deleted
-                    current_app.logger.warning(f"Failed to delete old avatar: {str(e)}")
-
-        # Update user avatar URL
-        avatar_url = f"/uploads/{filename}"
-        user.avatar_url = avatar_url
-        db.session.commit()
-
-        # Log avatar upload
-        LogService.log_avatar_upload(current_user_id)
+        job = avatar_processor.submit(current_user_id, data)
+        if avatar_gc.enabled:
+            avatar_gc.ensure_started()
+        if job['status'] == 'ready':
+            return jsonify({
+                'message': 'Avatar uploaded successfully',
+                'avatar_url': job['avatar_url'],
+                'avatar_srcset': job['avatar_srcset']
+            }), 200
 
         return jsonify({
-            'message': 'Avatar uploaded successfully',
-            'avatar_url': avatar_url
-        }), 200
+            'message': 'Avatar is being processed',
+            'status': job['status'],
+            'job_id': job['job_id'],
+            'avatar_url': user.avatar_url,
+            'avatar_srcset': avatar_srcset(user.avatar_url)
+        }), 202
 
     except Exception as e:
         db.session.rollback()
@@ -246,14 +202,10 @@ def get_user_profile(user_id):
         if not user:
             return jsonify({'error': 'User not found'}), 404
 
-        # 获取关注统计
-        from app.models.social import Follow
-        followers_count = Follow.query.filter_by(following_id=user_id).count()
-        following_count = Follow.query.filter_by(follower_id=user_id).count()
-
+        # 关注统计直接读取用户表上维护的计数
         user_data = user.to_dict()
-        user_data['followers_count'] = followers_count
-        user_data['following_count'] = following_count
+        user_data['followers_count'] = user.followers_count
+        user_data['following_count'] = user.following_count
 
         # Log view user action (if authenticated)
         from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
@@ -276,8 +228,6 @@ def search_users():
     """Search users by username, nickname or bio"""
     try:
         query = request.args.get('q', '')
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
 
         if not query or len(query.strip()) < 1:
             return jsonify({
@@ -294,19 +244,20 @@ def search_users():
             )
         )
 
-        pagination = user_query.paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        page = paginate(user_query, (User.id,), descending=False)
 
-        users_data = [user.to_dict() for user in pagination.items]
+        users_data = [user.to_dict() for user in page.items]
 
         return jsonify({
             'users': users_data,
-            'total': pagination.total,
-            'page': page,
-            'per_page': per_page,
-            'pages': pagination.pages
+            'total': page.total,
+            'page': page.page,
+            'per_page': page.per_page,
+            'pages': page.pages,
+            'next_cursor': page.next_cursor
         }), 200
 
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
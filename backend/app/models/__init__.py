@@ -3,7 +3,10 @@ from app.models.user import User
 from app.models.music import Artist, Album, Song
 from app.models.social import Follow, Like, Comment, PlayHistory
 from app.models.log import UserBehaviorLog
-from app.models.message import Message
+from app.models.message import Message, Conversation
+from app.models.feed import FeedItem
+from app.models.trending import SongHourlyStat, TrendingEntry
+from app.models.suggestion import FollowSuggestion
 
 __all__ = [
     'User',
@@ -15,5 +18,10 @@ __all__ = [
     'Comment',
     'PlayHistory',
     'UserBehaviorLog',
-    'Message'
+    'Message',
+    'Conversation',
+    'FeedItem',
+    'SongHourlyStat',
+    'TrendingEntry',
+    'FollowSuggestion'
 ]
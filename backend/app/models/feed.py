@@ -0,0 +1,44 @@
+"""Feed models (materialized per-user timeline)"""
+from datetime import datetime
+from app.extensions import db
+from app.utils.avatars import avatar_srcset
+
+
+class FeedItem(db.Model):
+    """Timeline entry fanned out to a follower when someone they follow acts"""
+    __tablename__ = 'feed_items'
+
+    id = db.Column(db.Integer, primary_key=True)
+    owner_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)  # timeline owner
+    actor_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)  # who acted
+    action_type = db.Column(db.String(50), nullable=False)  # 'play', 'like'
+    song_id = db.Column(db.Integer, db.ForeignKey('songs.id', ondelete='CASCADE'), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    # Relationships
+    actor = db.relationship('User', foreign_keys=[actor_id])
+    song = db.relationship('Song')
+
+    # Indexes
+    __table_args__ = (
+        db.Index('idx_feed_owner_created', 'owner_id', 'created_at', 'id'),
+        db.Index('idx_feed_owner_actor', 'owner_id', 'actor_id'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'action_type': self.action_type,
+            'created_at': self.created_at.isoformat(),
+            'user': {
+                'id': self.actor.id,
+                'username': self.actor.username,
+                'nickname': self.actor.nickname,
+                'avatar_url': self.actor.avatar_url,
+                'avatar_srcset': avatar_srcset(self.actor.avatar_url)
+            },
+            'song': self.song.to_dict()
+        }
+
+    def __repr__(self):
+        return f'<FeedItem owner={self.owner_id} actor={self.actor_id} action={self.action_type}>'
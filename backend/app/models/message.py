@@ -23,6 +23,7 @@ class Message(db.Model):
         db.Index('idx_receiver_messages', 'receiver_id', 'created_at'),
         db.Index('idx_sender_messages', 'sender_id', 'created_at'),
         db.Index('idx_unread_messages', 'receiver_id', 'is_read'),
+        db.Index('idx_conversation_messages', 'sender_id', 'receiver_id', 'created_at'),
     )
 
     def to_dict(self):
@@ -40,3 +41,40 @@ class Message(db.Model):
 
     def __repr__(self):
         return f'<Message {self.id} from {self.sender_id} to {self.receiver_id}>'
+
+
+class Conversation(db.Model):
+    """Denormalized conversation summary, one row per (user, partner) pair"""
+    __tablename__ = 'conversations'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    partner_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    last_message_id = db.Column(db.Integer, db.ForeignKey('messages.id', ondelete='SET NULL'), nullable=True)
+    last_message_at = db.Column(db.DateTime, nullable=False)
+    unread_count = db.Column(db.Integer, nullable=False, default=0)  # messages from partner not yet read
+
+    # Relationships
+    partner = db.relationship('User', foreign_keys=[partner_id])
+    last_message = db.relationship('Message', foreign_keys=[last_message_id])
+
+    # Indexes
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'partner_id', name='unique_conversation'),
+        db.Index('idx_user_conversations', 'user_id', 'last_message_at', 'id'),
+    )
+
+    def to_dict(self):
+        """Convert conversation to dictionary"""
+        return {
+            'user': self.partner.to_dict() if self.partner else None,
+            'last_message': {
+                'content': self.last_message.content,
+                'created_at': self.last_message.created_at.isoformat(),
+                'is_from_me': self.last_message.sender_id == self.user_id
+            } if self.last_message else None,
+            'unread_count': self.unread_count
+        }
+
+    def __repr__(self):
+        return f'<Conversation user={self.user_id} partner={self.partner_id}>'
@@ -1,6 +1,8 @@
 """Music models (Artist, Album, Song)"""
 from datetime import datetime
+from sqlalchemy import event, inspect
 from app.extensions import db
+from app.utils.search_tokens import build_search_document
 
 
 class Artist(db.Model):
@@ -13,6 +15,7 @@ class Artist(db.Model):
     bio = db.Column(db.Text, nullable=True)
     genre = db.Column(db.String(100), nullable=True)
     country = db.Column(db.String(100), nullable=True)
+    search_document = db.Column(db.Text, nullable=True)  # Full-text index tokens (name + bio)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -81,6 +84,7 @@ class Song(db.Model):
     external_url = db.Column(db.String(500), nullable=True)  # Link to external music platform
     cover_url = db.Column(db.String(255), nullable=True)
     lyrics = db.Column(db.Text, nullable=True)
+    search_document = db.Column(db.Text, nullable=True)  # Full-text index tokens (title + lyrics)
     play_count = db.Column(db.Integer, nullable=False, default=0)
     like_count = db.Column(db.Integer, nullable=False, default=0)
     comment_count = db.Column(db.Integer, nullable=False, default=0)
@@ -126,3 +130,24 @@ class Song(db.Model):
 
     def __repr__(self):
         return f'<Song {self.title}>'
+
+
+def _search_fields_changed(target, fields):
+    state = inspect(target)
+    return any(state.attrs[field].history.has_changes() for field in fields)
+
+
+@event.listens_for(Artist, 'before_insert')
+@event.listens_for(Artist, 'before_update')
+def update_artist_search_document(mapper, connection, artist):
+    """Keep the artist's full-text index tokens in sync with name and bio"""
+    if artist.search_document is None or _search_fields_changed(artist, ('name', 'bio')):
+        artist.search_document = build_search_document(artist.name, artist.bio)
+
+
+@event.listens_for(Song, 'before_insert')
+@event.listens_for(Song, 'before_update')
+def update_song_search_document(mapper, connection, song):
+    """Keep the song's full-text index tokens in sync with title and lyrics"""
+    if song.search_document is None or _search_fields_changed(song, ('title', 'lyrics')):
+        song.search_document = build_search_document(song.title, song.lyrics)
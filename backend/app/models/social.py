@@ -19,8 +19,9 @@ class Follow(db.Model):
     # Unique constraint
     __table_args__ = (
         db.UniqueConstraint('follower_id', 'following_id', name='unique_follow'),
-        db.Index('idx_follower_id', 'follower_id'),
-        db.Index('idx_following_id', 'following_id'),
+        # Keyset pagination of followers/following lists, newest first
+        db.Index('idx_follower_created', 'follower_id', 'created_at', 'id'),
+        db.Index('idx_following_created', 'following_id', 'created_at', 'id'),
     )
 
     def __repr__(self):
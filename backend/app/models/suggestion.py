@@ -0,0 +1,22 @@
+"""Precomputed follow suggestions"""
+from datetime import datetime
+from app.extensions import db
+
+
+class FollowSuggestion(db.Model):
+    """One ranked account suggested to a user, computed offline"""
+    __tablename__ = 'follow_suggestions'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True)  # 1-based
+    candidate_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    score = db.Column(db.Float, nullable=False)
+    mutual_count = db.Column(db.Integer, nullable=False, default=0)  # followees who follow the candidate
+    common_likes = db.Column(db.Integer, nullable=False, default=0)  # songs both liked
+    computed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    # Relationships
+    candidate = db.relationship('User', foreign_keys=[candidate_id])
+
+    def __repr__(self):
+        return f'<FollowSuggestion user={self.user_id} #{self.rank} candidate={self.candidate_id}>'
@@ -0,0 +1,38 @@
+"""Trending chart models (hourly play buckets and precomputed rankings)"""
+from datetime import datetime
+from app.extensions import db
+
+
+class SongHourlyStat(db.Model):
+    """Plays and likes of a song within one hour, aggregated from behavior logs"""
+    __tablename__ = 'song_hourly_stats'
+
+    id = db.Column(db.Integer, primary_key=True)
+    song_id = db.Column(db.Integer, db.ForeignKey('songs.id', ondelete='CASCADE'), nullable=False)
+    bucket_start = db.Column(db.DateTime, nullable=False)  # UTC, truncated to the hour
+    plays = db.Column(db.Integer, nullable=False, default=0)
+    likes = db.Column(db.Integer, nullable=False, default=0)
+
+    # Indexes
+    __table_args__ = (
+        db.UniqueConstraint('song_id', 'bucket_start', name='unique_song_hour'),
+        db.Index('idx_hourly_bucket_start', 'bucket_start'),
+    )
+
+    def __repr__(self):
+        return f'<SongHourlyStat song={self.song_id} hour={self.bucket_start}>'
+
+
+class TrendingEntry(db.Model):
+    """One ranked song of a precomputed trending chart"""
+    __tablename__ = 'trending_entries'
+
+    window = db.Column(db.String(10), primary_key=True)  # '24h', '7d', '30d'
+    genre = db.Column(db.String(100), primary_key=True)  # '' for all genres
+    rank = db.Column(db.Integer, primary_key=True)  # 1-based
+    song_id = db.Column(db.Integer, db.ForeignKey('songs.id', ondelete='CASCADE'), nullable=False)
+    score = db.Column(db.Float, nullable=False)
+    computed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<TrendingEntry {self.window}/{self.genre or "all"} #{self.rank} song={self.song_id}>'
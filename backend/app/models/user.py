@@ -1,7 +1,8 @@
 """User model"""
 from datetime import datetime
 from app.extensions import db
-import bcrypt
+from app.services.password_hasher import password_hasher
+from app.utils.avatars import avatar_srcset
 
 
 class User(db.Model):
@@ -19,9 +20,21 @@ class User(db.Model):
     wechat_openid = db.Column(db.String(100), unique=True, nullable=True, index=True)
     wechat_unionid = db.Column(db.String(100), unique=True, nullable=True, index=True)
     is_active = db.Column(db.Boolean, default=True, nullable=False)
+    followers_count = db.Column(db.Integer, nullable=False, default=0, server_default='0', index=True)  # maintained on follow/unfollow
+    following_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Latest avatar processing job, shared by every web worker
+    avatar_job_id = db.Column(db.String(32), nullable=True)
+    avatar_job_status = db.Column(db.String(20), nullable=True)  # 'pending', 'ready', 'failed'
+    avatar_job_error = db.Column(db.String(255), nullable=True)
+    avatar_job_updated_at = db.Column(db.DateTime, nullable=True)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        # Login looks usernames up case-insensitively
+        db.Index('idx_username_lower', db.func.lower(username)),
+    )
+
     # Relationships
     likes = db.relationship('Like', back_populates='user', cascade='all, delete-orphan')
     comments = db.relationship('Comment', back_populates='user', cascade='all, delete-orphan')
@@ -43,12 +56,16 @@ class User(db.Model):
     )
 
     def set_password(self, password):
-        """Hash and set password"""
-        self.password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        """Hash and set password (bcrypt runs in the password hashing pool)"""
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
         """Verify password"""
-        return bcrypt.checkpw(password.encode('utf-8'), self.password_hash.encode('utf-8'))
+        return password_hasher.verify(password, self.password_hash)
+
+    def password_needs_rehash(self):
+        """Whether the stored hash uses a bcrypt cost other than BCRYPT_ROUNDS"""
+        return password_hasher.needs_rehash(self.password_hash)
 
     def to_dict(self, include_private=False):
         """Convert user to dictionary"""
@@ -57,6 +74,7 @@ class User(db.Model):
             'username': self.username,
             'nickname': self.nickname or self.username,
             'avatar_url': self.avatar_url,
+            'avatar_srcset': avatar_srcset(self.avatar_url),
             'bio': self.bio,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
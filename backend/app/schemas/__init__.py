@@ -5,10 +5,13 @@ from app.schemas.auth import (
     ChangePasswordSchema,
     UpdateProfileSchema
 )
+from app.schemas.music import song_rows_query, song_row_to_dict
 
 __all__ = [
     'RegisterSchema',
     'LoginSchema',
     'ChangePasswordSchema',
-    'UpdateProfileSchema'
+    'UpdateProfileSchema',
+    'song_rows_query',
+    'song_row_to_dict'
 ]
@@ -0,0 +1,76 @@
+"""Music schemas for serialization from flat rows"""
+from sqlalchemy.orm import aliased
+from app.extensions import db
+from app.models.music import Artist, Album, Song
+
+# Albums may belong to a different artist than the song, so join artists twice
+AlbumArtist = aliased(Artist, name='album_artist')
+
+ARTIST_FIELDS = ('id', 'name', 'avatar_url', 'bio', 'genre', 'country')
+ALBUM_FIELDS = ('id', 'title', 'cover_url', 'release_date')
+SONG_FIELDS = ('id', 'title', 'duration', 'genre', 'external_url', 'cover_url',
+               'created_at', 'play_count', 'like_count', 'comment_count')
+
+
+def song_rows_query():
+    """
+    Query songs together with their artist, album and album artist as flat rows
+
+    A page of songs is fetched in a single round trip instead of lazy-loading
+    ``song.artist``, ``song.album`` and ``album.artist`` per song. Song columns
+    keep their names so the query can be filtered, ordered and paginated like
+    ``Song.query``; joined columns are prefixed (``artist_``, ``album_``,
+    ``album_artist_``).
+    """
+    columns = [getattr(Song, field) for field in SONG_FIELDS]
+    columns += [getattr(Artist, field).label(f'artist_{field}') for field in ARTIST_FIELDS]
+    columns += [getattr(Album, field).label(f'album_{field}') for field in ALBUM_FIELDS]
+    columns += [getattr(AlbumArtist, field).label(f'album_artist_{field}') for field in ARTIST_FIELDS]
+
+    return db.session.query(*columns).select_from(Song).outerjoin(
+        Artist, Song.artist_id == Artist.id
+    ).outerjoin(
+        Album, Song.album_id == Album.id
+    ).outerjoin(
+        AlbumArtist, Album.artist_id == AlbumArtist.id
+    )
+
+
+def _artist_from_row(row, prefix):
+    if getattr(row, f'{prefix}id') is None:
+        return None
+    return {field: getattr(row, f'{prefix}{field}') for field in ARTIST_FIELDS}
+
+
+def song_row_to_dict(row, include_stats=True):
+    """Build the same payload as ``Song.to_dict`` from a ``song_rows_query`` row"""
+    album = None
+    if row.album_id is not None:
+        album = {
+            'id': row.album_id,
+            'title': row.album_title,
+            'artist': _artist_from_row(row, 'album_artist_'),
+            'cover_url': row.album_cover_url,
+            'release_date': row.album_release_date.isoformat() if row.album_release_date else None
+        }
+
+    data = {
+        'id': row.id,
+        'title': row.title,
+        'artist': _artist_from_row(row, 'artist_'),
+        'album': album,
+        'duration': row.duration,
+        'genre': row.genre,
+        'external_url': row.external_url,
+        'cover_url': row.cover_url,
+        'created_at': row.created_at.isoformat() if row.created_at else None
+    }
+
+    if include_stats:
+        data.update({
+            'play_count': row.play_count,
+            'like_count': row.like_count,
+            'comment_count': row.comment_count
+        })
+
+    return data
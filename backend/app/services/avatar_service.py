@@ -0,0 +1,323 @@
+"""Avatar processing off the request thread"""
+import atexit
+import multiprocessing
+import os
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+from flask import current_app
+from sqlalchemy import select, update
+from app.extensions import db, socketio
+from app.models.user import User
+from app.services.background import PeriodicFlusher
+from app.services.log_service import LogService
+from app.utils.avatars import (
+    AVATAR_DIR, AVATAR_FORMATS, AVATAR_SIZES, avatar_key, avatar_srcset, avatar_url_for,
+    key_of_url, parse_rendition, rendition_filename
+)
+from app.utils.images import avatar_renditions
+
+# How long a job may stay pending before it is reported failed (its worker died)
+JOB_STATUS_TTL = 600  # seconds
+
+# Single-file avatars written before renditions existed
+LEGACY_AVATAR = re.compile(r'^avatar_\d+_\d+(_[0-9a-f]+)?\.jpg$')
+
+
+class AvatarStore:
+    """
+    Content-addressed avatar renditions on disk
+
+    Renditions are named by the hash of the uploaded bytes, so the same
+    image uploaded twice (or by two users) is stored once, and a file is
+    never replaced in place. Files are therefore not deleted when a user
+    changes avatar; ``collect`` removes the ones no user references.
+    """
+
+    @staticmethod
+    def folder(app=None):
+        return os.path.join((app or current_app).config['UPLOAD_PATH'], AVATAR_DIR)
+
+    @staticmethod
+    def paths(key, app=None):
+        folder = AvatarStore.folder(app)
+        return [os.path.join(folder, rendition_filename(key, size, fmt))
+                for size in AVATAR_SIZES for fmt in AVATAR_FORMATS]
+
+    @staticmethod
+    def claim(key, app=None):
+        """
+        Reuse stored renditions of an image if all of them exist
+
+        Their mtime is bumped so a concurrent ``collect`` keeps them through
+        the grace period while the new reference is committed.
+
+        Returns:
+            True if the renditions exist
+        """
+        try:
+            for path in AvatarStore.paths(key, app):
+                os.utime(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    @staticmethod
+    def save(key, renditions, app=None):
+        """Write renditions ({(size, format): bytes}), each atomically"""
+        folder = AvatarStore.folder(app)
+        os.makedirs(folder, exist_ok=True)
+        for (size, fmt), data in renditions.items():
+            path = os.path.join(folder, rendition_filename(key, size, fmt))
+            tmp = f'{path}.{uuid.uuid4().hex[:8]}.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+
+    @staticmethod
+    def collect(grace_seconds=None):
+        """
+        Delete avatar files no user references any more
+
+        Covers renditions, leftover temp files and legacy single-file
+        avatars. Files modified within the grace period are kept: they may
+        belong to an upload whose ``avatar_url`` is not committed yet.
+
+        Returns:
+            Number of files deleted
+        """
+        if grace_seconds is None:
+            grace_seconds = current_app.config['AVATAR_GC_GRACE_SECONDS']
+        cutoff = time.time() - grace_seconds
+
+        keys, legacy = set(), set()
+        urls = db.session.scalars(
+            select(User.avatar_url).where(User.avatar_url.like('/uploads/%')).distinct()
+        )
+        for url in urls:
+            key = key_of_url(url)
+            if key is not None:
+                keys.add(key)
+            else:
+                legacy.add(url.rsplit('/', 1)[-1])
+        db.session.rollback()
+
+        candidates = []
+        folder = AvatarStore.folder()
+        if os.path.isdir(folder):
+            for name in os.listdir(folder):
+                parsed = parse_rendition(name)
+                if name.endswith('.tmp') or (parsed is not None and parsed[0] not in keys):
+                    candidates.append(os.path.join(folder, name))
+        root = current_app.config['UPLOAD_PATH']
+        for name in os.listdir(root):
+            if LEGACY_AVATAR.match(name) and name not in legacy:
+                candidates.append(os.path.join(root, name))
+
+        deleted = 0
+        for path in candidates:
+            try:
+                # mtime is checked last so a rendition just claimed by a new upload survives
+                if os.stat(path).st_mtime < cutoff:
+                    os.remove(path)
+                    deleted += 1
+            except FileNotFoundError:
+                pass
+        return deleted
+
+
+class AvatarProcessor:
+    """
+    Process pool re-encoding uploaded avatars
+
+    The upload endpoint only validates the image header and submits the raw
+    bytes; decoding and rendering the WebP/JPEG renditions run in one of
+    ``AVATAR_PROCESS_WORKERS`` child processes, so a CPU-heavy photo never
+    blocks a (gevent) web worker. An image whose renditions are already
+    stored is not processed again. When the child finishes, the files are
+    written, ``user.avatar_url`` is updated and an ``avatar_updated`` event
+    is pushed to the user's room. The latest job's state is kept on the
+    user row (``avatar_job_*``), so any web worker can answer a status poll
+    and a job only completes if no newer upload replaced it. The pool is
+    created lazily per process so it survives gunicorn forking workers;
+    children are spawned, not forked, so they do not inherit the worker's
+    sockets or greenlets.
+    """
+
+    name = 'avatar_processor'
+
+    def __init__(self):
+        self.app = None
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions[self.name] = self
+        atexit.register(self.shutdown)
+
+    def _pool(self):
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.app.config['AVATAR_PROCESS_WORKERS'],
+                        mp_context=multiprocessing.get_context('spawn')
+                    )
+                    self._pid = os.getpid()
+        return self._executor
+
+    def submit(self, user_id, data):
+        """
+        Queue an uploaded image as the user's new avatar
+
+        With ``AVATAR_PROCESSING_ASYNC`` off, or when the same image was
+        uploaded before, the avatar is set inline.
+
+        Returns:
+            Job status dict (``status`` is 'pending' unless set inline)
+        """
+        job_id = uuid.uuid4().hex[:12]
+        key = avatar_key(data)
+        self._record(user_id, None, avatar_job_id=job_id, avatar_job_status='pending',
+                     avatar_job_error=None)
+        db.session.commit()
+
+        if AvatarStore.claim(key, self.app):
+            return self._finish(user_id, job_id, key)
+
+        max_size_kb = self.app.config['AVATAR_MAX_SIZE_KB']
+        if not self.app.config['AVATAR_PROCESSING_ASYNC']:
+            return self._finish(user_id, job_id, key, avatar_renditions(data, max_size_kb))
+
+        future = self._pool().submit(avatar_renditions, data, max_size_kb)
+        future.add_done_callback(lambda done: self._complete(user_id, job_id, key, done))
+        return {'job_id': job_id, 'status': 'pending'}
+
+    def status(self, user_id):
+        """
+        Latest avatar job status of a user, or None if there is none
+
+        A job still pending after ``JOB_STATUS_TTL`` (its worker died) is
+        reported as failed.
+        """
+        row = db.session.execute(
+            select(User.avatar_job_id, User.avatar_job_status, User.avatar_job_error,
+                   User.avatar_job_updated_at, User.avatar_url)
+            .where(User.id == user_id)
+        ).one_or_none()
+        if row is None or row.avatar_job_id is None:
+            return None
+
+        status = {'job_id': row.avatar_job_id, 'status': row.avatar_job_status}
+        if (row.avatar_job_status == 'pending'
+                and row.avatar_job_updated_at < datetime.utcnow() - timedelta(seconds=JOB_STATUS_TTL)):
+            status.update(status='failed', error='Image processing timed out')
+        elif row.avatar_job_status == 'failed':
+            status['error'] = row.avatar_job_error
+        elif row.avatar_job_status == 'ready':
+            status.update(avatar_url=row.avatar_url, avatar_srcset=avatar_srcset(row.avatar_url))
+        return status
+
+    def _complete(self, user_id, job_id, key, future):
+        """Runs in the pool's result thread once a child finished a job"""
+        with self.app.app_context():
+            try:
+                self._finish(user_id, job_id, key, future.result())
+            except Exception as e:
+                db.session.rollback()
+                print(f"Error processing avatar of user {user_id}: {e}")
+                error = f'Image compression failed: {str(e)}'
+                if self._record(user_id, job_id, avatar_job_status='failed',
+                                avatar_job_error=error[:255]):
+                    db.session.commit()
+                    self._publish(user_id, {'job_id': job_id, 'status': 'failed', 'error': error})
+                else:
+                    db.session.rollback()
+
+    def _finish(self, user_id, job_id, key, renditions=None):
+        """Store processed renditions (if any) and make them the user's current avatar"""
+        if renditions is not None:
+            AvatarStore.save(key, renditions, self.app)
+
+        # The previous avatar's files are left to avatar_gc: other users may share them
+        avatar_url = avatar_url_for(key)
+        if not self._record(user_id, job_id, avatar_url=avatar_url, avatar_job_status='ready'):
+            # A newer upload superseded this one
+            db.session.rollback()
+            return self.status(user_id)
+        db.session.commit()
+
+        LogService.log_avatar_upload(user_id)
+        return self._publish(user_id, {
+            'job_id': job_id,
+            'status': 'ready',
+            'avatar_url': avatar_url,
+            'avatar_srcset': avatar_srcset(avatar_url)
+        })
+
+    @staticmethod
+    def _record(user_id, job_id, **values):
+        """
+        Update the user's job columns, only while ``job_id`` is still the
+        latest job (any job if None)
+
+        Returns:
+            True if the row was updated
+        """
+        if 'avatar_url' not in values:
+            # Job bookkeeping is not a profile change
+            values['updated_at'] = User.updated_at
+        stmt = update(User).where(User.id == user_id)
+        if job_id is not None:
+            stmt = stmt.where(User.avatar_job_id == job_id)
+        result = db.session.execute(
+            stmt.values(avatar_job_updated_at=datetime.utcnow(), **values),
+            execution_options={'synchronize_session': False}
+        )
+        return result.rowcount > 0
+
+    @staticmethod
+    def _publish(user_id, status):
+        socketio.emit('avatar_updated', status, room=f'user_{user_id}')
+        return status
+
+    def shutdown(self):
+        """Stop this process's pool (jobs still queued are dropped)"""
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+avatar_processor = AvatarProcessor()
+
+
+class AvatarGarbageCollector(PeriodicFlusher):
+    """Background thread deleting unreferenced avatar files every ``AVATAR_GC_INTERVAL``"""
+
+    name = 'avatar_gc'
+
+    @property
+    def enabled(self):
+        return self.app.config['AVATAR_GC_ENABLED']
+
+    @property
+    def interval(self):
+        return self.app.config['AVATAR_GC_INTERVAL']
+
+    def flush(self):
+        try:
+            AvatarStore.collect()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def shutdown(self):
+        # Nothing is buffered; unreferenced files wait for the next run
+        pass
+
+
+avatar_gc = AvatarGarbageCollector()
@@ -0,0 +1,153 @@
+"""Background flushing helpers for per-worker write buffers and batch jobs"""
+import atexit
+import importlib
+import multiprocessing
+import os
+import threading
+import time
+from app.services.cache import cache
+
+
+class PeriodicFlusher:
+    """
+    Base class for per-worker buffers flushed by a background thread
+
+    Subclasses implement ``flush()``. The thread is started lazily on first
+    use in each process (so it survives gunicorn forking workers after the
+    app is imported), wakes every ``interval`` seconds or when ``wake()`` is
+    called, and the buffer is flushed one last time at interpreter exit.
+    Under gevent workers ``threading`` is monkey-patched and the thread is a
+    greenlet.
+    """
+
+    name = 'flusher'
+
+    def __init__(self):
+        self.app = None
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions[self.name] = self
+        atexit.register(self.shutdown)
+
+    @property
+    def interval(self):
+        raise NotImplementedError
+
+    def flush(self):
+        raise NotImplementedError
+
+    def ensure_started(self):
+        """Start the flush thread for the current process if it is not running"""
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+
+        with self._start_lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def wake(self):
+        """Ask the flush thread to flush now instead of waiting for the interval"""
+        self._wakeup.set()
+
+    def shutdown(self):
+        """Flush whatever is still buffered (called at worker exit)"""
+        try:
+            with self.app.app_context():
+                self.flush()
+        except Exception as e:
+            print(f"Error flushing {self.name} on shutdown: {e}")
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            try:
+                with self.app.app_context():
+                    self.flush()
+            except Exception as e:
+                print(f"Error in {self.name} background flush: {e}")
+
+
+def _run_offline_job(config_name, module, name):
+    """Entry point of a spawned batch job process"""
+    from app import create_app
+
+    app = create_app(config_name)
+    job = getattr(importlib.import_module(module), name)
+    with app.app_context():
+        job.run()
+
+
+class OfflineJob(PeriodicFlusher):
+    """
+    Periodic CPU-bound batch job (matrix products, model training) run in
+    a child process
+
+    Run in a web worker, such a job would hold the GIL, and under gevent the
+    hub, for its whole run. Each interval the worker only checks ``due()``;
+    if the job is due, it spawns a fresh process that creates its own app
+    and calls ``run()``, then polls the child with sleeps (greenlet sleeps
+    under gevent) until it exits. Only the worker that takes the shared
+    ``offline_job:<name>`` cache lock spawns the child, so with several
+    workers (and the redis cache) the job runs once, not once per worker.
+    The same ``run()`` can be scheduled from cron through ``db_manager.py``
+    with the job disabled. Subclasses are module-level singletons named
+    ``name`` so the child can look them up.
+    """
+
+    # Seconds between checks on whether the child process has exited
+    poll_interval = 1.0
+
+    @property
+    def lock_ttl(self):
+        """Seconds the run lock is held at most (a worker dying mid-run frees it then)"""
+        return self.interval
+
+    def due(self):
+        """Whether the job should run now (checked in the worker; must be cheap)"""
+        return True
+
+    def run(self):
+        """The batch work, called in the child process inside an app context"""
+        raise NotImplementedError
+
+    def flush(self):
+        if not self.due():
+            return
+
+        lock = f'offline_job:{self.name}'
+        if not cache.add(lock, os.getpid(), self.lock_ttl):
+            return
+        try:
+            # Another worker may have finished a run between due() and taking the lock
+            if self.due():
+                self._spawn()
+        finally:
+            cache.delete(lock)
+
+    def _spawn(self):
+        """Run the job in a child process and wait for it to exit"""
+        process = multiprocessing.get_context('spawn').Process(
+            target=_run_offline_job,
+            args=(self.app.config['CONFIG_NAME'], type(self).__module__, self.name),
+            name=self.name,
+            daemon=True
+        )
+        process.start()
+        while process.is_alive():
+            time.sleep(self.poll_interval)
+        process.join()
+        if process.exitcode != 0:
+            raise RuntimeError(f"{self.name} child process exited with code {process.exitcode}")
+
+    def shutdown(self):
+        # Nothing is buffered; a worker exiting does not need a last run
+        pass
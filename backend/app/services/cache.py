@@ -0,0 +1,232 @@
+"""Key-value cache with an in-process LRU and a Redis-compatible backend"""
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+class MemoryBackend:
+    """
+    Thread-safe in-process LRU cache
+
+    Entries are evicted least-recently-used first once ``max_entries`` is
+    reached, and expire after their TTL. Each worker process has its own
+    copy, so with several workers a value can lag writes made in other
+    workers by up to its TTL.
+    """
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._data = OrderedDict()  # key -> (value, expires_at or None)
+
+    def _live(self, key, now):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        if item[1] is not None and item[1] <= now:
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return item
+
+    def get(self, key):
+        with self._lock:
+            item = self._live(key, time.monotonic())
+            return item[0] if item else None
+
+    def get_many(self, keys):
+        with self._lock:
+            now = time.monotonic()
+            items = [self._live(key, now) for key in keys]
+            return [item[0] if item else None for item in items]
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl if ttl else None)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def add(self, key, value, ttl=None):
+        with self._lock:
+            if self._live(key, time.monotonic()) is not None:
+                return False
+            self._data[key] = (value, time.monotonic() + ttl if ttl else None)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+            return True
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def incr(self, key, delta=1, minimum=None):
+        with self._lock:
+            item = self._live(key, time.monotonic())
+            if item is None:
+                return None
+            value = item[0] + delta
+            if minimum is not None:
+                value = max(value, minimum)
+            self._data[key] = (value, item[1])
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+# Adjust a counter only if it is cached, so a missing key is never mistaken for zero
+_INCR_SCRIPT = """
+if redis.call('exists', KEYS[1]) == 0 then return nil end
+local value = redis.call('incrby', KEYS[1], ARGV[1])
+if ARGV[2] ~= '' and value < tonumber(ARGV[2]) then
+  value = tonumber(ARGV[2])
+  redis.call('set', KEYS[1], value, 'KEEPTTL')
+end
+return value
+"""
+
+
+class RedisBackend:
+    """
+    Cache shared by all workers, stored in Redis (or anything speaking its
+    protocol, e.g. fakeredis for local runs)
+
+    Values are stored as JSON; integers are stored as plain numbers so they
+    can be adjusted atomically with ``incr``.
+    """
+
+    def __init__(self, client, prefix='socialmusic:'):
+        self.client = client
+        self.prefix = prefix
+        self._incr = client.register_script(_INCR_SCRIPT)
+
+    def _key(self, key):
+        return self.prefix + key
+
+    def get(self, key):
+        raw = self.client.get(self._key(key))
+        return json.loads(raw) if raw is not None else None
+
+    def get_many(self, keys):
+        if not keys:
+            return []
+        return [json.loads(raw) if raw is not None else None
+                for raw in self.client.mget([self._key(key) for key in keys])]
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self._key(key), json.dumps(value, ensure_ascii=False), ex=int(ttl) if ttl else None)
+
+    def add(self, key, value, ttl=None):
+        return bool(self.client.set(self._key(key), json.dumps(value, ensure_ascii=False),
+                                    ex=int(ttl) if ttl else None, nx=True))
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*[self._key(key) for key in keys])
+
+    def incr(self, key, delta=1, minimum=None):
+        value = self._incr(keys=[self._key(key)], args=[delta, '' if minimum is None else minimum])
+        return int(value) if value is not None else None
+
+    def clear(self):
+        for key in self.client.scan_iter(match=self.prefix + '*'):
+            self.client.delete(key)
+
+
+class Cache:
+    """
+    Application cache, configured by ``CACHE_BACKEND``
+
+      - ``memory`` (default): per-worker LRU (``CACHE_MAX_ENTRIES``)
+      - ``redis``: shared Redis at ``CACHE_REDIS_URL`` (requires the
+        ``redis`` package)
+
+    Cache errors never fail a request: reads fall back to a miss and writes
+    are skipped, so callers always have the database as the source of truth.
+    """
+
+    name = 'cache'
+
+    def __init__(self):
+        self.app = None
+        self.backend = None
+
+    def init_app(self, app, backend=None):
+        self.app = app
+        app.extensions[self.name] = self
+        self.backend = backend or self._create_backend(app.config)
+
+    @staticmethod
+    def _create_backend(config):
+        if config['CACHE_BACKEND'] == 'redis':
+            import redis
+            return RedisBackend(redis.Redis.from_url(config['CACHE_REDIS_URL']))
+        return MemoryBackend(config['CACHE_MAX_ENTRIES'])
+
+    def get(self, key):
+        try:
+            return self.backend.get(key)
+        except Exception as e:
+            print(f"Cache get error: {e}")
+            return None
+
+    def get_many(self, keys):
+        """Values of several keys in one round trip (None for each miss)"""
+        try:
+            return self.backend.get_many(keys)
+        except Exception as e:
+            print(f"Cache get error: {e}")
+            return [None] * len(keys)
+
+    def set(self, key, value, ttl=None):
+        try:
+            self.backend.set(key, value, ttl)
+        except Exception as e:
+            print(f"Cache set error: {e}")
+
+    def add(self, key, value, ttl=None):
+        """
+        Set a key only if it is not set yet (a lock shared by every worker
+        with the redis backend)
+
+        Returns:
+            True if the key was set; also True on a cache error, so a broken
+            cache does not stop the caller
+        """
+        try:
+            return self.backend.add(key, value, ttl)
+        except Exception as e:
+            print(f"Cache add error: {e}")
+            return True
+
+    def delete(self, *keys):
+        try:
+            self.backend.delete(*keys)
+        except Exception as e:
+            print(f"Cache delete error: {e}")
+
+    def incr(self, key, delta=1, minimum=None):
+        """
+        Adjust a cached integer
+
+        Returns:
+            The new value, or None if the key is not cached (it is not created)
+        """
+        try:
+            return self.backend.incr(key, delta, minimum)
+        except Exception as e:
+            print(f"Cache incr error: {e}")
+            # The cached value may now be wrong; drop it so the next read recomputes
+            self.delete(key)
+            return None
+
+    def clear(self):
+        self.backend.clear()
+
+
+cache = Cache()
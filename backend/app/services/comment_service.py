@@ -0,0 +1,65 @@
+"""Comment thread loading"""
+from collections import namedtuple
+from sqlalchemy import func, select
+from sqlalchemy.orm import aliased, joinedload
+from app.extensions import db
+from app.models.social import Comment
+from app.utils.pagination import encode_cursor
+
+# Replies shown under each top-level comment before "load more"
+REPLIES_PER_COMMENT = 3
+MAX_REPLIES_PER_COMMENT = 20
+
+Thread = namedtuple('Thread', ['replies', 'reply_count', 'next_cursor'])
+
+
+class CommentService:
+    """Service for loading comment threads"""
+
+    @staticmethod
+    def first_replies(parent_ids, limit=REPLIES_PER_COMMENT):
+        """
+        Oldest replies of each parent comment, in one windowed query
+
+        Args:
+            parent_ids: Ids of the top-level comments on the page
+            limit: Replies to return per parent
+
+        Returns:
+            Dict parent_id -> Thread(replies, reply_count, next_cursor), where
+            next_cursor continues the thread in ``/comments/<id>/replies``
+        """
+        if not parent_ids:
+            return {}
+
+        ranked = select(
+            Comment,
+            func.row_number().over(
+                partition_by=Comment.parent_id,
+                order_by=(Comment.created_at, Comment.id)
+            ).label('position'),
+            func.count().over(partition_by=Comment.parent_id).label('reply_count')
+        ).where(Comment.parent_id.in_(parent_ids)).subquery()
+        reply = aliased(Comment, ranked)
+
+        rows = db.session.execute(
+            select(reply, ranked.c.reply_count).where(
+                ranked.c.position <= limit
+            ).order_by(
+                ranked.c.parent_id, ranked.c.position
+            ).options(joinedload(reply.user))
+        ).all()
+
+        threads = {}
+        for comment, reply_count in rows:
+            replies = threads.setdefault(comment.parent_id, ([], reply_count))[0]
+            replies.append(comment)
+
+        return {
+            parent_id: Thread(
+                replies,
+                reply_count,
+                encode_cursor([replies[-1].created_at, replies[-1].id]) if reply_count > len(replies) else None
+            )
+            for parent_id, (replies, reply_count) in threads.items()
+        }
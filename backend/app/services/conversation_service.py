@@ -0,0 +1,176 @@
+"""Conversation summary service for private messages"""
+from sqlalchemy import and_, case, delete, func, insert, literal, or_, select, tuple_, union_all, update
+from app.extensions import db
+from app.models.message import Conversation, Message
+from app.utils.sql import upsert_insert
+
+conversations = Conversation.__table__
+
+
+class ConversationService:
+    """Service for maintaining the denormalized ``conversations`` table
+
+    Each user has one row per conversation partner holding the latest message
+    and the number of unread messages from that partner, so the conversation
+    list is a single range scan instead of a scan over every message the user
+    ever sent or received. None of these methods commit; the caller owns the
+    transaction.
+    """
+
+    @staticmethod
+    def record_message(message):
+        """Make a newly sent message the latest one of both participants' rows"""
+        sides = (
+            (message.sender_id, message.receiver_id, 0),
+            (message.receiver_id, message.sender_id, 0 if message.is_read else 1),
+        )
+        for user_id, partner_id, unread in sides:
+            ConversationService._upsert(user_id, partner_id, message, unread)
+
+    @staticmethod
+    def _upsert(user_id, partner_id, message, unread):
+        dialect_insert = upsert_insert()
+        if dialect_insert is not None:
+            statement = dialect_insert(conversations).values(
+                user_id=user_id,
+                partner_id=partner_id,
+                last_message_id=message.id,
+                last_message_at=message.created_at,
+                unread_count=unread
+            )
+            db.session.execute(statement.on_conflict_do_update(
+                index_elements=['user_id', 'partner_id'],
+                set_={
+                    'last_message_id': statement.excluded.last_message_id,
+                    'last_message_at': statement.excluded.last_message_at,
+                    'unread_count': conversations.c.unread_count + statement.excluded.unread_count,
+                }
+            ))
+            return
+
+        result = db.session.execute(
+            update(conversations).where(
+                conversations.c.user_id == user_id,
+                conversations.c.partner_id == partner_id
+            ).values(
+                last_message_id=message.id,
+                last_message_at=message.created_at,
+                unread_count=conversations.c.unread_count + unread
+            )
+        )
+        if result.rowcount == 0:
+            db.session.execute(insert(conversations).values(
+                user_id=user_id,
+                partner_id=partner_id,
+                last_message_id=message.id,
+                last_message_at=message.created_at,
+                unread_count=unread
+            ))
+
+    @staticmethod
+    def mark_read(user_id, partner_id, count=None):
+        """
+        Lower the unread count of a user's conversation with a partner
+
+        Args:
+            count: Number of messages just marked as read (default: all)
+        """
+        unread = 0
+        if count is not None:
+            unread = case(
+                (conversations.c.unread_count > count, conversations.c.unread_count - count),
+                else_=0
+            )
+
+        db.session.execute(
+            update(conversations).where(
+                conversations.c.user_id == user_id,
+                conversations.c.partner_id == partner_id
+            ).values(unread_count=unread)
+        )
+
+    @staticmethod
+    def _summaries(pairs=None):
+        """
+        Select (user_id, partner_id, last_message_id, last_message_at, unread_count)
+        for every conversation, aggregated from ``messages`` in one pass
+
+        Args:
+            pairs: Only these (user_id, partner_id) conversations (default: all)
+        """
+        # Every message appears once in the sender's and once in the receiver's conversation
+        sent = select(
+            Message.sender_id.label('user_id'),
+            Message.receiver_id.label('partner_id'),
+            Message.id.label('message_id'),
+            Message.created_at.label('created_at'),
+            literal(0).label('unread')
+        )
+        received = select(
+            Message.receiver_id.label('user_id'),
+            Message.sender_id.label('partner_id'),
+            Message.id.label('message_id'),
+            Message.created_at.label('created_at'),
+            case((Message.is_read.is_(False), 1), else_=0).label('unread')
+        )
+        if pairs is not None:
+            sent = sent.where(tuple_(Message.sender_id, Message.receiver_id).in_(pairs))
+            received = received.where(tuple_(Message.receiver_id, Message.sender_id).in_(pairs))
+        sides = union_all(sent, received).subquery()
+
+        partition = (sides.c.user_id, sides.c.partner_id)
+        ranked = select(
+            sides.c.user_id,
+            sides.c.partner_id,
+            sides.c.message_id,
+            sides.c.created_at,
+            func.row_number().over(
+                partition_by=partition,
+                order_by=(sides.c.created_at.desc(), sides.c.message_id.desc())
+            ).label('position'),
+            func.sum(sides.c.unread).over(partition_by=partition).label('unread_count')
+        ).subquery()
+
+        return select(
+            ranked.c.user_id,
+            ranked.c.partner_id,
+            ranked.c.message_id,
+            ranked.c.created_at,
+            ranked.c.unread_count
+        ).where(ranked.c.position == 1)
+
+    @staticmethod
+    def refresh(user_id, partner_id):
+        """Recompute both rows of one conversation, e.g. after a message was deleted"""
+        pairs = [(user_id, partner_id), (partner_id, user_id)]
+        db.session.execute(
+            delete(conversations).where(
+                or_(*[
+                    and_(conversations.c.user_id == a, conversations.c.partner_id == b)
+                    for a, b in pairs
+                ])
+            )
+        )
+        db.session.execute(
+            insert(conversations).from_select(
+                ['user_id', 'partner_id', 'last_message_id', 'last_message_at', 'unread_count'],
+                ConversationService._summaries(pairs)
+            )
+        )
+
+    @staticmethod
+    def rebuild():
+        """
+        Rebuild every conversation row from ``messages``
+
+        Returns:
+            Number of conversation rows written
+        """
+        db.session.execute(delete(conversations))
+        result = db.session.execute(
+            insert(conversations).from_select(
+                ['user_id', 'partner_id', 'last_message_id', 'last_message_at', 'unread_count'],
+                ConversationService._summaries()
+            )
+        )
+        return result.rowcount
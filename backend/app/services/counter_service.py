@@ -0,0 +1,269 @@
+"""Denormalized like/comment/follow counters"""
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import case, delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from app.extensions import db
+from app.models.log import UserBehaviorLog
+from app.models.music import Song
+from app.models.social import Comment, CommentLike, Follow, Like
+from app.models.user import User
+from app.services.background import PeriodicFlusher
+from app.services.cache import cache
+from app.services.response_cache import invalidate
+from app.services.social_graph import social_graph
+from app.utils.sql import supports_update_returning, upsert_insert
+
+songs = Song.__table__
+comments = Comment.__table__
+users = User.__table__
+
+
+class CounterService:
+    """Service for keeping ``like_count``/``comment_count`` and the users'
+    ``followers_count``/``following_count`` columns in step
+
+    Likes are inserted with ON CONFLICT DO NOTHING and counters are moved
+    with a single ``UPDATE ... SET n = n + delta RETURNING n``, so concurrent
+    requests neither double count nor lose updates and no write runs a
+    ``COUNT(*)``. ``reconcile`` recomputes every counter in bulk to repair
+    any drift (e.g. rows removed by cascades) and restores play counts lost
+    from a worker's play buffer. None of these methods commit except
+    ``reconcile``.
+    """
+
+    @staticmethod
+    def _insert_once(model, **values):
+        """Insert a row unless it violates a unique constraint; returns whether it was inserted"""
+        dialect_insert = upsert_insert()
+        if dialect_insert is not None:
+            result = db.session.execute(dialect_insert(model).values(**values).on_conflict_do_nothing())
+            return result.rowcount == 1
+
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(model).values(**values))
+            return True
+        except IntegrityError:
+            return False
+
+    @staticmethod
+    def _adjust(table, row_id, column, delta, touch=True):
+        """
+        Atomically add delta to a counter (never below zero); returns the new value
+
+        Args:
+            touch: Whether the row's ``updated_at`` moves with the counter
+        """
+        counter = table.c[column]
+        values = {column: case((counter + delta < 0, 0), else_=counter + delta)}
+        if not touch:
+            values['updated_at'] = table.c.updated_at
+        statement = update(table).where(table.c.id == row_id).values(values)
+
+        if supports_update_returning():
+            return db.session.execute(statement.returning(counter)).scalar()
+
+        db.session.execute(statement)
+        return db.session.scalar(select(counter).where(table.c.id == row_id))
+
+    @staticmethod
+    def like_song(user_id, song_id):
+        """
+        Like a song
+
+        Returns:
+            (liked, like_count): liked is False if the like already existed
+        """
+        if not CounterService._insert_once(Like, user_id=user_id, song_id=song_id):
+            return False, db.session.scalar(select(Song.like_count).where(Song.id == song_id))
+        return True, CounterService._adjust(songs, song_id, 'like_count', 1)
+
+    @staticmethod
+    def unlike_song(user_id, song_id):
+        """
+        Remove a like
+
+        Returns:
+            (removed, like_count): removed is False if there was no like
+        """
+        result = db.session.execute(delete(Like).where(Like.user_id == user_id, Like.song_id == song_id))
+        if result.rowcount == 0:
+            return False, db.session.scalar(select(Song.like_count).where(Song.id == song_id))
+        return True, CounterService._adjust(songs, song_id, 'like_count', -1)
+
+    @staticmethod
+    def comment_added(song_id):
+        """Count a new top-level comment"""
+        return CounterService._adjust(songs, song_id, 'comment_count', 1)
+
+    @staticmethod
+    def comment_removed(song_id):
+        """Uncount a deleted top-level comment"""
+        return CounterService._adjust(songs, song_id, 'comment_count', -1)
+
+    @staticmethod
+    def like_comment(user_id, comment_id):
+        """
+        Like a comment
+
+        Returns:
+            (liked, like_count): liked is False if the like already existed
+        """
+        if not CounterService._insert_once(CommentLike, user_id=user_id, comment_id=comment_id):
+            return False, db.session.scalar(select(Comment.like_count).where(Comment.id == comment_id))
+        return True, CounterService._adjust(comments, comment_id, 'like_count', 1)
+
+    @staticmethod
+    def unlike_comment(user_id, comment_id):
+        """
+        Remove a comment like
+
+        Returns:
+            (removed, like_count): removed is False if there was no like
+        """
+        result = db.session.execute(
+            delete(CommentLike).where(CommentLike.user_id == user_id, CommentLike.comment_id == comment_id)
+        )
+        if result.rowcount == 0:
+            return False, db.session.scalar(select(Comment.like_count).where(Comment.id == comment_id))
+        return True, CounterService._adjust(comments, comment_id, 'like_count', -1)
+
+    @staticmethod
+    def follow(follower_id, following_id):
+        """
+        Follow a user
+
+        Returns:
+            False if already following, True otherwise
+        """
+        if not CounterService._insert_once(Follow, follower_id=follower_id, following_id=following_id):
+            return False
+        CounterService._adjust(users, following_id, 'followers_count', 1, touch=False)
+        CounterService._adjust(users, follower_id, 'following_count', 1, touch=False)
+        social_graph.stage(follower_id, following_id, True)
+        return True
+
+    @staticmethod
+    def unfollow(follower_id, following_id):
+        """
+        Unfollow a user
+
+        Returns:
+            False if not following, True otherwise
+        """
+        result = db.session.execute(
+            delete(Follow).where(Follow.follower_id == follower_id, Follow.following_id == following_id)
+        )
+        if result.rowcount == 0:
+            return False
+        CounterService._adjust(users, following_id, 'followers_count', -1, touch=False)
+        CounterService._adjust(users, follower_id, 'following_count', -1, touch=False)
+        social_graph.stage(follower_id, following_id, False)
+        return True
+
+    @staticmethod
+    def reconcile():
+        """
+        Recompute every counter from the source tables, fix the ones that
+        drifted, and commit
+
+        Returns:
+            Number of rows corrected per counter
+        """
+        song_likes = select(func.count()).where(Like.song_id == songs.c.id).scalar_subquery()
+        song_comments = select(func.count()).where(
+            Comment.song_id == songs.c.id, Comment.parent_id.is_(None)
+        ).scalar_subquery()
+        comment_likes = select(func.count()).where(CommentLike.comment_id == comments.c.id).scalar_subquery()
+        followers = select(func.count()).where(Follow.following_id == users.c.id).scalar_subquery()
+        following = select(func.count()).where(Follow.follower_id == users.c.id).scalar_subquery()
+
+        fixed = {}
+        for name, table, column, actual in (
+            ('song_likes', songs, 'like_count', song_likes),
+            ('song_comments', songs, 'comment_count', song_comments),
+            ('comment_likes', comments, 'like_count', comment_likes),
+            ('followers', users, 'followers_count', followers),
+            ('following', users, 'following_count', following),
+        ):
+            values = {column: actual}
+            if 'updated_at' in table.c:
+                # A repaired counter is not a content change
+                values['updated_at'] = table.c.updated_at
+            result = db.session.execute(
+                update(table).where(table.c[column] != actual).values(values)
+            )
+            fixed[name] = result.rowcount
+
+        fixed['song_plays'] = CounterService._reconcile_play_counts()
+
+        db.session.commit()
+        if fixed['song_likes'] or fixed['song_comments'] or fixed['song_plays']:
+            invalidate('songs')
+        return fixed
+
+    @staticmethod
+    def _reconcile_play_counts():
+        """
+        Raise ``play_count`` to the number of logged plays where it fell behind
+
+        Increments still buffered in a worker when it crashed are lost, but
+        their plays are in the behavior log. Counts are only raised, never
+        lowered: seeded counts predate the log and the log sink may drop rows
+        under load. Plays newer than ``PLAY_COUNT_RECONCILE_GRACE`` may still
+        be buffered and are left out, so they are not counted twice.
+        """
+        horizon = datetime.utcnow() - timedelta(seconds=current_app.config['PLAY_COUNT_RECONCILE_GRACE'])
+        logged = select(
+            UserBehaviorLog.song_id,
+            func.count().label('plays')
+        ).where(
+            UserBehaviorLog.action_type == 'play',
+            UserBehaviorLog.song_id.isnot(None),
+            UserBehaviorLog.created_at < horizon
+        ).group_by(UserBehaviorLog.song_id).subquery()
+
+        result = db.session.execute(
+            update(songs).where(
+                songs.c.id == logged.c.song_id,
+                songs.c.play_count < logged.c.plays
+            ).values(play_count=logged.c.plays, updated_at=songs.c.updated_at)
+        )
+        return result.rowcount
+
+
+class CounterReconciler(PeriodicFlusher):
+    """Background thread running ``CounterService.reconcile`` every ``COUNTER_RECONCILE_INTERVAL``"""
+
+    name = 'counter_reconciler'
+
+    @property
+    def enabled(self):
+        return self.app.config['COUNTER_RECONCILE_ENABLED']
+
+    @property
+    def interval(self):
+        return self.app.config['COUNTER_RECONCILE_INTERVAL']
+
+    def flush(self):
+        # With a shared cache only one worker per interval does the work
+        last_run = cache.get('counters:reconciled_at')
+        if last_run is not None and time.time() - last_run < self.interval / 2:
+            return
+        cache.set('counters:reconciled_at', time.time())
+
+        try:
+            fixed = CounterService.reconcile()
+        except Exception:
+            db.session.rollback()
+            raise
+        if any(fixed.values()):
+            print(f"Reconciled drifted counters: {fixed}")
+
+    def shutdown(self):
+        pass
+
+
+counter_reconciler = CounterReconciler()
@@ -0,0 +1,177 @@
+"""Friends activity timeline service (fan-out on write)"""
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import delete, func, insert, literal, select, true, tuple_, union_all
+from app.extensions import db
+from app.models.feed import FeedItem
+from app.models.log import UserBehaviorLog
+from app.models.social import Follow
+
+# Behavior log actions that show up in friends' timelines
+FEED_ACTIONS = ('play', 'like')
+
+
+class FeedService:
+    """Service for maintaining materialized per-user timelines
+
+    Every play/like is copied into the timeline of each follower when it
+    happens, so reading the friends feed is a single range scan over
+    ``feed_items`` for one owner instead of an ``IN (...)`` scan over the
+    whole behavior log. None of these methods commit; the caller owns the
+    transaction.
+    """
+
+    @staticmethod
+    def max_items():
+        """Maximum number of timeline entries kept per user"""
+        return current_app.config['FEED_MAX_ITEMS']
+
+    @staticmethod
+    def push_activity(actor_id, action_type, song_id, created_at=None):
+        """Fan an activity out to the timelines of all the actor's followers"""
+        FeedService.push_activities(actor_id, [(action_type, song_id, created_at or datetime.utcnow())])
+
+    @staticmethod
+    def push_activities(actor_id, activities):
+        """
+        Fan several activities of one actor out with a single INSERT ... SELECT
+
+        Timelines are not trimmed here: that would rank every follower's
+        timeline on each play. Reads are bounded by ``cap_filter`` and the
+        excess rows are deleted by ``db_manager.py --trim-feeds`` (cron).
+
+        Args:
+            activities: (action_type, song_id, created_at) tuples; entries
+                        that do not belong in timelines are skipped
+        """
+        activities = [
+            select(
+                literal(action_type).label('action_type'),
+                literal(song_id).label('song_id'),
+                literal(created_at, db.DateTime).label('created_at')
+            )
+            for action_type, song_id, created_at in activities
+            if action_type in FEED_ACTIONS and song_id
+        ]
+        if not activities:
+            return
+
+        activity = union_all(*activities).subquery() if len(activities) > 1 else activities[0].subquery()
+        followers = select(
+            Follow.follower_id,
+            literal(actor_id),
+            activity.c.action_type,
+            activity.c.song_id,
+            activity.c.created_at
+        ).join(activity, true()).where(Follow.following_id == actor_id)
+
+        db.session.execute(
+            insert(FeedItem).from_select(
+                ['owner_id', 'actor_id', 'action_type', 'song_id', 'created_at'],
+                followers
+            )
+        )
+
+    @staticmethod
+    def cap_filter(owner_id):
+        """
+        Filter restricting a timeline query to the owner's newest ``FEED_MAX_ITEMS`` entries
+
+        Returns None when the timeline is within the cap. Used for both page
+        and cursor pagination, so a timeline never reads past the cap even
+        before a trim has caught up.
+        """
+        boundary = db.session.execute(
+            select(FeedItem.created_at, FeedItem.id)
+            .where(FeedItem.owner_id == owner_id)
+            .order_by(FeedItem.created_at.desc(), FeedItem.id.desc())
+            .offset(FeedService.max_items() - 1)
+            .limit(1)
+        ).first()
+        if boundary is None:
+            return None
+        return tuple_(FeedItem.created_at, FeedItem.id) >= tuple_(*boundary)
+
+    @staticmethod
+    def _recent_activity(actor_ids, owner_id):
+        """Select the newest feed-worthy log rows of the given actors for an owner"""
+        return select(
+            literal(owner_id),
+            UserBehaviorLog.user_id,
+            UserBehaviorLog.action_type,
+            UserBehaviorLog.song_id,
+            UserBehaviorLog.created_at
+        ).where(
+            UserBehaviorLog.user_id.in_(actor_ids),
+            UserBehaviorLog.action_type.in_(FEED_ACTIONS),
+            UserBehaviorLog.song_id.isnot(None)
+        ).order_by(
+            UserBehaviorLog.created_at.desc()
+        ).limit(FeedService.max_items())
+
+    @staticmethod
+    def backfill(follower_id, following_id):
+        """Copy recent activity of a newly followed user into the follower's timeline"""
+        db.session.execute(
+            insert(FeedItem).from_select(
+                ['owner_id', 'actor_id', 'action_type', 'song_id', 'created_at'],
+                FeedService._recent_activity([following_id], follower_id)
+            )
+        )
+        FeedService.trim([follower_id])
+
+    @staticmethod
+    def purge(follower_id, following_id):
+        """Remove an unfollowed user's activity from the follower's timeline"""
+        db.session.execute(
+            delete(FeedItem).where(
+                FeedItem.owner_id == follower_id,
+                FeedItem.actor_id == following_id
+            )
+        )
+
+    @staticmethod
+    def rebuild(owner_id):
+        """Rebuild a user's timeline from scratch out of the behavior log"""
+        db.session.execute(delete(FeedItem).where(FeedItem.owner_id == owner_id))
+
+        following_ids = select(Follow.following_id).where(Follow.follower_id == owner_id)
+        db.session.execute(
+            insert(FeedItem).from_select(
+                ['owner_id', 'actor_id', 'action_type', 'song_id', 'created_at'],
+                FeedService._recent_activity(following_ids, owner_id)
+            )
+        )
+
+    @staticmethod
+    def trim(owner_ids=None):
+        """Drop timeline entries beyond the per-user cap
+
+        Only timelines that actually exceed the cap are ranked.
+
+        Args:
+            owner_ids: Only trim these users' timelines, as a list or a
+                       select of ids (default: everyone)
+        """
+        over_cap = select(FeedItem.owner_id).group_by(FeedItem.owner_id).having(
+            func.count() > FeedService.max_items()
+        )
+        if owner_ids is not None:
+            over_cap = over_cap.where(FeedItem.owner_id.in_(owner_ids))
+
+        ranked = select(
+            FeedItem.id,
+            func.row_number().over(
+                partition_by=FeedItem.owner_id,
+                order_by=(FeedItem.created_at.desc(), FeedItem.id.desc())
+            ).label('position')
+        ).where(FeedItem.owner_id.in_(over_cap)).subquery()
+
+        result = db.session.execute(
+            delete(FeedItem).where(
+                FeedItem.id.in_(
+                    select(ranked.c.id).where(ranked.c.position > FeedService.max_items())
+                )
+            ).execution_options(synchronize_session=False)
+        )
+        return result.rowcount
@@ -0,0 +1,102 @@
+"""Follower/following lists and follow edge checks"""
+from sqlalchemy import and_, exists, func, or_, select
+from app.extensions import db
+from app.models.social import Follow
+from app.models.user import User
+from app.services.social_graph import social_graph
+from app.utils.avatars import avatar_srcset
+
+# Rows fetched per round trip while streaming a full list
+STREAM_BATCH_SIZE = 500
+
+USER_FIELDS = ('id', 'username', 'nickname', 'avatar_url', 'bio')
+
+
+class FollowService:
+    """Service for listing followers/following with the users joined in"""
+
+    @staticmethod
+    def list_query(user_id, direction):
+        """
+        Query the users on one side of a user's follow edges as flat rows
+
+        Args:
+            user_id: Whose list
+            direction: 'followers' (users following user_id) or
+                       'following' (users user_id follows)
+
+        Rows carry the user fields plus ``followed_at`` and ``follow_id``,
+        and are ordered/paginated by (Follow.created_at, Follow.id).
+        """
+        if direction == 'followers':
+            owner, other = Follow.following_id, Follow.follower_id
+        else:
+            owner, other = Follow.follower_id, Follow.following_id
+
+        columns = [getattr(User, field) for field in USER_FIELDS]
+        return db.session.query(
+            *columns, Follow.created_at.label('followed_at'), Follow.id.label('follow_id')
+        ).select_from(Follow).join(User, User.id == other).filter(owner == user_id)
+
+    @staticmethod
+    def is_following(follower_id, following_id):
+        """
+        Whether follower_id follows following_id, read from the database
+
+        Single edge checks (and anything authorizing an action) go to the
+        ``unique_follow`` index rather than the in-memory social graph, which
+        may lag follows committed by other workers.
+        """
+        return db.session.scalar(select(exists().where(
+            Follow.follower_id == follower_id, Follow.following_id == following_id
+        )))
+
+    @staticmethod
+    def is_mutual(user_id, other_id):
+        """Whether the two users follow each other, read from the database"""
+        edges = db.session.scalar(select(func.count()).select_from(Follow).where(or_(
+            and_(Follow.follower_id == user_id, Follow.following_id == other_id),
+            and_(Follow.follower_id == other_id, Follow.following_id == user_id)
+        )))
+        return edges == 2
+
+    @staticmethod
+    def following_ids(viewer_id, user_ids):
+        """
+        Which of the given users the viewer follows, answered from the
+        in-memory social graph
+
+        Returns:
+            Set of followed user ids
+        """
+        if viewer_id is None:
+            return set()
+        return social_graph.following_ids(viewer_id, user_ids)
+
+    @staticmethod
+    def to_dicts(rows, viewer_id=None):
+        """Serialize list rows, adding ``is_following`` for the viewer"""
+        followed = FollowService.following_ids(viewer_id, [row.id for row in rows])
+        return [
+            {
+                **{field: getattr(row, field) for field in USER_FIELDS},
+                'avatar_srcset': avatar_srcset(row.avatar_url),
+                'followed_at': row.followed_at.isoformat(),
+                'is_following': row.id in followed,
+            }
+            for row in rows
+        ]
+
+    @staticmethod
+    def iter_dicts(query, viewer_id=None):
+        """
+        Yield every row of a list query serialized, fetching and checking
+        ``is_following`` in batches of ``STREAM_BATCH_SIZE`` instead of
+        loading the whole list
+        """
+        result = db.session.execute(
+            query.order_by(Follow.created_at.desc(), Follow.id.desc()).statement,
+            execution_options={'yield_per': STREAM_BATCH_SIZE}
+        )
+        for rows in result.partitions():
+            yield from FollowService.to_dicts(rows, viewer_id)
@@ -0,0 +1,40 @@
+"""Song like lookups"""
+from sqlalchemy import select
+from app.extensions import db
+from app.models.social import Like
+
+# Most song ids accepted in one like-status lookup
+MAX_LIKE_STATUS_IDS = 100
+
+
+class LikeService:
+    """Service for checking which songs a user has liked"""
+
+    @staticmethod
+    def liked_song_ids(user_id, song_ids):
+        """
+        Which of the given songs the user has liked, in one IN query on the
+        (user_id, song_id) unique index
+
+        Returns:
+            Set of liked song ids
+        """
+        song_ids = set(song_ids)
+        if not song_ids:
+            return set()
+
+        return set(db.session.scalars(
+            select(Like.song_id).where(Like.user_id == user_id, Like.song_id.in_(song_ids))
+        ))
+
+    @staticmethod
+    def embed_like_status(data, user_id):
+        """Add ``is_liked`` to every song of a response payload (``songs`` list or ``song``)"""
+        songs = list(data.get('songs') or [])
+        if isinstance(data.get('song'), dict):
+            songs.append(data['song'])
+
+        liked = LikeService.liked_song_ids(user_id, [song['id'] for song in songs])
+        for song in songs:
+            song['is_liked'] = song['id'] in liked
+        return data
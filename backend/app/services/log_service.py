@@ -3,6 +3,8 @@ from datetime import datetime
 from flask import request
 from app.extensions import db
 from app.models.log import UserBehaviorLog
+from app.services.feed_service import FeedService, FEED_ACTIONS
+from app.services.log_sink import behavior_log_sink
 
 
 class LogService:
@@ -24,18 +26,28 @@ class LogService:
             user_agent = request.headers.get('User-Agent') if request else None
 
             # 创建日志记录
-            log = UserBehaviorLog(
-                user_id=user_id,
-                action_type=action_type,
-                song_id=kwargs.get('song_id'),
-                artist_id=kwargs.get('artist_id'),
-                duration=kwargs.get('duration'),
-                extra_data=kwargs.get('metadata', {}),
-                ip_address=ip_address,
-                user_agent=user_agent
-            )
-
-            db.session.add(log)
+            row = {
+                'user_id': user_id,
+                'action_type': action_type,
+                'song_id': kwargs.get('song_id'),
+                'artist_id': kwargs.get('artist_id'),
+                'duration': kwargs.get('duration'),
+                'extra_data': kwargs.get('metadata', {}),
+                'ip_address': ip_address,
+                'user_agent': user_agent,
+                'created_at': datetime.utcnow()
+            }
+
+            # 异步批量写入：只入队，由后台线程批量插入（不提交调用方的会话）
+            if behavior_log_sink.enabled:
+                return behavior_log_sink.submit(row)
+
+            db.session.add(UserBehaviorLog(**row))
+
+            # 播放/点赞写入时同步扩散到粉丝的时间线，与日志同一事务提交
+            if action_type in FEED_ACTIONS:
+                FeedService.push_activity(user_id, action_type, row['song_id'], row['created_at'])
+
             db.session.commit()
 
             return True
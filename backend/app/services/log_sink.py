@@ -0,0 +1,193 @@
+"""Asynchronous batched sink for user behavior logs"""
+import json
+import os
+import queue
+import threading
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import insert
+from sqlalchemy.exc import OperationalError
+from app.extensions import db
+from app.models.log import UserBehaviorLog
+from app.services.background import PeriodicFlusher
+from app.services.feed_service import FeedService, FEED_ACTIONS
+
+# What to do with an event when the queue is full
+POLICY_DROP = 'drop'    # discard the event
+POLICY_BLOCK = 'block'  # wait up to LOG_SINK_BLOCK_TIMEOUT for room, then discard
+POLICY_SPILL = 'spill'  # append the event to LOG_SINK_SPILL_PATH, replayed on a later flush
+
+
+class BehaviorLogSink(PeriodicFlusher):
+    """
+    Per-worker bounded queue of behavior log rows written in bulk
+
+    Requests only enqueue a row; a background thread drains the queue every
+    ``LOG_SINK_FLUSH_INTERVAL`` seconds (or as soon as ``LOG_SINK_BATCH_SIZE``
+    rows are waiting) with one executemany INSERT per batch, fanning play/like
+    rows out to followers' timelines in the same transaction (one INSERT ...
+    SELECT per actor). When a batch is rejected because of its data, it is
+    bisected and retried so only the offending rows are dropped; when the
+    database itself is unavailable the whole batch is dropped or spilled.
+    """
+
+    name = 'behavior_log_sink'
+
+    def __init__(self):
+        super().__init__()
+        self._queue = None
+        self._stats_lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self._stats = {'queued': 0, 'flushed': 0, 'dropped': 0, 'spilled': 0}
+
+    def init_app(self, app):
+        super().init_app(app)
+        self._queue = queue.Queue(maxsize=app.config['LOG_SINK_QUEUE_SIZE'])
+
+    @property
+    def enabled(self):
+        return self.app.config['LOG_SINK_ENABLED']
+
+    @property
+    def interval(self):
+        return self.app.config['LOG_SINK_FLUSH_INTERVAL']
+
+    def stats(self):
+        """Counters of queued/flushed/dropped/spilled events in this worker"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['pending'] = self._queue.qsize() if self._queue is not None else 0
+        return stats
+
+    def _count(self, key, n=1):
+        with self._stats_lock:
+            self._stats[key] += n
+
+    def submit(self, row):
+        """
+        Enqueue a behavior log row
+
+        Returns:
+            False if the row was dropped, True otherwise
+        """
+        self.ensure_started()
+        policy = self.app.config['LOG_SINK_POLICY']
+
+        try:
+            if policy == POLICY_BLOCK:
+                self._queue.put(row, timeout=self.app.config['LOG_SINK_BLOCK_TIMEOUT'])
+            else:
+                self._queue.put_nowait(row)
+        except queue.Full:
+            if policy == POLICY_SPILL:
+                self._spill([row])
+                return True
+            self._count('dropped')
+            return False
+
+        self._count('queued')
+        if self._queue.qsize() >= self.app.config['LOG_SINK_BATCH_SIZE']:
+            self.wake()
+        return True
+
+    def flush(self):
+        """
+        Drain the queue (and any spilled rows) into the database
+
+        Returns:
+            Number of rows written
+        """
+        if self._queue is None:
+            return 0
+
+        batch_size = self.app.config['LOG_SINK_BATCH_SIZE']
+        written = 0
+
+        spilled = self._take_spilled()
+        for start in range(0, len(spilled), batch_size):
+            written += self._write(spilled[start:start + batch_size])
+
+        while True:
+            batch = []
+            while len(batch) < batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                break
+            written += self._write(batch)
+
+        return written
+
+    def _write(self, rows):
+        try:
+            self._insert(rows)
+            db.session.commit()
+        except OperationalError as e:
+            db.session.rollback()
+            print(f"Error writing behavior logs: {e}")
+            if self.app.config['LOG_SINK_POLICY'] == POLICY_SPILL:
+                self._spill(rows)
+            else:
+                self._count('dropped', len(rows))
+            return 0
+        except Exception as e:
+            db.session.rollback()
+            if len(rows) > 1:
+                # Bad data: retry each half so only the offending rows are lost
+                middle = len(rows) // 2
+                return self._write(rows[:middle]) + self._write(rows[middle:])
+            print(f"Dropping behavior log {rows[0]}: {e}")
+            self._count('dropped')
+            return 0
+
+        self._count('flushed', len(rows))
+        return len(rows)
+
+    @staticmethod
+    def _insert(rows):
+        db.session.execute(insert(UserBehaviorLog), rows)
+
+        activities = defaultdict(list)
+        for row in rows:
+            if row['action_type'] in FEED_ACTIONS:
+                activities[row['user_id']].append((row['action_type'], row['song_id'], row['created_at']))
+        for actor_id, actor_activities in activities.items():
+            FeedService.push_activities(actor_id, actor_activities)
+
+    def _spill_path(self):
+        return self.app.config['LOG_SINK_SPILL_PATH']
+
+    def _spill(self, rows):
+        with self._spill_lock:
+            with open(self._spill_path(), 'a', encoding='utf-8') as f:
+                for row in rows:
+                    f.write(json.dumps(dict(row, created_at=row['created_at'].isoformat()), ensure_ascii=False) + '\n')
+        self._count('spilled', len(rows))
+
+    def _take_spilled(self):
+        path = self._spill_path()
+        if not os.path.exists(path):
+            return []
+
+        # Claim the file atomically so only one worker replays it
+        claimed = f'{path}.{os.getpid()}.replay'
+        with self._spill_lock:
+            try:
+                os.replace(path, claimed)
+            except OSError:
+                return []
+
+        rows = []
+        with open(claimed, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    row['created_at'] = datetime.fromisoformat(row['created_at'])
+                    rows.append(row)
+        os.remove(claimed)
+        return rows
+
+
+behavior_log_sink = BehaviorLogSink()
@@ -0,0 +1,144 @@
+"""Password hashing off the request greenlet"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+
+# Cost used when no app is configured (e.g. model use in standalone scripts)
+DEFAULT_ROUNDS = 12
+
+
+class PasswordHasherBusy(Exception):
+    """More password hashes are waiting than ``PASSWORD_HASH_MAX_QUEUE`` allows"""
+
+
+def _gevent_threadpool(size):
+    """A gevent native-thread pool if gevent has patched threading, else None"""
+    try:
+        from gevent import monkey
+        from gevent.threadpool import ThreadPool
+    except ImportError:
+        return None
+    if not monkey.is_module_patched('threading'):
+        return None
+    return ThreadPool(size)
+
+
+def _timed(fn, *args):
+    """Run fn in a pool thread, returning (result, started, finished)"""
+    started = time.monotonic()
+    result = fn(*args)
+    return result, started, time.monotonic()
+
+
+class PasswordHasher:
+    """
+    Bounded thread pool for bcrypt hashing and verification
+
+    A bcrypt call is ~250 ms of C code with no cooperative yield, so run on
+    a gevent worker's hub it freezes every greenlet of the worker, WebSocket
+    connections included. Calls are instead handed to a pool of
+    ``PASSWORD_HASH_THREADS`` native threads: gevent's ``ThreadPool`` when
+    threading is monkey-patched (only the calling greenlet waits; bcrypt
+    releases the GIL), a ``ThreadPoolExecutor`` otherwise. When more than
+    ``PASSWORD_HASH_MAX_QUEUE`` calls are already waiting, ``PasswordHasherBusy``
+    is raised instead of queueing, so a login burst fails fast with 503
+    rather than piling up requests. The pool is created lazily per process.
+    """
+
+    name = 'password_hasher'
+
+    def __init__(self):
+        self.app = None
+        self._pool = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._stats = {'pending': 0, 'max_pending': 0, 'completed': 0, 'rejected': 0,
+                       'wait_seconds': 0.0, 'run_seconds': 0.0}
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions[self.name] = self
+
+    @property
+    def rounds(self):
+        return self.app.config['BCRYPT_ROUNDS'] if self.app is not None else DEFAULT_ROUNDS
+
+    def _get_pool(self):
+        if self._pool is None or self._pid != os.getpid():
+            with self._lock:
+                if self._pool is None or self._pid != os.getpid():
+                    threads = self.app.config['PASSWORD_HASH_THREADS']
+                    self._pool = _gevent_threadpool(threads) or ThreadPoolExecutor(
+                        max_workers=threads, thread_name_prefix=self.name
+                    )
+                    self._pid = os.getpid()
+        return self._pool
+
+    def _run(self, fn, *args):
+        if self.app is None:
+            return fn(*args)
+
+        limit = self.app.config['PASSWORD_HASH_THREADS'] + self.app.config['PASSWORD_HASH_MAX_QUEUE']
+        with self._lock:
+            if self._stats['pending'] >= limit:
+                self._stats['rejected'] += 1
+                raise PasswordHasherBusy()
+            self._stats['pending'] += 1
+            self._stats['max_pending'] = max(self._stats['max_pending'], self._stats['pending'])
+
+        # Counters are only touched here, in the calling greenlet/thread, never in pool threads
+        submitted = time.monotonic()
+        try:
+            pool = self._get_pool()
+            if isinstance(pool, ThreadPoolExecutor):
+                result, started, finished = pool.submit(_timed, fn, *args).result()
+            else:
+                result, started, finished = pool.apply(_timed, (fn,) + args)
+        finally:
+            with self._lock:
+                self._stats['pending'] -= 1
+
+        with self._lock:
+            self._stats['completed'] += 1
+            self._stats['wait_seconds'] += started - submitted
+            self._stats['run_seconds'] += finished - started
+        return result
+
+    def hash(self, password):
+        """bcrypt hash of a password at the configured cost"""
+        salt = bcrypt.gensalt(rounds=self.rounds)
+        return self._run(bcrypt.hashpw, password.encode('utf-8'), salt).decode('utf-8')
+
+    def verify(self, password, password_hash):
+        """Check a password against a stored bcrypt hash"""
+        return self._run(bcrypt.checkpw, password.encode('utf-8'), password_hash.encode('utf-8'))
+
+    def needs_rehash(self, password_hash):
+        """Whether a stored hash was made with a cost other than ``BCRYPT_ROUNDS``"""
+        try:
+            return int(password_hash.split('$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+    def stats(self):
+        """Queue depth and timing of this worker's pool"""
+        with self._lock:
+            stats = dict(self._stats)
+        threads = self.app.config['PASSWORD_HASH_THREADS'] if self.app is not None else 0
+        completed = stats['completed'] or 1
+        return {
+            'backend': 'threads' if self._pool is None or isinstance(self._pool, ThreadPoolExecutor) else 'gevent',
+            'threads': threads,
+            'pending': stats['pending'],
+            'queued': max(0, stats['pending'] - threads),
+            'max_pending': stats['max_pending'],
+            'completed': stats['completed'],
+            'rejected': stats['rejected'],
+            'avg_wait_ms': round(stats.pop('wait_seconds') / completed * 1000, 2),
+            'avg_run_ms': round(stats.pop('run_seconds') / completed * 1000, 2),
+        }
+
+
+password_hasher = PasswordHasher()
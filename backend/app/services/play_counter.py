@@ -0,0 +1,120 @@
+"""Write-behind aggregation of song play counts"""
+import threading
+from collections import defaultdict
+from sqlalchemy import Integer, bindparam, column, update, values
+from app.extensions import db
+from app.models.music import Song
+from app.services.background import PeriodicFlusher
+from app.services.response_cache import invalidate, song_tag
+
+songs = Song.__table__
+
+
+class PlayCounter(PeriodicFlusher):
+    """
+    Per-worker buffer of pending ``songs.play_count`` increments
+
+    Plays are summed in memory and written in one batched UPDATE every
+    ``PLAY_COUNT_FLUSH_INTERVAL`` seconds or once ``PLAY_COUNT_FLUSH_THRESHOLD``
+    distinct songs are pending, so a popular song costs one row update per
+    flush instead of one per play. A failed flush puts its increments back
+    into the buffer, and the buffer is flushed when the worker exits. With
+    ``PLAY_COUNT_BUFFER_ENABLED`` off, increments are written through and
+    committed immediately.
+    """
+
+    name = 'play_counter'
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._pending = defaultdict(int)
+
+    @property
+    def enabled(self):
+        return self.app.config['PLAY_COUNT_BUFFER_ENABLED']
+
+    @property
+    def interval(self):
+        return self.app.config['PLAY_COUNT_FLUSH_INTERVAL']
+
+    def increment(self, song_id, delta=1):
+        """Record plays of a song"""
+        if not self.enabled:
+            db.session.execute(
+                update(songs).where(songs.c.id == song_id).values(play_count=songs.c.play_count + delta)
+            )
+            db.session.commit()
+            invalidate(song_tag(song_id))
+            return
+
+        with self._lock:
+            self._pending[song_id] += delta
+            size = len(self._pending)
+
+        self.ensure_started()
+        if size >= self.app.config['PLAY_COUNT_FLUSH_THRESHOLD']:
+            self.wake()
+
+    def pending(self, song_id):
+        """Plays of a song recorded in this worker but not yet flushed"""
+        with self._lock:
+            return self._pending.get(song_id, 0)
+
+    def flush(self, song_ids=None):
+        """
+        Write buffered increments to the database and commit
+
+        Args:
+            song_ids: Only flush these songs (default: all pending songs)
+
+        Returns:
+            Number of songs updated
+        """
+        with self._lock:
+            if song_ids is None:
+                batch, self._pending = self._pending, defaultdict(int)
+            else:
+                batch = {song_id: self._pending.pop(song_id) for song_id in song_ids if song_id in self._pending}
+
+        if not batch:
+            return 0
+
+        try:
+            self._apply(batch)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            # Keep the increments so the next flush retries them
+            with self._lock:
+                for song_id, delta in batch.items():
+                    self._pending[song_id] += delta
+            raise
+
+        # Only expire the cached responses showing the played songs
+        invalidate(*[song_tag(song_id) for song_id in batch])
+        return len(batch)
+
+    @staticmethod
+    def _apply(batch):
+        if db.session.get_bind().dialect.name == 'postgresql':
+            # UPDATE songs SET play_count = songs.play_count + v.delta
+            # FROM (VALUES ...) AS v(id, delta) WHERE songs.id = v.id
+            increments = values(
+                column('id', Integer), column('delta', Integer), name='v'
+            ).data(list(batch.items()))
+            db.session.execute(
+                update(songs).where(songs.c.id == increments.c.id).values(
+                    play_count=songs.c.play_count + increments.c.delta
+                )
+            )
+        else:
+            db.session.execute(
+                update(songs).where(songs.c.id == bindparam('song_id')).values(
+                    play_count=songs.c.play_count + bindparam('delta')
+                ),
+                [{'song_id': song_id, 'delta': delta} for song_id, delta in batch.items()]
+            )
+
+
+play_counter = PlayCounter()
@@ -0,0 +1,199 @@
+"""Token-bucket rate limiting for login attempts"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class MemoryBuckets:
+    """
+    Per-worker token buckets
+
+    Each worker keeps its own buckets, so with N workers a client gets up to
+    N times the configured rate. At most ``max_entries`` buckets are kept;
+    the least recently used is dropped first (as if it had refilled).
+    """
+
+    def __init__(self, max_entries=100000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at)
+
+    def take(self, key, capacity, rate, cost=1):
+        with self._lock:
+            now = time.monotonic()
+            tokens, updated_at = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated_at) * rate)
+            needed = max(cost, 1)
+            allowed = tokens >= needed
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_entries:
+                self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (needed - tokens) / rate
+
+    def reset(self, key):
+        with self._lock:
+            self._buckets.pop(key, None)
+
+
+# Refill, check and take from a bucket atomically, using the Redis server clock
+_TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('time')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('hmget', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local needed = math.max(cost, 1)
+local allowed = tokens >= needed
+if allowed then tokens = tokens - cost end
+redis.call('hset', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('pexpire', KEYS[1], math.ceil((capacity - tokens) / rate * 1000) + 1000)
+if allowed then return {1, '0'} end
+return {0, tostring((needed - tokens) / rate)}
+"""
+
+
+class RedisBuckets:
+    """Token buckets shared by all workers, stored as Redis hashes"""
+
+    def __init__(self, client, prefix='socialmusic:ratelimit:'):
+        self.client = client
+        self.prefix = prefix
+        self._take = client.register_script(_TAKE_SCRIPT)
+
+    def take(self, key, capacity, rate, cost=1):
+        allowed, retry_after = self._take(keys=[self.prefix + key], args=[capacity, rate, cost])
+        return bool(allowed), float(retry_after)
+
+    def reset(self, key):
+        self.client.delete(self.prefix + key)
+
+
+class LoginRateLimiter:
+    """
+    Rejects login attempts before the user lookup and bcrypt run
+
+    Two token buckets are checked per attempt, configured by
+    ``LOGIN_RATE_LIMIT_BACKEND``:
+
+      - memory (default): per-worker buckets
+      - redis: buckets shared by all workers at ``LOGIN_RATE_LIMIT_REDIS_URL``
+        (requires the ``redis`` package)
+
+    The IP bucket (``LOGIN_IP_BURST`` / ``LOGIN_IP_PER_MINUTE``) is charged
+    for every attempt. The account bucket (``LOGIN_ACCOUNT_BURST`` /
+    ``LOGIN_ACCOUNT_PER_MINUTE``) is keyed by the lower-cased identifier
+    before the lookup; once the user is known, failures are charged to both
+    the username and the email key, so switching between the two forms does
+    not reset the count. It is only charged for failed attempts and is
+    reset by a successful login, so
+    a user who mistypes a few times is not locked out, while guessing one
+    account's password from many addresses is still throttled.
+
+    Backend errors let the attempt through: a broken limiter must not lock
+    everyone out.
+    """
+
+    name = 'login_limiter'
+
+    def __init__(self):
+        self.app = None
+        self.backend = None
+        self._lock = threading.Lock()
+        self._stats = {'attempts': 0, 'rejected_ip': 0, 'rejected_account': 0,
+                       'unknown_user': 0, 'verified': 0, 'failed': 0}
+
+    def init_app(self, app, backend=None):
+        self.app = app
+        app.extensions[self.name] = self
+        self.backend = backend or self._create_backend(app.config)
+
+    @staticmethod
+    def _create_backend(config):
+        if config['LOGIN_RATE_LIMIT_BACKEND'] == 'redis':
+            import redis
+            return RedisBuckets(redis.Redis.from_url(config['LOGIN_RATE_LIMIT_REDIS_URL']))
+        return MemoryBuckets()
+
+    @property
+    def enabled(self):
+        return self.app.config['LOGIN_RATE_LIMIT_ENABLED']
+
+    def count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def stats(self):
+        """Counters of login attempts in this worker"""
+        with self._lock:
+            return dict(self._stats)
+
+    @staticmethod
+    def _account_key(identifier):
+        return f'login:account:{identifier.strip().lower()}'
+
+    @classmethod
+    def _account_keys(cls, identifier, user=None):
+        """Account bucket keys of an attempt: every login form of a known user"""
+        if user is None:
+            return [cls._account_key(identifier)]
+        return [cls._account_key(user.username), cls._account_key(user.email)]
+
+    def _take(self, key, burst, per_minute, cost=1):
+        try:
+            return self.backend.take(key, burst, per_minute / 60, cost)
+        except Exception as e:
+            print(f"Rate limiter error: {e}")
+            return True, 0.0
+
+    def check(self, ip, identifier):
+        """
+        Admit a login attempt
+
+        Returns:
+            (allowed, retry_after_seconds)
+        """
+        self.count('attempts')
+        if not self.enabled:
+            return True, 0.0
+
+        config = self.app.config
+        allowed, retry_after = self._take(f'login:ip:{ip}', config['LOGIN_IP_BURST'],
+                                          config['LOGIN_IP_PER_MINUTE'])
+        if not allowed:
+            self.count('rejected_ip')
+            return False, retry_after
+
+        # Only check the account bucket here; failures are charged by failed()
+        allowed, retry_after = self._take(self._account_key(identifier), config['LOGIN_ACCOUNT_BURST'],
+                                          config['LOGIN_ACCOUNT_PER_MINUTE'], cost=0)
+        if not allowed:
+            self.count('rejected_account')
+        return allowed, retry_after
+
+    def failed(self, identifier, user=None):
+        """Record a failed attempt against the account (``user`` is None if there is no such user)"""
+        self.count('unknown_user' if user is None else 'failed')
+        if self.enabled:
+            config = self.app.config
+            for key in self._account_keys(identifier, user):
+                self._take(key, config['LOGIN_ACCOUNT_BURST'], config['LOGIN_ACCOUNT_PER_MINUTE'])
+
+    def succeeded(self, identifier, user):
+        """Record a successful login, clearing the account's failures"""
+        self.count('verified')
+        if self.enabled:
+            try:
+                for key in self._account_keys(identifier, user):
+                    self.backend.reset(key)
+            except Exception as e:
+                print(f"Rate limiter error: {e}")
+
+
+login_limiter = LoginRateLimiter()
@@ -0,0 +1,329 @@
+"""Collaborative-filtering song recommendations"""
+import json
+import os
+import shutil
+import threading
+import time
+from flask import current_app
+from sqlalchemy import func, select
+from app.extensions import db
+from app.models.log import UserBehaviorLog
+from app.models.social import Like
+from app.services.background import OfflineJob
+
+# Implicit feedback per (user, song): plays + LIKE_WEIGHT * liked
+LIKE_WEIGHT = 4.0
+
+# ALS hyperparameters; confidence of an interaction is 1 + ALPHA * log(1 + feedback)
+FACTORS = 64
+ITERATIONS = 10
+REGULARIZATION = 0.1
+ALPHA = 10.0
+
+# How often a worker checks whether a newer model was saved
+RELOAD_CHECK_SECONDS = 30
+
+# Model versions kept on disk (older ones may still be mapped by a worker)
+KEEP_VERSIONS = 2
+
+
+def _solve_factors(confidence, fixed, regularization):
+    """
+    One half-step of implicit ALS (Hu, Koren & Volinsky): the least squares
+    factors of every row of ``confidence`` given the other side's factors
+
+    For a row u with observed columns I_u and confidences c_ui this solves
+    (Y^T Y + Y_u^T (C_u - I) Y_u + reg * I) x_u = Y_u^T c_u, reusing the
+    shared Y^T Y so each row only touches its own interactions.
+    """
+    import numpy as np
+
+    factors = fixed.shape[1]
+    gram = fixed.T @ fixed + regularization * np.eye(factors, dtype=fixed.dtype)
+    solved = np.zeros((confidence.shape[0], factors), dtype=fixed.dtype)
+    indptr, indices, data = confidence.indptr, confidence.indices, confidence.data
+
+    for row in range(confidence.shape[0]):
+        start, end = indptr[row], indptr[row + 1]
+        if start == end:
+            continue
+        observed = fixed[indices[start:end]]
+        weights = data[start:end]
+        a = gram + (observed.T * (weights - 1)) @ observed
+        solved[row] = np.linalg.solve(a, observed.T @ weights)
+    return solved
+
+
+class FactorModel:
+    """
+    Trained user/song factors memory-mapped from a model directory
+
+    Arrays are opened with ``mmap_mode='r'``, so every worker on the host
+    shares the same page-cache copy and loading is instant. Ids are sorted,
+    so id -> row is a binary search.
+    """
+
+    def __init__(self, path):
+        import numpy as np
+
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        self.user_ids = np.load(os.path.join(path, 'user_ids.npy'), mmap_mode='r')
+        self.song_ids = np.load(os.path.join(path, 'song_ids.npy'), mmap_mode='r')
+        self.user_factors = np.load(os.path.join(path, 'user_factors.npy'), mmap_mode='r')
+        self.song_factors = np.load(os.path.join(path, 'song_factors.npy'), mmap_mode='r')
+
+    @staticmethod
+    def _row(ids, value):
+        import numpy as np
+
+        row = int(np.searchsorted(ids, value))
+        return row if row < len(ids) and ids[row] == value else None
+
+    def user_row(self, user_id):
+        """Factor row of a user, or None if the user had no interactions at training time"""
+        return self._row(self.user_ids, user_id)
+
+    def top_songs(self, user_row, k, exclude_song_ids=()):
+        """
+        Song ids with the highest predicted preference for a user, best first
+
+        Scores every song with one matrix-vector product and selects the
+        top k with ``argpartition`` instead of sorting all scores.
+        """
+        import numpy as np
+
+        scores = self.song_factors @ self.user_factors[user_row]
+        if len(exclude_song_ids) and len(scores):
+            excluded = np.asarray(exclude_song_ids, dtype=self.song_ids.dtype)
+            rows = np.minimum(np.searchsorted(self.song_ids, excluded), len(self.song_ids) - 1)
+            scores[rows[self.song_ids[rows] == excluded]] = -np.inf
+
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [int(self.song_ids[row]) for row in top if np.isfinite(scores[row])]
+
+
+class RecommendationService:
+    """Service for training and serving song recommendations
+
+    A batch job builds a user x song implicit-feedback matrix from play
+    events in the behavior log plus current likes, trains ALS factors, and
+    saves them as ``.npy`` files in a new version directory under
+    ``RECOMMENDATION_MODEL_DIR``; a ``CURRENT`` file names the version being
+    served. Training runs in ``RecommendationJob``'s child process or from
+    cron (``db_manager.py --train-recommendations``); web workers only load
+    the saved factors. Serving scores all songs for a user with one dot
+    product against the memory-mapped song factors. Requires numpy and scipy.
+    """
+
+    _lock = threading.Lock()
+    _model = None
+    _version = None
+    _checked_at = None
+
+    @staticmethod
+    def model_dir():
+        return os.path.abspath(current_app.config['RECOMMENDATION_MODEL_DIR'])
+
+    @staticmethod
+    def interactions():
+        """
+        Implicit feedback matrix
+
+        Returns:
+            (user_ids, song_ids, matrix): sorted ids and a CSR matrix of
+            feedback weights with one row per user and column per song
+        """
+        import numpy as np
+        from scipy import sparse
+
+        plays = db.session.execute(
+            select(
+                UserBehaviorLog.user_id,
+                UserBehaviorLog.song_id,
+                func.count()
+            ).where(
+                UserBehaviorLog.action_type == 'play',
+                UserBehaviorLog.song_id.isnot(None)
+            ).group_by(UserBehaviorLog.user_id, UserBehaviorLog.song_id)
+        ).all()
+        likes = db.session.execute(select(Like.user_id, Like.song_id)).all()
+
+        users = np.array([row[0] for row in plays] + [row[0] for row in likes], dtype=np.int64)
+        songs = np.array([row[1] for row in plays] + [row[1] for row in likes], dtype=np.int64)
+        values = np.array([row[2] for row in plays] + [LIKE_WEIGHT] * len(likes), dtype=np.float32)
+
+        user_ids, user_rows = np.unique(users, return_inverse=True)
+        song_ids, song_columns = np.unique(songs, return_inverse=True)
+        # Duplicate (user, song) entries are summed
+        matrix = sparse.csr_matrix((values, (user_rows, song_columns)), shape=(len(user_ids), len(song_ids)))
+        matrix.sum_duplicates()
+        return user_ids, song_ids, matrix
+
+    @staticmethod
+    def train(feedback, factors=FACTORS, iterations=ITERATIONS, regularization=REGULARIZATION, seed=0):
+        """
+        Train implicit ALS factors on a feedback matrix
+
+        Returns:
+            (user_factors, song_factors) as float32 arrays
+        """
+        import numpy as np
+
+        confidence = feedback.astype(np.float32)
+        confidence.data = 1 + ALPHA * np.log1p(confidence.data)
+        confidence_t = confidence.T.tocsr()
+
+        rng = np.random.default_rng(seed)
+        song_factors = (rng.standard_normal((feedback.shape[1], factors)) * 0.01).astype(np.float32)
+        user_factors = np.zeros((feedback.shape[0], factors), dtype=np.float32)
+        for _ in range(iterations):
+            user_factors = _solve_factors(confidence, song_factors, regularization)
+            song_factors = _solve_factors(confidence_t, user_factors, regularization)
+        return user_factors, song_factors
+
+    @staticmethod
+    def save(user_ids, song_ids, user_factors, song_factors):
+        """
+        Write a new model version and make it the current one
+
+        Returns:
+            Path of the version directory
+        """
+        import numpy as np
+
+        root = RecommendationService.model_dir()
+        version = time.strftime('%Y%m%d%H%M%S') + f'-{os.getpid()}'
+        path = os.path.join(root, version)
+        os.makedirs(path)
+
+        np.save(os.path.join(path, 'user_ids.npy'), user_ids)
+        np.save(os.path.join(path, 'song_ids.npy'), song_ids)
+        np.save(os.path.join(path, 'user_factors.npy'), np.ascontiguousarray(user_factors, dtype=np.float32))
+        np.save(os.path.join(path, 'song_factors.npy'), np.ascontiguousarray(song_factors, dtype=np.float32))
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump({'trained_at': time.time(), 'users': len(user_ids), 'songs': len(song_ids),
+                       'factors': user_factors.shape[1]}, f)
+
+        # Atomically switch the served version
+        pointer = os.path.join(root, 'CURRENT')
+        with open(pointer + '.tmp', 'w') as f:
+            f.write(version)
+        os.replace(pointer + '.tmp', pointer)
+
+        versions = sorted(name for name in os.listdir(root) if os.path.isdir(os.path.join(root, name)))
+        for name in versions[:-KEEP_VERSIONS]:
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+        return path
+
+    @staticmethod
+    def current_version():
+        try:
+            with open(os.path.join(RecommendationService.model_dir(), 'CURRENT')) as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def is_stale():
+        """Whether there is no model or it is older than half a training interval"""
+        model = RecommendationService.model()
+        min_age = current_app.config['RECOMMENDATIONS_TRAIN_INTERVAL'] / 2
+        return model is None or time.time() - model.meta['trained_at'] >= min_age
+
+    @staticmethod
+    def refresh(force=False):
+        """
+        Retrain the model from the database and save it
+
+        Unless forced, does nothing when the current model is younger than
+        half a training interval (another process just trained it).
+
+        Returns:
+            Model metadata, or None if skipped
+        """
+        if not force and not RecommendationService.is_stale():
+            return None
+
+        user_ids, song_ids, feedback = RecommendationService.interactions()
+        db.session.rollback()  # end the read transaction before the long training run
+        if feedback.nnz == 0:
+            return None
+
+        user_factors, song_factors = RecommendationService.train(feedback)
+        path = RecommendationService.save(user_ids, song_ids, user_factors, song_factors)
+        RecommendationService._checked_at = None
+        with open(os.path.join(path, 'meta.json')) as f:
+            return json.load(f)
+
+    @staticmethod
+    def model():
+        """The current model of this worker, reloaded when a newer version is saved"""
+        cls = RecommendationService
+        if cls._checked_at is not None and time.monotonic() - cls._checked_at < RELOAD_CHECK_SECONDS:
+            return cls._model
+
+        with cls._lock:
+            if cls._checked_at is None or time.monotonic() - cls._checked_at >= RELOAD_CHECK_SECONDS:
+                version = cls.current_version()
+                if version != cls._version:
+                    cls._model = FactorModel(os.path.join(cls.model_dir(), version)) if version else None
+                    cls._version = version
+                cls._checked_at = time.monotonic()
+        return cls._model
+
+    @staticmethod
+    def recommend(user_id, limit=20):
+        """
+        Song ids recommended to a user, excluding songs the user already liked
+
+        Returns:
+            List of song ids, empty when the model does not know the user
+        """
+        model = RecommendationService.model()
+        if model is None:
+            return []
+        row = model.user_row(user_id)
+        if row is None:
+            return []
+
+        liked = db.session.scalars(select(Like.song_id).where(Like.user_id == user_id)).all()
+        return model.top_songs(row, limit, liked)
+
+
+class RecommendationJob(OfflineJob):
+    """Retrains recommendations in a child process every ``RECOMMENDATIONS_TRAIN_INTERVAL``"""
+
+    name = 'recommendation_job'
+
+    @property
+    def enabled(self):
+        return self.app.config['RECOMMENDATIONS_JOB_ENABLED']
+
+    @property
+    def interval(self):
+        return self.app.config['RECOMMENDATIONS_TRAIN_INTERVAL']
+
+    def due(self):
+        # Look at CURRENT now: checked again after taking the job lock, a
+        # worker must see the version another worker's child just saved
+        RecommendationService._checked_at = None
+        return RecommendationService.is_stale()
+
+    def run(self):
+        meta = RecommendationService.refresh()
+        if meta is not None:
+            print(f"Trained recommendations: {meta['users']} users, {meta['songs']} songs")
+
+    def flush(self):
+        super().flush()
+        # Pick up the version the child saved on the next request
+        RecommendationService._checked_at = None
+
+
+recommendation_job = RecommendationJob()
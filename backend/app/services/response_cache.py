@@ -0,0 +1,222 @@
+"""Shared response cache for anonymous catalog endpoints"""
+import hashlib
+import threading
+import time
+from functools import wraps
+from flask import current_app, g, make_response, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.models.music import Album, Artist, Song
+from app.services.cache import cache
+
+# Tags invalidated when rows of these models are written through the ORM
+MODEL_TAGS = {
+    Song: ('songs',),
+    Album: ('songs', 'artists'),
+    Artist: ('songs', 'artists'),
+}
+
+
+def _tag_key(tag):
+    return f'tag:{tag}'
+
+
+def song_tag(song_id):
+    """Tag of the responses showing a song's counters (plays, likes, comments)"""
+    return f'song:{song_id}'
+
+
+def tag_response(*tags):
+    """
+    Add invalidation tags to the response a cached view is computing
+
+    For tags only known from the data, e.g. ``song_tag`` of every song in a
+    list, so a counter change only expires the responses showing that song.
+    """
+    g.setdefault('response_cache_tags', set()).update(tags)
+
+
+def tag_versions(tags):
+    """Current version of each tag (a missing version starts at the current time)"""
+    versions = cache.get_many([_tag_key(tag) for tag in tags])
+    for i, version in enumerate(versions):
+        if version is None:
+            versions[i] = time.time_ns() // 1000
+            cache.set(_tag_key(tags[i]), versions[i])
+    return versions
+
+
+def invalidate(*tags):
+    """Mark every cached response carrying one of the tags as stale"""
+    for tag in tags:
+        if cache.incr(_tag_key(tag)) is None:
+            cache.set(_tag_key(tag), time.time_ns() // 1000)
+
+
+class ResponseCache:
+    """
+    Cache of whole JSON responses keyed by path and query string
+
+    An entry is fresh for ``ttl`` seconds while none of its tags has been
+    invalidated since it was stored. An entry whose TTL expired but is
+    younger than ``ttl + stale_ttl`` is still served while one background
+    refresh per key recomputes it (stale-while-revalidate). An entry with
+    an invalidated tag is never served: it is a miss, so a write shows up on
+    the next read. Concurrent misses in a worker wait for a single
+    computation instead of all hitting the database. Responses carry an ETag and Last-Modified, so browsers
+    revalidating with ``If-None-Match``/``If-Modified-Since`` get a 304.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight = {}  # key -> Event set when the computation finishes
+
+    @staticmethod
+    def _key(endpoint):
+        # include_liked only changes the per-user layer added on top of the cached payload
+        args = '&'.join(f'{k}={v}' for k, v in sorted(request.args.items(multi=True)) if k != 'include_liked')
+        return f'resp:{endpoint}:{request.path}?{args}'
+
+    @staticmethod
+    def _render(entry):
+        response = current_app.response_class(entry['body'], status=200, mimetype='application/json')
+        if g.get('personalized_response'):
+            # Per-user data is added afterwards; validators are set on the final body
+            return response
+        response.set_etag(entry['etag'])
+        response.last_modified = int(entry['stored_at'])
+        response.cache_control.public = True
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+
+    @staticmethod
+    def _compute(view, args, kwargs, tags):
+        tags = list(tags)
+        versions = tag_versions(tags)
+        g.pop('response_cache_tags', None)
+        response = make_response(view(*args, **kwargs))
+        if response.status_code != 200 or response.mimetype != 'application/json':
+            return response, None
+
+        # Tags added by the view are only known now; a change landing while
+        # the view ran keeps the entry until its TTL, like any cached read
+        extra = sorted(g.pop('response_cache_tags', ()))
+        body = response.get_data(as_text=True)
+        return response, {
+            'body': body,
+            'etag': hashlib.sha1(body.encode('utf-8')).hexdigest(),
+            'stored_at': time.time(),
+            'tags': tags + extra,
+            'versions': versions + tag_versions(extra),
+        }
+
+    @staticmethod
+    def _is_current(entry, tags):
+        """Whether none of an entry's tags was invalidated since it was stored"""
+        return entry['versions'] == tag_versions(entry.get('tags', list(tags)))
+
+    def _store(self, key, entry, ttl, stale_ttl):
+        if entry is not None:
+            cache.set(key, entry, ttl + stale_ttl)
+
+    def _refresh_in_background(self, key, view, args, kwargs, tags, ttl, stale_ttl):
+        with self._lock:
+            if key in self._inflight:
+                return
+            self._inflight[key] = threading.Event()
+
+        app = current_app._get_current_object()
+        path = request.full_path
+
+        def refresh():
+            try:
+                with app.test_request_context(path):
+                    _, entry = self._compute(view, args, kwargs, tags)
+                    self._store(key, entry, ttl, stale_ttl)
+            except Exception as e:
+                print(f"Error refreshing cached response {key}: {e}")
+            finally:
+                with self._lock:
+                    self._inflight.pop(key).set()
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def cached(self, ttl=None, stale_ttl=None, tags=()):
+        """
+        Decorator caching a view's 200 JSON responses
+
+        Args:
+            ttl: Seconds an entry is fresh (default ``RESPONSE_CACHE_TTL``)
+            stale_ttl: Seconds a stale entry may still be served while it is
+                       refreshed (default ``RESPONSE_CACHE_STALE_TTL``)
+            tags: Invalidation tags, e.g. ``('songs',)``; the view may add
+                  more with ``tag_response``
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                config = current_app.config
+                if not config['RESPONSE_CACHE_ENABLED']:
+                    return view(*args, **kwargs)
+
+                fresh_ttl = config['RESPONSE_CACHE_TTL'] if ttl is None else ttl
+                grace = config['RESPONSE_CACHE_STALE_TTL'] if stale_ttl is None else stale_ttl
+                key = self._key(request.endpoint)
+
+                entry = cache.get(key)
+                if entry is not None and self._is_current(entry, tags):
+                    age = time.time() - entry['stored_at']
+                    if age < fresh_ttl:
+                        return self._render(entry)
+                    if age < fresh_ttl + grace:
+                        self._refresh_in_background(key, view, args, kwargs, tags, fresh_ttl, grace)
+                        return self._render(entry)
+
+                # Miss: the first request computes, concurrent ones wait for it
+                with self._lock:
+                    waiting = self._inflight.get(key)
+                    if waiting is None:
+                        self._inflight[key] = threading.Event()
+
+                if waiting is not None:
+                    waiting.wait(timeout=10)
+                    entry = cache.get(key)
+                    if entry is not None and self._is_current(entry, tags):
+                        return self._render(entry)
+                    return view(*args, **kwargs)
+
+                try:
+                    response, entry = self._compute(view, args, kwargs, tags)
+                    self._store(key, entry, fresh_ttl, grace)
+                finally:
+                    with self._lock:
+                        self._inflight.pop(key).set()
+
+                if entry is None:
+                    return response
+                return self._render(entry)
+            return wrapper
+        return decorator
+
+
+response_cache = ResponseCache()
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_invalidated_tags(session, flush_context):
+    """Remember tags touched by catalog rows written in this transaction"""
+    tags = session.info.setdefault('response_cache_tags', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        tags.update(MODEL_TAGS.get(type(obj), ()))
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed_tags(session):
+    tags = session.info.pop('response_cache_tags', None)
+    if tags:
+        invalidate(*tags)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_invalidated_tags(session):
+    session.info.pop('response_cache_tags', None)
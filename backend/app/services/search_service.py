@@ -0,0 +1,148 @@
+"""Full-text search over songs and artists"""
+from flask import current_app
+from sqlalchemy import bindparam, cast, column, false, func, literal_column, or_, table, text
+from sqlalchemy.dialects.postgresql import DOUBLE_PRECISION
+from app.extensions import db
+from app.models.music import Artist, Song
+from app.utils.search_tokens import build_search_document, is_cjk, query_tokens
+
+# SQLite FTS5 index tables, kept in sync with search_document by triggers
+FTS_TABLES = {
+    'songs': 'songs_fts',
+    'artists': 'artists_fts',
+}
+
+
+class SearchService:
+    """
+    Service for ranked full-text search
+
+    Backends (``SEARCH_BACKEND``, default ``auto`` picks by database):
+      - ``postgres``: GIN index on ``to_tsvector('simple', search_document)``,
+        ranked with ``ts_rank``
+      - ``fts5``: SQLite FTS5 tables over ``search_document``, ranked with bm25
+      - ``ilike``: the old ``ILIKE '%q%'`` scan, ranked by popularity only
+    """
+
+    _fts5_ready = None
+
+    @staticmethod
+    def backend():
+        configured = current_app.config['SEARCH_BACKEND']
+        if configured != 'auto':
+            return configured
+
+        dialect = db.session.get_bind().dialect.name
+        if dialect == 'postgresql':
+            return 'postgres'
+        if dialect == 'sqlite' and SearchService._has_fts5_tables():
+            return 'fts5'
+        return 'ilike'
+
+    @staticmethod
+    def _has_fts5_tables():
+        if SearchService._fts5_ready is None:
+            names = db.session.execute(text(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name = :name"
+            ), {'name': FTS_TABLES['songs']}).fetchall()
+            SearchService._fts5_ready = bool(names)
+        return SearchService._fts5_ready
+
+    @staticmethod
+    def _match(query, model, q, ilike_columns):
+        """
+        Restrict a query to rows of model matching q
+
+        Returns:
+            (query, rank) where rank is a labeled expression, higher is better
+        """
+        tokens = query_tokens(q)
+        backend = SearchService.backend()
+
+        if backend == 'ilike':
+            query = query.filter(or_(*[field.ilike(f'%{q}%') for field in ilike_columns]))
+            return query, literal_column('0.0').label('rank')
+
+        if not tokens:
+            return query.filter(false()), literal_column('0.0').label('rank')
+
+        if backend == 'postgres':
+            ts_query = ' & '.join(token if is_cjk(token) else f'{token}:*' for token in tokens)
+            # Inline the constants so the expression matches the GIN index definition
+            simple = literal_column("'simple'")
+            vector = func.to_tsvector(simple, func.coalesce(model.search_document, literal_column("''")))
+            ts_query = func.to_tsquery(simple, ts_query)
+            query = query.filter(vector.op('@@')(ts_query))
+            # ts_rank is float4: a cursor value read back as float8 would not
+            # compare equal to it, so keyset pages over tied ranks never advance
+            return query, cast(func.ts_rank(vector, ts_query), DOUBLE_PRECISION).label('rank')
+
+        # fts5: quote every token so no token is parsed as FTS5 syntax
+        fts_table = FTS_TABLES[model.__tablename__]
+        fts_query = ' '.join(f'"{token}"' if is_cjk(token) else f'"{token}"*' for token in tokens)
+        fts = table(fts_table, column('rowid'))
+        query = query.join(fts, fts.c.rowid == model.id).filter(
+            literal_column(fts_table).op('MATCH')(fts_query)
+        )
+        return query, (-func.bm25(literal_column(fts_table))).label('rank')
+
+    @staticmethod
+    def search_songs(query, q):
+        """Filter a song query by q; returns (query, rank expression)"""
+        return SearchService._match(query, Song, q, (Song.title, Song.lyrics))
+
+    @staticmethod
+    def search_artists(query, q):
+        """Filter an artist query by q; returns (query, rank expression)"""
+        return SearchService._match(query, Artist, q, (Artist.name, Artist.bio))
+
+    @staticmethod
+    def create_fts5_tables():
+        """Create the SQLite FTS5 tables and their sync triggers (idempotent)"""
+        for source_table, fts_table in FTS_TABLES.items():
+            for statement in (
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5("
+                f"search_document, content='{source_table}', content_rowid='id')",
+                f"CREATE TRIGGER IF NOT EXISTS {fts_table}_ai AFTER INSERT ON {source_table} BEGIN "
+                f"INSERT INTO {fts_table}(rowid, search_document) VALUES (new.id, new.search_document); END",
+                f"CREATE TRIGGER IF NOT EXISTS {fts_table}_ad AFTER DELETE ON {source_table} BEGIN "
+                f"INSERT INTO {fts_table}({fts_table}, rowid, search_document) "
+                f"VALUES ('delete', old.id, old.search_document); END",
+                f"CREATE TRIGGER IF NOT EXISTS {fts_table}_au AFTER UPDATE OF search_document ON {source_table} BEGIN "
+                f"INSERT INTO {fts_table}({fts_table}, rowid, search_document) "
+                f"VALUES ('delete', old.id, old.search_document); "
+                f"INSERT INTO {fts_table}(rowid, search_document) VALUES (new.id, new.search_document); END",
+            ):
+                db.session.execute(text(statement))
+        SearchService._fts5_ready = None
+
+    @staticmethod
+    def reindex():
+        """Recompute search_document for every song and artist and rebuild the index"""
+        dialect = db.session.get_bind().dialect.name
+        if dialect == 'sqlite':
+            # Index the current documents first: the update triggers remove
+            # each row's old document from the index before adding the new one
+            SearchService.create_fts5_tables()
+            SearchService._rebuild_fts5()
+
+        count = 0
+        for model, fields in ((Song, (Song.title, Song.lyrics)), (Artist, (Artist.name, Artist.bio))):
+            rows = db.session.query(model.id, *fields).all()
+            if rows:
+                target = model.__table__
+                db.session.execute(
+                    target.update().where(target.c.id == bindparam('row_id')).values(
+                        search_document=bindparam('document'),
+                        updated_at=target.c.updated_at
+                    ),
+                    [{'row_id': row[0], 'document': build_search_document(*row[1:])} for row in rows]
+                )
+            count += len(rows)
+
+        return count
+
+    @staticmethod
+    def _rebuild_fts5():
+        for fts_table in FTS_TABLES.values():
+            db.session.execute(text(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')"))
@@ -0,0 +1,209 @@
+"""In-memory follow graph for edge checks and neighborhood queries"""
+import bisect
+import threading
+import time
+from array import array
+from collections import Counter, defaultdict
+from flask import current_app
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from app.extensions import db
+from app.models.social import Follow
+
+# Follow rows read per round trip while building the graph
+LOAD_BATCH_SIZE = 10000
+
+
+def _sorted_arrays(adjacency):
+    """Freeze lists of neighbor ids into sorted 32-bit int arrays"""
+    return {user_id: array('i', sorted(neighbors)) for user_id, neighbors in adjacency.items()}
+
+
+def _contains(neighbors, user_id):
+    position = bisect.bisect_left(neighbors, user_id)
+    return position < len(neighbors) and neighbors[position] == user_id
+
+
+class SocialGraph:
+    """
+    Per-worker in-memory copy of the ``follows`` table
+
+    Each user's followees and followers are kept as sorted ``array('i')``
+    (4 bytes per edge and direction), so an edge check is a bisect and set
+    operations merge two arrays without touching the database. The graph is
+    built on first use and updated from follows/unfollows committed by this
+    worker. Writes made by other workers show up when the graph is rebuilt
+    in the background after ``SOCIAL_GRAPH_REFRESH_SECONDS``, so it serves
+    bulk and derived reads (list badges, suggestions); single edge checks
+    that must be current use ``FollowService.is_following``/``is_mutual``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()  # held while the first build loads
+        self._following = None  # user_id -> sorted followee ids
+        self._followers = None  # user_id -> sorted follower ids
+        self._built_at = 0
+        self._refreshing = False
+        self._pending = None  # changes committed while a rebuild is loading
+
+    def build_from(self, edges):
+        """(Re)build the graph from (follower_id, following_id) pairs"""
+        following = defaultdict(list)
+        followers = defaultdict(list)
+        for follower_id, following_id in edges:
+            following[follower_id].append(following_id)
+            followers[following_id].append(follower_id)
+        following, followers = _sorted_arrays(following), _sorted_arrays(followers)
+
+        with self._lock:
+            self._following, self._followers = following, followers
+            self._built_at = time.monotonic()
+            pending, self._pending = self._pending, None
+            for follower_id, following_id, followed in pending or ():
+                self._apply_locked(follower_id, following_id, followed)
+
+    def build(self):
+        """(Re)build the whole graph from the database"""
+        with self._lock:
+            self._pending = []
+        try:
+            rows = db.session.execute(
+                select(Follow.follower_id, Follow.following_id),
+                execution_options={'yield_per': LOAD_BATCH_SIZE}
+            )
+            self.build_from(rows)
+        except Exception:
+            # Stop collecting changes for a build that will never apply them
+            with self._lock:
+                self._pending = None
+            raise
+
+    def _ensure_fresh(self):
+        if self._following is None:
+            # Concurrent first requests wait for one build instead of each loading the graph
+            with self._build_lock:
+                if self._following is None:
+                    self.build()
+            return
+
+        if time.monotonic() - self._built_at > current_app.config['SOCIAL_GRAPH_REFRESH_SECONDS']:
+            with self._lock:
+                if self._refreshing:
+                    return
+                self._refreshing = True
+            threading.Thread(target=self._refresh, args=(current_app._get_current_object(),), daemon=True).start()
+
+    def _refresh(self, app):
+        try:
+            with app.app_context():
+                self.build()
+        except Exception as e:
+            print(f"Error refreshing social graph: {e}")
+        finally:
+            self._refreshing = False
+
+    def apply(self, follower_id, following_id, followed):
+        """Add (followed=True) or remove one committed edge"""
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((follower_id, following_id, followed))
+            if self._following is not None:
+                self._apply_locked(follower_id, following_id, followed)
+
+    def _apply_locked(self, follower_id, following_id, followed):
+        for adjacency, owner, neighbor in ((self._following, follower_id, following_id),
+                                           (self._followers, following_id, follower_id)):
+            neighbors = adjacency.get(owner)
+            if followed:
+                if neighbors is None:
+                    adjacency[owner] = array('i', [neighbor])
+                elif not _contains(neighbors, neighbor):
+                    bisect.insort(neighbors, neighbor)
+            elif neighbors is not None:
+                position = bisect.bisect_left(neighbors, neighbor)
+                if position < len(neighbors) and neighbors[position] == neighbor:
+                    del neighbors[position]
+                    if not neighbors:
+                        del adjacency[owner]
+
+    def followees(self, user_id):
+        """Sorted ids of the users user_id follows"""
+        self._ensure_fresh()
+        with self._lock:
+            return list(self._following.get(user_id, ()))
+
+    def followers(self, user_id):
+        """Sorted ids of the users following user_id"""
+        self._ensure_fresh()
+        with self._lock:
+            return list(self._followers.get(user_id, ()))
+
+    def is_following(self, follower_id, following_id):
+        """Whether follower_id follows following_id"""
+        self._ensure_fresh()
+        with self._lock:
+            return _contains(self._following.get(follower_id, ()), following_id)
+
+    def is_mutual(self, user_id, other_id):
+        """Whether the two users follow each other"""
+        self._ensure_fresh()
+        with self._lock:
+            return (_contains(self._following.get(user_id, ()), other_id)
+                    and _contains(self._following.get(other_id, ()), user_id))
+
+    def following_ids(self, follower_id, user_ids):
+        """Which of the given users follower_id follows"""
+        self._ensure_fresh()
+        with self._lock:
+            neighbors = self._following.get(follower_id, ())
+            return {user_id for user_id in user_ids if _contains(neighbors, user_id)}
+
+    def common_followees(self, user_id, other_id):
+        """Sorted ids of the users both users follow"""
+        self._ensure_fresh()
+        with self._lock:
+            mine = self._following.get(user_id, ())
+            theirs = self._following.get(other_id, ())
+            if len(mine) > len(theirs):
+                mine, theirs = theirs, mine
+            return [followee for followee in mine if _contains(theirs, followee)]
+
+    def followers_of_followees(self, user_id, limit=None):
+        """
+        Users following the same people as user_id, excluding user_id and
+        the users it already follows
+
+        Returns:
+            List of (user_id, number of shared followees), most shared first
+        """
+        self._ensure_fresh()
+        with self._lock:
+            mine = self._following.get(user_id, ())
+            counts = Counter()
+            for followee in mine:
+                counts.update(self._followers.get(followee, ()))
+            for followee in mine:
+                counts.pop(followee, None)
+
+        counts.pop(user_id, None)
+        return sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+    def stage(self, follower_id, following_id, followed):
+        """Record a follow/unfollow of the current transaction (applied on commit)"""
+        db.session.info.setdefault('social_graph_changes', []).append((follower_id, following_id, followed))
+
+
+social_graph = SocialGraph()
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_social_graph_changes(session):
+    """Apply committed follows/unfollows to this worker's graph"""
+    for change in session.info.pop('social_graph_changes', None) or ():
+        social_graph.apply(*change)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_social_graph_changes(session):
+    session.info.pop('social_graph_changes', None)
@@ -0,0 +1,283 @@
+"""In-memory prefix index for search-as-you-type suggestions"""
+import bisect
+import heapq
+import re
+import threading
+import time
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.extensions import db
+from app.models.music import Artist, Song
+from app.models.user import User
+from app.utils.search_tokens import is_cjk
+
+KINDS = ('songs', 'artists', 'users')
+INDEXED_MODELS = {Song: 'songs', Artist: 'artists', User: 'users'}
+WORD_START = re.compile(r'(?<![^\W_])[^\W_]')
+
+# Prefixes up to this length match most of the index; their ranking is cached
+CACHED_PREFIX_LENGTH = 3
+# Entries kept per cached prefix (the largest limit the suggest API accepts)
+TOP_K = 20
+# Sorts after every character, so (prefix + KEY_END,) bounds a prefix's range
+KEY_END = '\U0010ffff'
+
+
+def normalize(text):
+    return ' '.join((text or '').lower().split())
+
+
+def index_keys(*names):
+    """
+    Keys under which a name is indexed
+
+    Every word start is a key (so "swi" finds "Taylor Swift"), and inside CJK
+    text every character is one (so "里香" finds "七里香").
+    """
+    keys = set()
+    for name in names:
+        name = normalize(name)
+        for match in WORD_START.finditer(name):
+            keys.add(name[match.start():])
+        for i, char in enumerate(name):
+            if is_cjk(char):
+                keys.add(name[i:])
+    return keys
+
+
+class SuggestIndex:
+    """
+    Per-worker in-memory suggestion index over song titles, artist names and
+    user names
+
+    For each kind, entries live in a sorted list of ``(key, id)`` tuples, so a
+    prefix lookup is a bisect plus a scan of the matching range and never
+    touches the database. Every match is ranked (a bounded heap keeps the
+    best ``limit``); the top ``TOP_K`` of short prefixes, whose ranges cover
+    much of the index, are cached until an entry under them changes. The
+    index is built on first use and updated from committed
+    inserts/updates/deletes of this worker. Writes made by other workers show
+    up when the index is rebuilt in the background after
+    ``SUGGEST_INDEX_REFRESH_SECONDS``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = None
+        self._entries = None
+        self._top = None  # kind -> {short prefix: ranked ids}
+        self._built_at = 0
+        self._refreshing = False
+
+    @staticmethod
+    def _song_entry(song_id, title, artist_name, cover_url, play_count):
+        return {'id': song_id, 'title': title, 'artist': artist_name,
+                'cover_url': cover_url, 'score': play_count or 0}
+
+    @staticmethod
+    def _artist_entry(artist_id, name, avatar_url):
+        return {'id': artist_id, 'name': name, 'avatar_url': avatar_url, 'score': 0}
+
+    @staticmethod
+    def _user_entry(user_id, username, nickname, avatar_url):
+        return {'id': user_id, 'username': username, 'nickname': nickname or username,
+                'avatar_url': avatar_url, 'score': 0}
+
+    @staticmethod
+    def _load():
+        """Read every indexed row from the database"""
+        entries = {kind: {} for kind in KINDS}
+
+        songs = db.session.query(
+            Song.id, Song.title, Artist.name, Song.cover_url, Song.play_count
+        ).outerjoin(Artist, Song.artist_id == Artist.id)
+        for row in songs:
+            entries['songs'][row[0]] = SuggestIndex._song_entry(*row)
+
+        for row in db.session.query(Artist.id, Artist.name, Artist.avatar_url):
+            entries['artists'][row[0]] = SuggestIndex._artist_entry(*row)
+
+        users = db.session.query(User.id, User.username, User.nickname, User.avatar_url).filter(
+            User.is_active.is_(True)
+        )
+        for row in users:
+            entries['users'][row[0]] = SuggestIndex._user_entry(*row)
+
+        keys = {kind: sorted(
+            (key, entry_id)
+            for entry_id, entry in kind_entries.items()
+            for key in SuggestIndex._entry_keys(kind, entry)
+        ) for kind, kind_entries in entries.items()}
+
+        return keys, entries
+
+    @staticmethod
+    def _entry_keys(kind, entry):
+        if kind == 'songs':
+            return index_keys(entry['title'])
+        if kind == 'artists':
+            return index_keys(entry['name'])
+        return index_keys(entry['username'], entry['nickname'])
+
+    def build(self):
+        """(Re)build the whole index from the database"""
+        keys, entries = self._load()
+        with self._lock:
+            self._keys, self._entries = keys, entries
+            self._top = {kind: {} for kind in KINDS}
+            self._built_at = time.monotonic()
+
+    def _ensure_fresh(self):
+        if self._keys is None:
+            with self._lock:
+                built = self._keys is not None
+            if not built:
+                self.build()
+            return
+
+        if time.monotonic() - self._built_at > current_app.config['SUGGEST_INDEX_REFRESH_SECONDS']:
+            with self._lock:
+                if self._refreshing:
+                    return
+                self._refreshing = True
+            threading.Thread(target=self._refresh, args=(current_app._get_current_object(),), daemon=True).start()
+
+    def _refresh(self, app):
+        try:
+            with app.app_context():
+                self.build()
+        except Exception as e:
+            print(f"Error refreshing suggest index: {e}")
+        finally:
+            self._refreshing = False
+
+    def upsert(self, kind, entry):
+        """Add or replace one entry"""
+        with self._lock:
+            if self._keys is None:
+                return
+            self._remove_locked(kind, entry['id'])
+            self._entries[kind][entry['id']] = entry
+            for key in self._entry_keys(kind, entry):
+                bisect.insort(self._keys[kind], (key, entry['id']))
+                self._forget_prefixes_locked(kind, key)
+
+    def remove(self, kind, entry_id):
+        """Drop one entry"""
+        with self._lock:
+            if self._keys is None:
+                return
+            self._remove_locked(kind, entry_id)
+
+    def _remove_locked(self, kind, entry_id):
+        entry = self._entries[kind].pop(entry_id, None)
+        if entry is None:
+            return
+        keys = self._keys[kind]
+        for key in self._entry_keys(kind, entry):
+            position = bisect.bisect_left(keys, (key, entry_id))
+            if position < len(keys) and keys[position] == (key, entry_id):
+                del keys[position]
+            self._forget_prefixes_locked(kind, key)
+
+    def _forget_prefixes_locked(self, kind, key):
+        """Drop the cached rankings an entry indexed under key may appear in"""
+        top = self._top[kind]
+        for length in range(1, min(len(key), CACHED_PREFIX_LENGTH) + 1):
+            top.pop(key[:length], None)
+
+    def _rank_locked(self, kind, prefix, limit):
+        """Ids of every entry matching prefix, exact matches first, then more popular ones"""
+        keys = self._keys[kind]
+        entries = self._entries[kind]
+        start = bisect.bisect_left(keys, (prefix,))
+        end = bisect.bisect_left(keys, (prefix + KEY_END,), start)
+
+        matches = {}  # id -> whether some key equals the prefix
+        for position in range(start, end):
+            key, entry_id = keys[position]
+            matches[entry_id] = matches.get(entry_id, False) or key == prefix
+
+        ranked = heapq.nsmallest(
+            limit, matches.items(),
+            key=lambda item: (not item[1], -entries[item[0]]['score'], item[0])
+        )
+        return [entry_id for entry_id, _ in ranked]
+
+    def _top_locked(self, kind, prefix, limit):
+        if len(prefix) > CACHED_PREFIX_LENGTH or limit > TOP_K:
+            return self._rank_locked(kind, prefix, limit)
+        top = self._top[kind]
+        ranked = top.get(prefix)
+        if ranked is None:
+            ranked = top[prefix] = self._rank_locked(kind, prefix, TOP_K)
+        return ranked[:limit]
+
+    def suggest(self, q, kinds=KINDS, limit=10):
+        """
+        Entries whose name (or a word / CJK character position in it) starts with q
+
+        Exact matches come first, then more popular entries.
+        """
+        self._ensure_fresh()
+        prefix = normalize(q)
+        results = {}
+
+        with self._lock:
+            for kind in kinds:
+                results[kind] = [
+                    {k: v for k, v in self._entries[kind][entry_id].items() if k != 'score'}
+                    for entry_id in self._top_locked(kind, prefix, limit)
+                ]
+
+        return results
+
+
+suggest_index = SuggestIndex()
+
+
+def _entry_for(session, obj):
+    if isinstance(obj, Song):
+        # New songs usually only have artist_id set, not the relationship
+        artist = obj.artist or (session.get(Artist, obj.artist_id) if obj.artist_id else None)
+        artist_name = artist.name if artist else None
+        return 'songs', SuggestIndex._song_entry(obj.id, obj.title, artist_name, obj.cover_url, obj.play_count)
+    if isinstance(obj, Artist):
+        return 'artists', SuggestIndex._artist_entry(obj.id, obj.name, obj.avatar_url)
+    return 'users', SuggestIndex._user_entry(obj.id, obj.username, obj.nickname, obj.avatar_url)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_suggest_changes(session, flush_context):
+    """Remember indexed rows written in this transaction (applied on commit)"""
+    if suggest_index._keys is None:
+        return
+
+    changes = session.info.setdefault('suggest_changes', {})
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, (Song, Artist, User)):
+            kind, entry = _entry_for(session, obj)
+            changes[(kind, obj.id)] = None if isinstance(obj, User) and not obj.is_active else entry
+    for obj in session.deleted:
+        if isinstance(obj, (Song, Artist, User)):
+            changes[(INDEXED_MODELS[type(obj)], obj.id)] = None
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_suggest_changes(session):
+    """Apply committed changes to this worker's index"""
+    changes = session.info.pop('suggest_changes', None)
+    if not changes:
+        return
+
+    for (kind, entry_id), entry in changes.items():
+        if entry is None:
+            suggest_index.remove(kind, entry_id)
+        else:
+            suggest_index.upsert(kind, entry)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_suggest_changes(session):
+    session.info.pop('suggest_changes', None)
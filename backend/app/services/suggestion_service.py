@@ -0,0 +1,244 @@
+"""Friend-of-friend follow suggestions"""
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import delete, func, insert, select
+from app.extensions import db
+from app.models.social import Follow, Like
+from app.models.suggestion import FollowSuggestion
+from app.models.user import User
+from app.services.background import OfflineJob
+from app.services.social_graph import social_graph
+
+# A song both users liked counts as much as this many shared followees
+LIKE_OVERLAP_WEIGHT = 0.5
+
+# Users scored per sparse product; bounds the size of one block's candidate matrix
+BLOCK_SIZE = 1024
+
+# Suggestion rows inserted per statement
+INSERT_BATCH_SIZE = 10000
+
+
+def _row_values(matrix, row, columns):
+    """Values of one CSR row (with sorted indices) at the given columns, 0 where absent"""
+    import numpy as np
+
+    indices = matrix.indices[matrix.indptr[row]:matrix.indptr[row + 1]]
+    data = matrix.data[matrix.indptr[row]:matrix.indptr[row + 1]]
+    if not len(indices):
+        return np.zeros(len(columns), dtype=np.int64)
+    positions = np.minimum(np.searchsorted(indices, columns), len(indices) - 1)
+    return np.where(indices[positions] == columns, data[positions], 0)
+
+
+class SuggestionService:
+    """Service for "people you may know" suggestions
+
+    A batch job scores, for every active user u and candidate v,
+
+        score = paths(u -> x -> v) + LIKE_OVERLAP_WEIGHT * |likes(u) & likes(v)|
+
+    with two sparse matrix products, ``F @ F`` over the follow matrix and
+    ``L @ L.T`` over the user x song like matrix, computed in blocks of
+    ``BLOCK_SIZE`` users. Users already followed are skipped, and the top
+    ``SUGGESTIONS_PER_USER`` candidates of each user are stored in
+    ``follow_suggestions``, so serving suggestions is one primary key range
+    read. The computation runs in ``SuggestionJob``'s child process or from
+    cron (``db_manager.py --refresh-suggestions``), never in a web worker.
+    Requires numpy and scipy (only the batch job imports them).
+    """
+
+    @staticmethod
+    def _matrices():
+        """
+        Load follows and likes of active users as sparse matrices
+
+        Returns:
+            (user_ids, F, L): sorted user ids, the n x n follow matrix (row
+            follows column) and the n x songs like matrix, both CSR
+        """
+        import numpy as np
+        from scipy import sparse
+
+        user_ids = np.fromiter(
+            db.session.scalars(select(User.id).where(User.is_active.is_(True)).order_by(User.id)),
+            dtype=np.int64
+        )
+        n = len(user_ids)
+
+        def positions(ids):
+            """Matrix rows of user ids, and which ids are active users"""
+            rows = np.minimum(np.searchsorted(user_ids, ids), max(n - 1, 0))
+            return rows, (user_ids[rows] == ids) if n else np.zeros(len(ids), dtype=bool)
+
+        follows = np.array(
+            db.session.execute(select(Follow.follower_id, Follow.following_id)).all(), dtype=np.int64
+        ).reshape(-1, 2)
+        followers, ok_followers = positions(follows[:, 0])
+        followees, ok_followees = positions(follows[:, 1])
+        keep = ok_followers & ok_followees
+        F = sparse.csr_matrix(
+            (np.ones(keep.sum(), dtype=np.int32), (followers[keep], followees[keep])), shape=(n, n)
+        )
+
+        likes = np.array(
+            db.session.execute(select(Like.user_id, Like.song_id)).all(), dtype=np.int64
+        ).reshape(-1, 2)
+        likers, keep = positions(likes[:, 0])
+        songs, song_columns = np.unique(likes[keep, 1], return_inverse=True)
+        L = sparse.csr_matrix(
+            (np.ones(keep.sum(), dtype=np.int32), (likers[keep], song_columns)), shape=(n, len(songs))
+        )
+
+        F.sort_indices()
+        return user_ids, F, L
+
+    @staticmethod
+    def compute(now=None):
+        """
+        Score candidates for every user and replace the stored suggestions
+
+        Returns:
+            Number of suggestion rows written
+        """
+        import numpy as np
+
+        now = now or datetime.utcnow()
+        size = current_app.config['SUGGESTIONS_PER_USER']
+        user_ids, F, L = SuggestionService._matrices()
+        LT = L.T.tocsr()
+
+        db.session.execute(delete(FollowSuggestion))
+        written = 0
+        batch = []
+
+        for start in range(0, len(user_ids), BLOCK_SIZE):
+            stop = min(start + BLOCK_SIZE, len(user_ids))
+            mutual = (F[start:stop] @ F).tocsr()
+            common = (L[start:stop] @ LT).tocsr()
+            scores = (mutual + LIKE_OVERLAP_WEIGHT * common).tocsr()
+            mutual.sort_indices()
+            common.sort_indices()
+
+            for row in range(stop - start):
+                user = start + row
+                candidates = scores.indices[scores.indptr[row]:scores.indptr[row + 1]]
+                values = scores.data[scores.indptr[row]:scores.indptr[row + 1]]
+
+                followed = F.indices[F.indptr[user]:F.indptr[user + 1]]
+                keep = (candidates != user) & (values > 0) & ~np.isin(candidates, followed, assume_unique=True)
+                candidates, values = candidates[keep], values[keep]
+                if not len(candidates):
+                    continue
+
+                if len(candidates) > size:
+                    top = np.argpartition(-values, size - 1)[:size]
+                    candidates, values = candidates[top], values[top]
+                order = np.lexsort((candidates, -values))
+                candidates, values = candidates[order], values[order]
+
+                mutual_counts = _row_values(mutual, row, candidates)
+                common_counts = _row_values(common, row, candidates)
+                batch.extend(
+                    {'user_id': int(user_ids[user]), 'rank': rank, 'candidate_id': int(user_ids[candidate]),
+                     'score': float(score), 'mutual_count': int(mutual_count),
+                     'common_likes': int(common_count), 'computed_at': now}
+                    for rank, (candidate, score, mutual_count, common_count)
+                    in enumerate(zip(candidates, values, mutual_counts, common_counts), 1)
+                )
+
+            if len(batch) >= INSERT_BATCH_SIZE:
+                db.session.execute(insert(FollowSuggestion), batch)
+                written += len(batch)
+                batch = []
+
+        if batch:
+            db.session.execute(insert(FollowSuggestion), batch)
+            written += len(batch)
+        return written
+
+    @staticmethod
+    def is_stale():
+        """Whether the stored suggestions are older than half a refresh interval"""
+        computed_at = db.session.scalar(select(func.max(FollowSuggestion.computed_at)))
+        db.session.rollback()
+        min_age = timedelta(seconds=current_app.config['SUGGESTIONS_REFRESH_INTERVAL'] / 2)
+        return computed_at is None or datetime.utcnow() - computed_at >= min_age
+
+    @staticmethod
+    def refresh(force=False):
+        """
+        Recompute every user's suggestions, then commit
+
+        Unless forced, does nothing when another process refreshed them
+        less than half a refresh interval ago.
+
+        Returns:
+            Number of suggestion rows written, or None if skipped
+        """
+        if not force and not SuggestionService.is_stale():
+            return None
+
+        count = SuggestionService.compute(datetime.utcnow())
+        db.session.commit()
+        return count
+
+    @staticmethod
+    def suggestions(user_id, limit=10):
+        """
+        A user's precomputed suggestions, skipping accounts followed since
+        they were computed
+
+        Users without any (new accounts, no follows or likes yet) get the
+        most followed accounts instead.
+
+        Returns:
+            List of user dicts with ``mutual_count`` and ``common_likes``
+        """
+        rows = db.session.query(FollowSuggestion, User).join(
+            User, User.id == FollowSuggestion.candidate_id
+        ).filter(
+            FollowSuggestion.user_id == user_id,
+            User.is_active.is_(True)
+        ).order_by(FollowSuggestion.rank).all()
+
+        if rows:
+            followed = social_graph.following_ids(user_id, [user.id for _, user in rows])
+            return [
+                {**user.to_dict(), 'mutual_count': suggestion.mutual_count, 'common_likes': suggestion.common_likes}
+                for suggestion, user in rows if user.id not in followed
+            ][:limit]
+
+        popular = User.query.filter(User.id != user_id, User.is_active.is_(True)).order_by(
+            User.followers_count.desc(), User.id
+        ).limit(limit * 2).all()
+        followed = social_graph.following_ids(user_id, [user.id for user in popular])
+        return [
+            {**user.to_dict(), 'mutual_count': 0, 'common_likes': 0}
+            for user in popular if user.id not in followed
+        ][:limit]
+
+
+class SuggestionJob(OfflineJob):
+    """Recomputes follow suggestions in a child process every ``SUGGESTIONS_REFRESH_INTERVAL``"""
+
+    name = 'suggestion_job'
+
+    @property
+    def enabled(self):
+        return self.app.config['SUGGESTIONS_JOB_ENABLED']
+
+    @property
+    def interval(self):
+        return self.app.config['SUGGESTIONS_REFRESH_INTERVAL']
+
+    def due(self):
+        return SuggestionService.is_stale()
+
+    def run(self):
+        count = SuggestionService.refresh()
+        if count is not None:
+            print(f"Refreshed follow suggestions: {count} rows")
+
+
+suggestion_job = SuggestionJob()
@@ -0,0 +1,225 @@
+"""Time-windowed trending charts"""
+import heapq
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import case, delete, func, insert, select
+from app.extensions import db
+from app.models.log import UserBehaviorLog
+from app.models.music import Song
+from app.models.trending import SongHourlyStat, TrendingEntry
+from app.services.background import OfflineJob
+from app.services.cache import cache
+from app.services.response_cache import invalidate
+
+# Chart window -> (length, half-life of an event's weight)
+WINDOWS = {
+    '24h': (timedelta(hours=24), timedelta(hours=6)),
+    '7d': (timedelta(days=7), timedelta(hours=36)),
+    '30d': (timedelta(days=30), timedelta(days=7)),
+}
+DEFAULT_WINDOW = '7d'
+
+# A like counts as much as this many plays
+LIKE_WEIGHT = 3.0
+
+RETENTION = max(length for length, _ in WINDOWS.values())
+
+# Hours before the newest bucket that are aggregated again on every run, so
+# events written late (log sink batching, spill replay) are still counted
+LATE_EVENTS = timedelta(hours=2)
+
+# Cache lock held while the charts are being refreshed
+REFRESH_LOCK = 'trending:refreshing'
+
+
+class TrendingService:
+    """Service for trending charts
+
+    Play and like events from the behavior log are rolled up into per-song
+    hourly buckets. A periodic job (in ``TrendingJob``'s child process or
+    from cron via ``db_manager.py --refresh-trending``) scores every song per window as the sum
+    of its buckets with exponential time decay, ranks them overall and per
+    genre, and stores the top ``TRENDING_CHART_SIZE`` of each chart in
+    ``trending_entries``, so serving a chart reads ``limit`` rows by primary
+    key.
+    """
+
+    @staticmethod
+    def _hour(column):
+        """SQL expression truncating a timestamp to the hour"""
+        dialect = db.session.get_bind().dialect.name
+        if dialect == 'sqlite':
+            # Same text format SQLAlchemy stores DateTime values in
+            return func.strftime('%Y-%m-%d %H:00:00.000000', column)
+        return func.date_trunc('hour', column)
+
+    @staticmethod
+    def aggregate(now=None):
+        """
+        Roll behavior log events into hourly buckets
+
+        Buckets from ``LATE_EVENTS`` before the newest already aggregated
+        hour on are recomputed, so events of the hour in progress and events
+        logged late are picked up on the next run.
+
+        Returns:
+            Number of buckets written
+        """
+        now = now or datetime.utcnow()
+        latest = db.session.scalar(select(func.max(SongHourlyStat.bucket_start)))
+        if latest is not None:
+            start = latest - LATE_EVENTS
+        else:
+            start = (now - RETENTION).replace(minute=0, second=0, microsecond=0)
+
+        db.session.execute(delete(SongHourlyStat).where(SongHourlyStat.bucket_start >= start))
+
+        hour = TrendingService._hour(UserBehaviorLog.created_at)
+        buckets = select(
+            UserBehaviorLog.song_id,
+            hour,
+            func.sum(case((UserBehaviorLog.action_type == 'play', 1), else_=0)),
+            func.sum(case((UserBehaviorLog.action_type == 'like', 1), else_=0))
+        ).where(
+            UserBehaviorLog.created_at >= start,
+            UserBehaviorLog.action_type.in_(('play', 'like')),
+            UserBehaviorLog.song_id.isnot(None)
+        ).group_by(UserBehaviorLog.song_id, hour)
+
+        result = db.session.execute(
+            insert(SongHourlyStat).from_select(['song_id', 'bucket_start', 'plays', 'likes'], buckets)
+        )
+
+        # Nothing older than the longest window is ever scored
+        db.session.execute(delete(SongHourlyStat).where(SongHourlyStat.bucket_start < now - RETENTION))
+
+        return result.rowcount
+
+    @staticmethod
+    def compute(now=None):
+        """
+        Score and rank songs for every window, overall and per genre,
+        replacing the stored charts
+
+        Returns:
+            Number of chart entries written
+        """
+        now = now or datetime.utcnow()
+        size = current_app.config['TRENDING_CHART_SIZE']
+
+        rows = db.session.execute(
+            select(
+                SongHourlyStat.song_id,
+                SongHourlyStat.bucket_start,
+                SongHourlyStat.plays,
+                SongHourlyStat.likes,
+                Song.genre
+            ).join(Song, Song.id == SongHourlyStat.song_id).where(
+                SongHourlyStat.bucket_start >= now - RETENTION
+            )
+        )
+
+        # (window, genre) -> song_id -> score; '' is the all-genres chart
+        scores = defaultdict(lambda: defaultdict(float))
+        for song_id, bucket_start, plays, likes, genre in rows:
+            age = now - (bucket_start + timedelta(minutes=30))
+            weight = plays + LIKE_WEIGHT * likes
+            for window, (length, half_life) in WINDOWS.items():
+                if age < length:
+                    score = weight * 0.5 ** (max(age, timedelta(0)) / half_life)
+                    scores[(window, '')][song_id] += score
+                    if genre:
+                        scores[(window, genre)][song_id] += score
+
+        entries = []
+        for (window, genre), song_scores in scores.items():
+            top = heapq.nlargest(size, song_scores.items(), key=lambda item: (item[1], -item[0]))
+            entries.extend(
+                {'window': window, 'genre': genre, 'rank': rank, 'song_id': song_id,
+                 'score': score, 'computed_at': now}
+                for rank, (song_id, score) in enumerate(top, 1)
+            )
+
+        db.session.execute(delete(TrendingEntry))
+        if entries:
+            db.session.execute(insert(TrendingEntry), entries)
+        return len(entries)
+
+    @staticmethod
+    def is_stale():
+        """Whether the charts are older than half a refresh interval"""
+        computed_at = db.session.scalar(select(func.max(TrendingEntry.computed_at)))
+        db.session.rollback()
+        min_age = timedelta(seconds=current_app.config['TRENDING_REFRESH_INTERVAL'] / 2)
+        return computed_at is None or datetime.utcnow() - computed_at >= min_age
+
+    @staticmethod
+    def refresh(force=False):
+        """
+        Aggregate new events and recompute the charts, then commit
+
+        Does nothing while another process holds ``REFRESH_LOCK`` (two
+        refreshes would collide on the chart's primary key) and, unless
+        forced, when the charts were refreshed less than half a refresh
+        interval ago.
+
+        Returns:
+            Number of chart entries written, or None if skipped
+        """
+        if not cache.add(REFRESH_LOCK, os.getpid(), current_app.config['TRENDING_REFRESH_INTERVAL']):
+            return None
+        try:
+            if not force and not TrendingService.is_stale():
+                return None
+
+            now = datetime.utcnow()
+            TrendingService.aggregate(now)
+            count = TrendingService.compute(now)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        finally:
+            cache.delete(REFRESH_LOCK)
+        invalidate('trending')
+        return count
+
+    @staticmethod
+    def chart(window, genre=None, limit=10):
+        """
+        Song ids of a chart in rank order
+
+        Returns:
+            List of at most limit song ids
+        """
+        return list(db.session.scalars(
+            select(TrendingEntry.song_id).where(
+                TrendingEntry.window == window,
+                TrendingEntry.genre == (genre or '')
+            ).order_by(TrendingEntry.rank).limit(limit)
+        ))
+
+
+class TrendingJob(OfflineJob):
+    """Refreshes the charts in a child process every ``TRENDING_REFRESH_INTERVAL``"""
+
+    name = 'trending_job'
+
+    @property
+    def enabled(self):
+        return self.app.config['TRENDING_JOB_ENABLED']
+
+    @property
+    def interval(self):
+        return self.app.config['TRENDING_REFRESH_INTERVAL']
+
+    def due(self):
+        return TrendingService.is_stale()
+
+    def run(self):
+        TrendingService.refresh()
+
+
+trending_job = TrendingJob()
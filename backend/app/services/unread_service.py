@@ -0,0 +1,50 @@
+"""Cached per-user unread message counters"""
+from flask import current_app
+from app.extensions import db, socketio
+from app.models.message import Message
+from app.services.cache import cache
+
+
+class UnreadService:
+    """Service for per-user unread message counts
+
+    The count lives in the cache and is adjusted in place whenever a message
+    is sent, read or deleted; only a cache miss runs a ``COUNT(*)``. Every
+    change is pushed to the user's ``user_<id>`` Socket.IO room as an
+    ``unread_count`` event, so clients do not need to poll. Call the
+    adjusting methods after the database change is committed. The count is
+    adjusted in whichever cache the worker uses, so several gunicorn workers
+    need ``CACHE_BACKEND=redis`` (enforced in ``gunicorn_config.py``).
+    """
+
+    @staticmethod
+    def _key(user_id):
+        return f'unread:{user_id}'
+
+    @staticmethod
+    def get(user_id):
+        """Unread message count of a user"""
+        count = cache.get(UnreadService._key(user_id))
+        if count is None:
+            count = db.session.query(Message).filter(
+                Message.receiver_id == user_id,
+                Message.is_read == False
+            ).count()
+            cache.set(UnreadService._key(user_id), count, current_app.config['UNREAD_COUNT_CACHE_TTL'])
+        return count
+
+    @staticmethod
+    def adjust(user_id, delta):
+        """Change a user's unread count by delta and push the new value"""
+        if delta:
+            count = cache.incr(UnreadService._key(user_id), delta, minimum=0)
+            if count is None:
+                count = UnreadService.get(user_id)
+        else:
+            count = UnreadService.get(user_id)
+        UnreadService.push(user_id, count)
+
+    @staticmethod
+    def push(user_id, count):
+        """Send a user's unread count to their connected clients"""
+        socketio.emit('unread_count', {'count': count}, room=f'user_{user_id}')
@@ -0,0 +1,64 @@
+"""Avatar rendition naming"""
+import hashlib
+import re
+
+# Rendition sizes (longest side, px); each is stored as WebP and as a JPEG fallback
+AVATAR_SIZES = (64, 160, 400)
+AVATAR_FORMATS = ('webp', 'jpg')
+
+# Renditions live in this subfolder of UPLOAD_FOLDER
+AVATAR_DIR = 'avatars'
+
+_RENDITION = re.compile(r'^([0-9a-f]{32})_(\d+)\.(webp|jpg)$')
+
+
+def avatar_key(data):
+    """Content hash naming the renditions of an uploaded image"""
+    return hashlib.sha256(data).hexdigest()[:32]
+
+
+def rendition_filename(key, size, fmt):
+    return f'{key}_{size}.{fmt}'
+
+
+def rendition_url(key, size, fmt):
+    return f'/uploads/{AVATAR_DIR}/{rendition_filename(key, size, fmt)}'
+
+
+def avatar_url_for(key):
+    """The plain avatar URL of a rendition set: the largest JPEG"""
+    return rendition_url(key, AVATAR_SIZES[-1], 'jpg')
+
+
+def parse_rendition(filename):
+    """(key, size, format) of a rendition filename, or None"""
+    match = _RENDITION.match(filename)
+    return (match.group(1), int(match.group(2)), match.group(3)) if match else None
+
+
+def key_of_url(avatar_url):
+    """Rendition key an avatar URL points to, or None for legacy/external avatars"""
+    prefix = f'/uploads/{AVATAR_DIR}/'
+    if not avatar_url or not avatar_url.startswith(prefix):
+        return None
+    parsed = parse_rendition(avatar_url[len(prefix):])
+    return parsed[0] if parsed else None
+
+
+def avatar_srcset(avatar_url):
+    """
+    Rendition URLs of an avatar by format and size, e.g.
+    ``{'webp': {64: url, 160: url, 400: url}, 'jpg': {...}}``
+
+    Legacy uploads and external (WeChat) avatars have no renditions and
+    map every size to ``avatar_url``; no avatar gives None.
+    """
+    if not avatar_url:
+        return None
+    key = key_of_url(avatar_url)
+    if key is None:
+        return {'jpg': {size: avatar_url for size in AVATAR_SIZES}}
+    return {
+        fmt: {size: rendition_url(key, size, fmt) for size in AVATAR_SIZES}
+        for fmt in AVATAR_FORMATS
+    }
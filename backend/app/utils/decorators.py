@@ -1,9 +1,10 @@
 """Custom decorators"""
 from functools import wraps
-from flask import jsonify
+from flask import g, jsonify, make_response, request
 from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
 from app.models.user import User
 from app.extensions import db
+from app.services.like_service import LikeService
 
 
 def login_required(fn):
@@ -27,3 +28,35 @@ def get_current_user(fn):
             return jsonify({'error': 'User not found'}), 404
         return fn(current_user=current_user, *args, **kwargs)
     return wrapper
+
+
+def with_like_status(fn):
+    """
+    Decorator embedding ``is_liked`` into the songs of a response when an
+    authenticated client asks for it with ``include_liked=true``
+
+    Goes above ``response_cache.cached`` so the shared cached payload stays
+    anonymous; the personalized response is marked private.
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        if request.args.get('include_liked', '').lower() not in ('1', 'true', 'yes'):
+            return fn(*args, **kwargs)
+
+        verify_jwt_in_request(optional=True)
+        current_user_id = get_jwt_identity()
+        if not current_user_id:
+            return fn(*args, **kwargs)
+
+        g.personalized_response = True
+        response = make_response(fn(*args, **kwargs))
+        if response.status_code != 200 or not response.is_json:
+            return response
+
+        data = LikeService.embed_like_status(response.get_json(), int(current_user_id))
+        response = jsonify(data)
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        response.add_etag()
+        return response.make_conditional(request)
+    return wrapper
@@ -0,0 +1,138 @@
+"""Image processing helpers (run in avatar worker processes)"""
+from io import BytesIO
+from PIL import Image, ImageOps
+from app.utils.avatars import AVATAR_SIZES
+
+# JPEG qualities tried, from best to worst (same steps as the old linear search)
+QUALITIES = tuple(range(95, 20, -5))
+
+# WebP renditions are encoded once at this quality (about a third of the JPEG size)
+WEBP_QUALITY = 80
+
+
+def _encode(img, quality):
+    output = BytesIO()
+    img.save(output, format='JPEG', quality=quality, optimize=True)
+    return output.getvalue()
+
+
+def _encode_webp(img):
+    output = BytesIO()
+    img.save(output, format='WEBP', quality=WEBP_QUALITY, method=4)
+    return output.getvalue()
+
+
+def prepare_image(data, max_dimension=800):
+    """
+    Decode an uploaded image into an upright RGB image no larger than max_dimension
+
+    JPEGs are decoded with ``draft`` at the smallest DCT scale that still
+    covers the target size, so a large photo is decoded at 1/2 - 1/8 of its
+    resolution instead of fully, only to be thrown away by the thumbnail.
+    """
+    img = Image.open(BytesIO(data))
+    if img.format == 'JPEG':
+        img.draft('RGB', (max_dimension, max_dimension))
+
+    # Handle EXIF orientation to fix rotated images
+    try:
+        img = ImageOps.exif_transpose(img)
+    except Exception:
+        # If EXIF processing fails, continue without rotation
+        pass
+
+    # Flatten transparency onto white
+    if img.mode in ('RGBA', 'LA', 'P'):
+        if img.mode == 'P':
+            img = img.convert('RGBA')
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        background.paste(img, mask=img.split()[-1])
+        img = background
+    elif img.mode != 'RGB':
+        img = img.convert('RGB')
+
+    if img.width > max_dimension or img.height > max_dimension:
+        img.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+    return img
+
+
+def fit_jpeg(img, max_size_kb=150):
+    """
+    Encode a prepared image as a JPEG of at most max_size_kb
+
+    Finds the highest quality in ``QUALITIES`` whose encoding fits with an
+    exponential search from the top: qualities 95, 90, 80, 60 and 25 are
+    probed until one fits, then the gap to the last one that did not is
+    bisected. Most avatars fit at 95 or 90 (one or two encodes, like the
+    old linear search), and the worst case is eight encodes instead of
+    fifteen. If even the lowest quality is too large, that encoding is
+    returned.
+
+    Returns:
+        (jpeg_bytes, quality, encodes)
+    """
+    max_bytes = max_size_kb * 1024
+    encodes = 0
+
+    def fits(index):
+        nonlocal encodes
+        encoded = _encode(img, QUALITIES[index])
+        encodes += 1
+        return encoded if len(encoded) <= max_bytes else None, encoded
+
+    # Probe indices 0, 1, 3, 7, ... ; invariant: QUALITIES[:low] are known too large
+    low, index = 0, 0
+    while True:
+        best, encoded = fits(index)
+        if best is not None:
+            high = index
+            break
+        if index == len(QUALITIES) - 1:
+            # Nothing fits: keep the lowest quality encoding
+            return encoded, QUALITIES[index], encodes
+        low, index = index + 1, min(2 * index + 1, len(QUALITIES) - 1)
+
+    # QUALITIES[high] fits; bisect QUALITIES[low:high]
+    while low < high:
+        middle = (low + high) // 2
+        candidate, _ = fits(middle)
+        if candidate is not None:
+            best, high = candidate, middle
+        else:
+            low = middle + 1
+    return best, QUALITIES[high], encodes
+
+
+def compress_image(data, max_size_kb=150, max_dimension=800):
+    """
+    Re-encode an image as a JPEG of at most max_size_kb
+
+    Args:
+        data: Uploaded image bytes
+
+    Returns:
+        (jpeg_bytes, quality, encodes)
+    """
+    return fit_jpeg(prepare_image(data, max_dimension), max_size_kb)
+
+
+def avatar_renditions(data, max_size_kb=150):
+    """
+    Render an uploaded image at every ``AVATAR_SIZES`` size as WebP and JPEG
+
+    The image is decoded once at the largest size and each smaller
+    rendition is downscaled from the previous one. Every JPEG is kept
+    under max_size_kb.
+
+    Returns:
+        {(size, 'webp' | 'jpg'): bytes}
+    """
+    img = prepare_image(data, AVATAR_SIZES[-1])
+    renditions = {}
+    for size in sorted(AVATAR_SIZES, reverse=True):
+        if img.width > size or img.height > size:
+            img = img.copy()
+            img.thumbnail((size, size), Image.Resampling.LANCZOS)
+        renditions[(size, 'jpg')] = fit_jpeg(img, max_size_kb)[0]
+        renditions[(size, 'webp')] = _encode_webp(img)
+    return renditions
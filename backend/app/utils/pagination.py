@@ -0,0 +1,128 @@
+"""Pagination helpers (page/offset and keyset cursors)"""
+import base64
+import json
+from collections import namedtuple
+from datetime import datetime
+from decimal import Decimal
+from flask import request
+from sqlalchemy import DateTime, tuple_
+
+Page = namedtuple('Page', ['items', 'total', 'page', 'per_page', 'pages', 'has_next', 'next_cursor'])
+
+
+class InvalidCursor(ValueError):
+    """Raised when a client sends a cursor token we did not issue"""
+
+
+def encode_cursor(values):
+    """Encode sort key values into an opaque URL-safe token"""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _json_types(column):
+    """JSON types a cursor value of a column may have (None if the type is not known)"""
+    if isinstance(column.type, DateTime):
+        return (str,)
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return None
+    if python_type in (float, Decimal):
+        return (int, float)
+    return (python_type,)
+
+
+def decode_cursor(token, columns):
+    """
+    Decode a cursor token back into sort key values typed like columns
+
+    Values of the wrong type are rejected here, so a tampered cursor is a
+    client error rather than a database error.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        payload = json.loads(raw)
+        if not isinstance(payload, list) or len(payload) != len(columns):
+            raise InvalidCursor('Invalid cursor')
+
+        values = []
+        for column, value in zip(columns, payload):
+            types = _json_types(column)
+            if types is not None and (
+                not isinstance(value, types) or (isinstance(value, bool) and bool not in types)
+            ):
+                raise InvalidCursor('Invalid cursor')
+            if isinstance(column.type, DateTime):
+                value = datetime.fromisoformat(value)
+            values.append(value)
+        return values
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor('Invalid cursor') from e
+
+
+def include_total(default=True):
+    """Whether the client wants the (COUNT(*)) total in the response"""
+    value = request.args.get('include_total')
+    if value is None:
+        return default
+    return value.lower() not in ('0', 'false', 'no')
+
+
+def paginate(query, order_by, descending=True, key=None, total=None):
+    """
+    Paginate a query by page number or, when the request has a ``cursor``
+    argument, by keyset on the ``order_by`` columns
+
+    Keyset mode seeks straight to the rows after the cursor instead of
+    scanning ``OFFSET`` rows, and skips the total count unless the client
+    passes ``include_total=true``. An empty ``cursor=`` starts from the top.
+
+    Args:
+        query: Query to paginate (must not be ordered yet)
+        order_by: Sort columns, ending with a unique column such as the id
+        descending: Sort direction applied to every column
+        key: Function returning the sort key values of a result item
+             (defaults to reading the columns' attributes)
+        total: Known row count (e.g. a denormalized counter) reported
+               instead of running ``COUNT(*)``
+
+    Returns:
+        Page namedtuple
+    """
+    per_page = max(request.args.get('per_page', 20, type=int), 1)
+    key = key or (lambda item: [getattr(item, column.key) for column in order_by])
+
+    query = query.order_by(*[column.desc() if descending else column.asc() for column in order_by])
+
+    if 'cursor' in request.args:
+        if total is None and include_total(default=False):
+            total = query.order_by(None).count()
+
+        token = request.args.get('cursor')
+        if token:
+            values = decode_cursor(token, order_by)
+            if descending:
+                query = query.filter(tuple_(*order_by) < tuple_(*values))
+            else:
+                query = query.filter(tuple_(*order_by) > tuple_(*values))
+
+        rows = query.limit(per_page + 1).all()
+        items = rows[:per_page]
+        has_next = len(rows) > per_page
+        next_cursor = encode_cursor(key(items[-1])) if has_next else None
+
+        return Page(items, total, None, per_page, None, has_next, next_cursor)
+
+    page = max(request.args.get('page', 1, type=int), 1)
+    if total is None and include_total():
+        total = query.order_by(None).count()
+
+    rows = query.limit(per_page + 1).offset((page - 1) * per_page).all()
+    items = rows[:per_page]
+    has_next = len(rows) > per_page
+    pages = (total + per_page - 1) // per_page if total is not None else None
+    next_cursor = encode_cursor(key(items[-1])) if has_next else None
+
+    return Page(items, total, page, per_page, pages, has_next, next_cursor)
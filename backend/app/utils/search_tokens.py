@@ -0,0 +1,54 @@
+"""CJK-aware tokenization for the full-text search index"""
+import re
+
+# Han, kana and hangul have no spaces between words, so they are indexed as
+# single characters plus overlapping bigrams ("七里香" -> 七 里 香 七里 里香)
+CJK_RANGES = '\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af'
+TOKEN_PATTERN = re.compile(f'[{CJK_RANGES}]+|[^\\W_{CJK_RANGES}]+')
+CJK_PATTERN = re.compile(f'[{CJK_RANGES}]')
+
+
+def is_cjk(token):
+    return CJK_PATTERN.match(token) is not None
+
+
+def _runs(text):
+    return TOKEN_PATTERN.findall((text or '').lower())
+
+
+def document_tokens(*texts):
+    """Tokens stored in the index for the given texts"""
+    tokens = []
+    for text in texts:
+        for run in _runs(text):
+            if is_cjk(run):
+                tokens.extend(run)
+                tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+            else:
+                tokens.append(run)
+    return tokens
+
+
+def build_search_document(*texts):
+    """Space-separated index tokens, stored in ``search_document`` columns"""
+    return ' '.join(document_tokens(*texts))
+
+
+def query_tokens(text):
+    """
+    Tokens a search query must all match
+
+    CJK runs become their bigrams (or the single character for one-character
+    queries); other words are matched as prefixes by the search backends so
+    results show up while the user is still typing.
+    """
+    tokens = []
+    for run in _runs(text):
+        if is_cjk(run):
+            if len(run) == 1:
+                tokens.append(run)
+            else:
+                tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return list(dict.fromkeys(tokens))
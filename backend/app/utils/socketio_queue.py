@@ -0,0 +1,40 @@
+"""Socket.IO message queue configuration for running several workers"""
+import os
+import socketio
+
+
+def socketio_options(config):
+    """
+    Keyword arguments for ``socketio.init_app`` from ``SOCKETIO_MESSAGE_QUEUE``
+
+    With a message queue every emit is published to the queue and delivered
+    by whichever worker holds the recipient's connection, so
+    ``emit(..., room='user_<id>')`` reaches the user no matter which worker
+    handled the request. Supported URLs:
+
+      - empty (default): no queue, emits only reach this process
+      - ``redis://...``: Redis pub/sub (requires the ``redis`` package)
+      - ``amqp://...`` or other kombu URLs: RabbitMQ etc. (requires ``kombu``)
+      - ``filesystem://``: kombu's file transport in ``SOCKETIO_QUEUE_FOLDER``,
+        a stand-in for local multi-process tests without a broker
+      - ``memory://``: kombu's in-process transport, for single-process tests
+    """
+    url = config['SOCKETIO_MESSAGE_QUEUE']
+    if not url:
+        return {}
+
+    channel = config['SOCKETIO_CHANNEL']
+    if url.startswith('filesystem://'):
+        folder = os.path.abspath(config['SOCKETIO_QUEUE_FOLDER'])
+        control_folder = os.path.join(folder, 'control')
+        os.makedirs(control_folder, exist_ok=True)
+        manager = socketio.KombuManager(url, channel=channel, connection_options={
+            'transport_options': {
+                'data_folder_in': folder,
+                'data_folder_out': folder,
+                'control_folder': control_folder,
+            }
+        })
+        return {'client_manager': manager}
+
+    return {'message_queue': url, 'channel': channel}
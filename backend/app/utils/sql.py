@@ -0,0 +1,18 @@
+"""Dialect helpers for statements SQLAlchemy does not abstract"""
+from sqlalchemy.dialects import postgresql, sqlite
+from app.extensions import db
+
+# Dialects whose INSERT supports ON CONFLICT
+DIALECT_INSERTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+}
+
+
+def upsert_insert():
+    """The current dialect's ``insert`` with ON CONFLICT support, or None"""
+    return DIALECT_INSERTS.get(db.session.get_bind().dialect.name)
+
+
+def supports_update_returning():
+    return db.session.get_bind().dialect.update_returning
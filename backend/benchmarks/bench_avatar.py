@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+头像压缩基准测试：每次上传的 CPU 耗时与编码次数（改造前 vs 改造后）
+
+改造前：完整解码后 LANCZOS 缩放，质量从 95 每次降 5 逐个尝试（最多编码 15 次），
+        全部在请求线程里执行。
+改造后：JPEG 按 draft 以 1/2~1/8 分辨率解码，质量按 95/90/80/60/25 指数探测后
+        二分查找（最多编码 8 次），并在进程池中执行，请求线程只解析图片头。
+
+使用方法：
+  python benchmarks/bench_avatar.py
+  python benchmarks/bench_avatar.py --rounds 10 --max-kb 40
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageFilter, ImageOps
+from app.utils.images import compress_image
+
+
+def legacy_compress_image(data, max_size_kb=150):
+    """改造前的实现（原 user.compress_image），额外返回编码次数"""
+    img = Image.open(BytesIO(data))
+    try:
+        img = ImageOps.exif_transpose(img)
+    except Exception:
+        pass
+    if img.mode in ('RGBA', 'LA', 'P'):
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        if img.mode == 'P':
+            img = img.convert('RGBA')
+        background.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
+        img = background
+    max_dimension = 800
+    if img.width > max_dimension or img.height > max_dimension:
+        img.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+
+    output = BytesIO()
+    quality = 95
+    encodes = 0
+    while quality > 20:
+        output.seek(0)
+        output.truncate()
+        img.save(output, format='JPEG', quality=quality, optimize=True)
+        encodes += 1
+        if output.tell() / 1024 <= max_size_kb:
+            break
+        quality -= 5
+    return output.getvalue(), quality, encodes
+
+
+def photo(size, detail, seed):
+    """类照片的测试图：渐变 + 模糊噪声，detail 越大细节越多、越难压缩"""
+    width, height = size
+    noise = Image.frombytes('RGB', size, os.urandom(width * height * 3))
+    noise = noise.filter(ImageFilter.GaussianBlur(radius=max(0.1, 3 - detail)))
+    gradient = Image.linear_gradient('L').resize(size).convert('RGB')
+    return Image.blend(gradient, noise, min(0.9, 0.3 + detail / 5))
+
+
+def samples():
+    """(名称, 上传文件字节)"""
+    cases = []
+    for name, size, detail, fmt in [
+        ('手机照片 4032x3024 JPEG', (4032, 3024), 1.5, 'JPEG'),
+        ('高细节照片 3000x2000 JPEG', (3000, 2000), 3.0, 'JPEG'),
+        ('截图 1200x1200 PNG', (1200, 1200), 0.5, 'PNG'),
+        ('小头像 640x640 JPEG', (640, 640), 1.0, 'JPEG'),
+    ]:
+        img = photo(size, detail, seed=len(cases))
+        if fmt == 'PNG':
+            img = img.convert('RGBA')
+        buffer = BytesIO()
+        img.save(buffer, format=fmt, quality=92)
+        cases.append((name, buffer.getvalue()))
+    return cases
+
+
+def run(fn, data, rounds, max_kb):
+    cpu = []
+    for _ in range(rounds):
+        start = time.process_time()
+        output, quality, encodes = fn(data, max_kb)
+        cpu.append((time.process_time() - start) * 1000)
+    return statistics.median(cpu), encodes, quality, len(output) / 1024
+
+
+def request_thread_cost(data, rounds):
+    """改造后请求线程里剩下的工作：只解析图片头"""
+    cpu = []
+    for _ in range(rounds):
+        start = time.process_time()
+        Image.open(BytesIO(data))
+        cpu.append((time.process_time() - start) * 1000)
+    return statistics.median(cpu)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='头像压缩基准测试')
+    parser.add_argument('--rounds', type=int, default=5, help='每张图重复次数')
+    parser.add_argument('--max-kb', type=int, default=150, help='目标大小 KB')
+    args = parser.parse_args()
+
+    print(f"{'图片':<24} {'实现':<6} {'CPU ms':>8} {'编码次数':>8} {'质量':>5} {'KB':>7} {'请求线程 ms':>11}")
+    for name, data in samples():
+        before = run(legacy_compress_image, data, args.rounds, args.max_kb)
+        after = run(compress_image, data, args.rounds, args.max_kb)
+        header = request_thread_cost(data, args.rounds)
+        print(f"{name:<24} {'改造前':<6} {before[0]:>8.1f} {before[1]:>8} {before[2]:>5} {before[3]:>7.1f} {before[0]:>11.1f}")
+        print(f"{'':<24} {'改造后':<6} {after[0]:>8.1f} {after[1]:>8} {after[2]:>5} {after[3]:>7.1f} {header:>11.2f}")
+
+
+if __name__ == '__main__':
+    main()
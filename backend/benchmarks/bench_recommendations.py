@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+推荐模型基准测试：ALS 训练耗时、推荐接口核心计算的 p99 延迟与召回率
+
+生成带隐含口味分组的合成播放/喜欢数据（默认 2 万用户、1 万首歌、50 万条交互），
+每个用户留出一首歌作为测试集；训练 ALS 因子并保存为内存映射文件，然后对随机
+用户测量 FactorModel.top_songs（点积 + argpartition）的延迟，并与"最热门"基线
+比较 Recall@K。
+
+使用方法：
+  python benchmarks/bench_recommendations.py
+  python benchmarks/bench_recommendations.py --users 100000 --songs 50000 --interactions 3000000
+  python benchmarks/bench_recommendations.py --factors 32 --iterations 5
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+if 'DATABASE_URL' not in os.environ:
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench_recommendations.db')
+
+import numpy as np
+from scipy import sparse
+from app import create_app
+from app.services.recommendation_service import FactorModel, RecommendationService
+
+
+def generate(user_count, song_count, interaction_count, groups=50, seed=42):
+    """每个用户属于一个口味分组，80% 的交互落在本组歌曲上，歌曲热度服从 Zipf 分布"""
+    rng = np.random.default_rng(seed)
+    user_group = rng.integers(groups, size=user_count)
+    song_group = rng.integers(groups, size=song_count)
+    popularity = 1 / np.arange(1, song_count + 1) ** 0.8
+    rng.shuffle(popularity)
+
+    songs_by_group = [np.flatnonzero(song_group == g) for g in range(groups)]
+    weights_by_group = [popularity[songs] / popularity[songs].sum() for songs in songs_by_group]
+    overall = popularity / popularity.sum()
+
+    users = rng.integers(user_count, size=interaction_count)
+    in_group = rng.random(interaction_count) < 0.8
+    songs = rng.choice(song_count, size=interaction_count, p=overall)
+    for g in range(groups):
+        mask = in_group & (user_group[users] == g)
+        songs[mask] = rng.choice(songs_by_group[g], size=mask.sum(), p=weights_by_group[g])
+
+    # 播放记 1 分，约 10% 的交互是喜欢（记 4 分）
+    values = np.where(rng.random(interaction_count) < 0.1, 4.0, 1.0).astype(np.float32)
+    matrix = sparse.csr_matrix((values, (users, songs)), shape=(user_count, song_count))
+    matrix.sum_duplicates()
+    return matrix
+
+
+def hold_out(matrix, seed=7):
+    """每个至少有 2 次交互的用户留出一首歌"""
+    rng = np.random.default_rng(seed)
+    matrix = matrix.tolil()
+    held = {}
+    for user in range(matrix.shape[0]):
+        songs = matrix.rows[user]
+        if len(songs) >= 2:
+            song = songs[rng.integers(len(songs))]
+            held[user] = song
+            matrix[user, song] = 0
+    train = matrix.tocsr()
+    train.eliminate_zeros()
+    return train, held
+
+
+def main():
+    parser = argparse.ArgumentParser(description='推荐模型基准测试')
+    parser.add_argument('--users', type=int, default=20000, help='用户数')
+    parser.add_argument('--songs', type=int, default=10000, help='歌曲数')
+    parser.add_argument('--interactions', type=int, default=500000, help='交互数')
+    parser.add_argument('--factors', type=int, default=64, help='因子维数')
+    parser.add_argument('--iterations', type=int, default=10, help='ALS 迭代次数')
+    parser.add_argument('--k', type=int, default=20, help='推荐数 K')
+    parser.add_argument('--queries', type=int, default=5000, help='延迟测试的请求数')
+    args = parser.parse_args()
+
+    print(f"生成 {args.users} 个用户、{args.songs} 首歌、{args.interactions} 条交互...")
+    train, held = hold_out(generate(args.users, args.songs, args.interactions))
+
+    start = time.perf_counter()
+    user_factors, song_factors = RecommendationService.train(train, args.factors, args.iterations)
+    train_seconds = time.perf_counter() - start
+
+    workdir = tempfile.mkdtemp(prefix='bench_recommendations_')
+    app = create_app('production')
+    app.config['RECOMMENDATION_MODEL_DIR'] = workdir
+    try:
+        with app.app_context():
+            path = RecommendationService.save(
+                np.arange(args.users, dtype=np.int64), np.arange(args.songs, dtype=np.int64),
+                user_factors, song_factors
+            )
+        model = FactorModel(path)
+
+        rng = np.random.default_rng(3)
+        users = rng.integers(args.users, size=args.queries)
+        timings = []
+        for user in users:
+            seen = train.indices[train.indptr[user]:train.indptr[user + 1]]
+            begin = time.perf_counter()
+            model.top_songs(int(user), args.k, seen)
+            timings.append((time.perf_counter() - begin) * 1000)
+        timings.sort()
+
+        popular = np.argsort(-np.asarray(train.sum(axis=0)).ravel())
+        hits = popular_hits = 0
+        for user, song in held.items():
+            seen = train.indices[train.indptr[user]:train.indptr[user + 1]]
+            hits += song in model.top_songs(user, args.k, seen)
+            popular_hits += song in [s for s in popular[:args.k + len(seen)] if s not in set(seen)][:args.k]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"\n训练: {args.factors} 维 x {args.iterations} 轮, {train.nnz} 个非零项, 耗时 {train_seconds:.1f} s")
+    print(f"推荐 top-{args.k}: p50 {statistics.median(timings):.2f} ms, "
+          f"p99 {timings[int(len(timings) * 0.99) - 1]:.2f} ms ({args.queries} 次)")
+    print(f"Recall@{args.k}: ALS {hits / len(held):.3f}, 最热门基线 {popular_hits / len(held):.3f} "
+          f"({len(held)} 个留出样本)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+搜索性能基准测试：全文索引 vs ILIKE '%q%'
+
+使用方法：
+  python benchmarks/bench_search.py                     # 临时 SQLite 库，10 万首歌
+  python benchmarks/bench_search.py --songs 200000
+  DATABASE_URL=postgresql+psycopg://.../bench python benchmarks/bench_search.py
+
+注意：会在目标数据库中建表并写入测试数据，请不要指向生产库。
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+if 'DATABASE_URL' not in os.environ:
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench_search.db')
+
+from datetime import datetime
+from app import create_app
+from app.extensions import db
+from app.models.music import Artist, Song
+from app.services.search_service import SearchService
+from app.utils.search_tokens import build_search_document
+
+CJK_WORDS = ['晴天', '七里香', '稻香', '夜曲', '青花瓷', '告白气球', '简单爱', '说好不哭', '红豆', '后来',
+             '小幸运', '光年之外', '演员', '平凡之路', '成都', '南山南', '消愁', '起风了', '海阔天空', '月亮代表我的心']
+LATIN_WORDS = ['love', 'story', 'night', 'summer', 'blue', 'dream', 'heart', 'light', 'rain', 'fire',
+               'shape', 'you', 'hello', 'wonder', 'forever', 'young', 'star', 'moon', 'river', 'road']
+QUERIES = ['晴天', '七里', '青花瓷', '海阔天空', '风', 'love', 'lov', 'summer night', 'dream', '小幸运 live']
+
+
+def random_title(rng):
+    if rng.random() < 0.6:
+        return rng.choice(CJK_WORDS) + rng.choice(['', ' (Live)', ' 伴奏', ' Remix', str(rng.randint(1, 99))])
+    return ' '.join(rng.choice(LATIN_WORDS) for _ in range(rng.randint(1, 3))).title()
+
+
+def random_lyrics(rng):
+    # 大部分是随机填充词，偶尔出现常见词，使匹配率接近真实歌词
+    words = [rng.choice(CJK_WORDS + LATIN_WORDS) if rng.random() < 0.02 else f'w{rng.randint(0, 50000)}'
+             for _ in range(rng.randint(20, 60))]
+    return ' '.join(words)
+
+
+def seed(song_count):
+    """写入测试数据（已存在足够数据时跳过）"""
+    db.create_all()
+    existing = db.session.query(Song).count()
+    if existing >= song_count:
+        print(f"复用已有的 {existing} 首歌曲")
+        return
+
+    rng = random.Random(42)
+    artist = Artist(name='Benchmark Artist')
+    db.session.add(artist)
+    db.session.commit()
+
+    now = datetime.utcnow()
+    batch = []
+    for i in range(existing, song_count):
+        title, lyrics = random_title(rng), random_lyrics(rng)
+        batch.append({
+            'title': title, 'artist_id': artist.id, 'duration': 200, 'lyrics': lyrics,
+            'search_document': build_search_document(title, lyrics),
+            'play_count': rng.randint(0, 100000), 'like_count': 0, 'comment_count': 0,
+            'created_at': now, 'updated_at': now,
+        })
+        if len(batch) == 5000:
+            db.session.execute(Song.__table__.insert(), batch)
+            batch = []
+    if batch:
+        db.session.execute(Song.__table__.insert(), batch)
+    db.session.commit()
+    print(f"已写入 {song_count - existing} 首歌曲")
+
+
+def run(client, app, backend, rounds):
+    app.config['SEARCH_BACKEND'] = backend
+    timings = []
+    for _ in range(rounds):
+        for q in QUERIES:
+            start = time.perf_counter()
+            response = client.get('/api/search', query_string={'q': q, 'type': 'songs', 'include_total': 'false'})
+            timings.append((time.perf_counter() - start) * 1000)
+            assert response.status_code == 200, response.json
+    timings.sort()
+    return {
+        'p50': statistics.median(timings),
+        'p95': timings[int(len(timings) * 0.95) - 1],
+        'mean': statistics.mean(timings),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='搜索性能基准测试')
+    parser.add_argument('--songs', type=int, default=100000, help='歌曲数量')
+    parser.add_argument('--rounds', type=int, default=5, help='每个查询重复次数')
+    args = parser.parse_args()
+
+    app = create_app('production')
+    with app.app_context():
+        seed(args.songs)
+        print("重建搜索索引...")
+        SearchService.reindex()
+        db.session.commit()
+        dialect = db.engine.dialect.name
+
+    index_backend = 'postgres' if dialect == 'postgresql' else 'fts5'
+    client = app.test_client()
+    results = {backend: run(client, app, backend, args.rounds) for backend in ('ilike', index_backend)}
+
+    print(f"\n{args.songs} 首歌曲, {len(QUERIES)} 个查询 x {args.rounds} 轮 ({dialect})")
+    print(f"{'backend':<10} {'p50 ms':>10} {'p95 ms':>10} {'mean ms':>10}")
+    for backend, stats in results.items():
+        print(f"{backend:<10} {stats['p50']:>10.2f} {stats['p95']:>10.2f} {stats['mean']:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+关注关系内存图基准测试：内存占用与查询延迟
+
+生成一个幂律分布的关注图（默认 10 万用户、100 万条关注），分别用
+SocialGraph（排序的 int 数组）和 dict-of-sets 建图，比较内存占用；
+再测量 is_following / is_mutual / common_followees / followers_of_followees
+的延迟，并与 SQLite 上的单条关注查询对比。
+
+使用方法：
+  python benchmarks/bench_social_graph.py
+  python benchmarks/bench_social_graph.py --users 200000 --edges 2000000
+  python benchmarks/bench_social_graph.py --no-sql        # 跳过数据库对比
+"""
+import argparse
+import gc
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+if 'DATABASE_URL' not in os.environ:
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench_social_graph.db')
+
+from datetime import datetime
+from sqlalchemy import select
+from app import create_app
+from app.extensions import db
+from app.models.social import Follow
+from app.services.social_graph import SocialGraph
+
+
+def generate_edges(user_count, edge_count, seed=42):
+    """少数热门用户拥有大量粉丝（被关注者按 Zipf 权重抽样）"""
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) ** 0.9 for rank in range(user_count)]
+    edges = set()
+    while len(edges) < edge_count:
+        missing = edge_count - len(edges)
+        followers = rng.choices(range(1, user_count + 1), k=missing)
+        followees = rng.choices(range(1, user_count + 1), weights=weights, k=missing)
+        edges.update((a, b) for a, b in zip(followers, followees) if a != b)
+    return list(edges)
+
+
+def measure(build):
+    """返回 (对象, 构建耗时秒, 常驻内存字节)"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, current
+
+
+def build_sets(edges):
+    following, followers = defaultdict(set), defaultdict(set)
+    for a, b in edges:
+        following[a].add(b)
+        followers[b].add(a)
+    return following, followers
+
+
+def time_calls(fn, args_list):
+    """每次调用的耗时（微秒）"""
+    timings = []
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        timings.append((time.perf_counter() - start) * 1e6)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.99) - 1]
+
+
+def seed_follows(edges):
+    db.create_all()
+    db.session.execute(Follow.__table__.delete())
+    now = datetime.utcnow()
+    for i in range(0, len(edges), 50000):
+        db.session.execute(Follow.__table__.insert(), [
+            {'follower_id': a, 'following_id': b, 'created_at': now} for a, b in edges[i:i + 50000]
+        ])
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='关注关系内存图基准测试')
+    parser.add_argument('--users', type=int, default=100000, help='用户数')
+    parser.add_argument('--edges', type=int, default=1000000, help='关注数')
+    parser.add_argument('--queries', type=int, default=20000, help='每种查询的次数')
+    parser.add_argument('--no-sql', action='store_true', help='跳过 SQLite 对比')
+    args = parser.parse_args()
+
+    print(f"生成 {args.users} 个用户、{args.edges} 条关注...")
+    edges = generate_edges(args.users, args.edges)
+
+    graph = SocialGraph()
+    _, graph_seconds, graph_bytes = measure(lambda: graph.build_from(edges))
+    sets, sets_seconds, sets_bytes = measure(lambda: build_sets(edges))
+    del sets
+
+    print(f"\n{'结构':<16} {'构建 s':>8} {'内存 MB':>9} {'字节/关注':>10}")
+    print(f"{'int 数组':<16} {graph_seconds:>8.2f} {graph_bytes / 2**20:>9.1f} {graph_bytes / args.edges:>10.1f}")
+    print(f"{'dict-of-sets':<16} {sets_seconds:>8.2f} {sets_bytes / 2**20:>9.1f} {sets_bytes / args.edges:>10.1f}")
+
+    rng = random.Random(7)
+    existing = rng.sample(edges, min(args.queries // 2, len(edges)))
+    pairs = existing + [(rng.randint(1, args.users), rng.randint(1, args.users))
+                        for _ in range(args.queries - len(existing))]
+    rng.shuffle(pairs)
+    heavy = [(a,) for a, _ in pairs[:max(args.queries // 100, 10)]]
+
+    app = create_app('production')
+    with app.app_context():
+        results = {
+            'is_following': time_calls(graph.is_following, pairs),
+            'is_mutual': time_calls(graph.is_mutual, pairs),
+            'common_followees': time_calls(graph.common_followees, pairs),
+            'followers_of_followees': time_calls(lambda user_id: graph.followers_of_followees(user_id, 20), heavy),
+        }
+
+        if not args.no_sql:
+            print("\n写入 SQLite...")
+            seed_follows(edges)
+
+            def sql_is_following(a, b):
+                return db.session.execute(
+                    select(Follow.id).where(Follow.follower_id == a, Follow.following_id == b)
+                ).first() is not None
+
+            results['is_following (SQL)'] = time_calls(sql_is_following, pairs)
+
+    print(f"\n{'查询':<26} {'p50 µs':>10} {'p99 µs':>10}")
+    for name, (p50, p99) in results.items():
+        print(f"{name:<26} {p50:>10.1f} {p99:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Socket.IO 多 worker 压测：私信推送跨 worker 送达率与吞吐量
+
+每个 worker 是一个独立的服务进程（各自监听一个端口，相当于负载均衡后面的
+N 个 worker），它们通过 SOCKETIO_MESSAGE_QUEUE 共享推送。接收方客户端均匀
+连接到各个 worker，发送方通过随机的 worker 调用 POST /api/messages，统计
+new_message 事件的送达率、跨 worker 送达数、延迟和发送吞吐量。
+
+使用方法：
+  python benchmarks/bench_socketio_workers.py                       # 1/2/4 个 worker，filesystem:// 队列
+  python benchmarks/bench_socketio_workers.py --workers 1 4 8 --messages 2000
+  python benchmarks/bench_socketio_workers.py --queue redis://localhost:6379/1
+  python benchmarks/bench_socketio_workers.py --queue ''            # 不用队列（跨 worker 推送会丢失）
+
+注意：使用临时 SQLite 库；吞吐量是否随 worker 数增长取决于机器核数。
+"""
+import argparse
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def serve(port):
+    """子进程：启动一个 worker"""
+    try:
+        from gevent import monkey
+        monkey.patch_all()
+    except ImportError:
+        pass
+
+    from app import create_app
+    from app.extensions import socketio
+
+    app = create_app('production')
+    socketio.run(app, host='127.0.0.1', port=port, log_output=False, allow_unsafe_werkzeug=True)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'worker on port {port} did not start')
+
+
+def seed(user_count):
+    """写入测试用户并返回 (user_id, token) 列表"""
+    from flask_jwt_extended import create_access_token
+    from app import create_app
+    from app.extensions import db
+    from app.models.user import User
+
+    app = create_app('production')
+    with app.app_context():
+        db.create_all()
+        users = [User(username=f'bench{i}', email=f'bench{i}@example.com') for i in range(user_count)]
+        for user in users:
+            user.password_hash = 'x'
+        db.session.add_all(users)
+        db.session.commit()
+        return [(user.id, create_access_token(identity=str(user.id))) for user in users]
+
+
+def run_round(worker_count, users, args, env):
+    import requests
+    import socketio as socketio_client
+
+    ports = [free_port() for _ in range(worker_count)]
+    log = open(os.path.join(args.workdir, f'workers_{worker_count}.log'), 'w')
+    processes = [
+        subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve', str(port)],
+                         cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+        for port in ports
+    ]
+    clients = []
+    try:
+        for port in ports:
+            wait_for(port)
+
+        receivers = users[:args.clients]
+        senders = users[args.clients:]
+        lock = threading.Lock()
+        latencies = []
+        received = {'total': 0, 'cross_worker': 0}
+
+        def on_message(worker_index):
+            def handler(message):
+                sent_at, sent_via = message['content'].split('|')
+                with lock:
+                    latencies.append(time.time() - float(sent_at))
+                    received['total'] += 1
+                    if int(sent_via) != worker_index:
+                        received['cross_worker'] += 1
+            return handler
+
+        for i, (user_id, token) in enumerate(receivers):
+            worker_index = i % worker_count
+            client = socketio_client.Client(reconnection=False)
+            client.on('new_message', on_message(worker_index))
+            client.connect(f'http://127.0.0.1:{ports[worker_index]}', auth={'token': token},
+                           transports=['polling'], wait_timeout=10)
+            clients.append(client)
+        time.sleep(1)  # 等待所有连接加入房间
+
+        rng = random.Random(worker_count)
+        plan = [(rng.choice(senders), rng.choice(receivers)[0], rng.randrange(worker_count))
+                for _ in range(args.messages)]
+        failures = []
+
+        def send(item):
+            (sender_id, token), receiver_id, worker_index = item
+            response = requests.post(
+                f'http://127.0.0.1:{ports[worker_index]}/api/messages',
+                json={'receiver_id': receiver_id, 'content': f'{time.time()}|{worker_index}'},
+                headers={'Authorization': f'Bearer {token}'},
+                timeout=30
+            )
+            if response.status_code != 201:
+                failures.append(response.status_code)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            list(pool.map(send, plan))
+        elapsed = time.perf_counter() - start
+
+        expected = args.messages - len(failures)
+        deadline = time.monotonic() + args.drain_timeout
+        while received['total'] < expected and time.monotonic() < deadline:
+            time.sleep(0.1)
+
+        ordered = sorted(latencies) or [0]
+        return {
+            'workers': worker_count,
+            'throughput': args.messages / elapsed,
+            'failed': len(failures),
+            'delivered': received['total'],
+            'expected': expected,
+            'cross_worker': received['cross_worker'],
+            'p50_ms': statistics.median(ordered) * 1000,
+            'p95_ms': ordered[int(len(ordered) * 0.95) - 1 if len(ordered) > 1 else 0] * 1000,
+        }
+    finally:
+        for client in clients:
+            client.disconnect()
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+        log.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Socket.IO 多 worker 压测')
+    parser.add_argument('--serve', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help='要测试的 worker 数')
+    parser.add_argument('--clients', type=int, default=40, help='接收方客户端数')
+    parser.add_argument('--senders', type=int, default=20, help='发送方用户数')
+    parser.add_argument('--messages', type=int, default=500, help='每轮发送的私信数')
+    parser.add_argument('--concurrency', type=int, default=16, help='并发发送线程数')
+    parser.add_argument('--drain-timeout', type=float, default=15, help='等待推送送达的最长秒数')
+    parser.add_argument('--queue', default='filesystem://', help='SOCKETIO_MESSAGE_QUEUE')
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve)
+        return
+
+    workdir = args.workdir = tempfile.mkdtemp(prefix='bench_socketio_')
+    env = dict(os.environ)
+    env.update({
+        'DATABASE_URL': 'sqlite:///' + os.path.join(workdir, 'bench.db'),
+        'SOCKETIO_MESSAGE_QUEUE': args.queue,
+        'SOCKETIO_QUEUE_FOLDER': os.path.join(workdir, 'queue'),
+        'LOG_SINK_SPILL_PATH': os.path.join(workdir, 'spill.jsonl'),
+    })
+    os.environ.update(env)
+
+    try:
+        users = seed(args.clients + args.senders)
+        print(f"队列: {args.queue or '(无)'}，接收方 {args.clients}，每轮 {args.messages} 条私信\n")
+        print(f"{'workers':>8} {'msg/s':>8} {'送达':>12} {'跨worker':>9} {'p50(ms)':>9} {'p95(ms)':>9} {'失败':>5}")
+        for worker_count in args.workers:
+            result = run_round(worker_count, users, args, env)
+            print(f"{result['workers']:>8} {result['throughput']:>8.1f} "
+                  f"{result['delivered']:>5}/{result['expected']:<6} {result['cross_worker']:>9} "
+                  f"{result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f} {result['failed']:>5}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
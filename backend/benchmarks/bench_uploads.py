@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+上传文件访问基准测试：单个 worker 每秒能发送多少张头像
+
+在临时上传目录中生成头像缩略图（64/160/400px 的 WebP 和 JPEG），用 Flask 测试
+客户端在同一进程内请求，测量每秒请求数和每个请求的 CPU 耗时：
+
+  改造前      原来的 /uploads 路由（每次拼接目录，无缓存头）
+  完整 GET    flask 模式首次访问，返回 200 和文件内容
+  304         flask 模式带 If-None-Match 的重新验证
+  Range       flask 模式请求前 1KB，返回 206
+  x-accel     只返回 X-Accel-Redirect 头，由 nginx 发送文件
+
+按内容哈希命名的缩略图带 immutable 缓存头，浏览器缓存命中后不会再发请求，
+因此重复查看同一头像的开销为零，不在表中。
+
+使用方法：
+  python benchmarks/bench_uploads.py
+  python benchmarks/bench_uploads.py --images 50 --requests 20000
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+if 'DATABASE_URL' not in os.environ:
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench_uploads.db')
+UPLOAD_DIR = tempfile.mkdtemp(prefix='bench_uploads_')
+os.environ['UPLOAD_FOLDER'] = UPLOAD_DIR
+
+from flask import send_from_directory
+from PIL import Image
+from app import create_app
+from app.services.avatar_service import AvatarStore
+from app.utils.avatars import AVATAR_DIR, avatar_key, rendition_filename
+from app.utils.images import avatar_renditions
+
+
+def generate(app, count):
+    """生成 count 个头像的全部缩略图，返回相对路径列表"""
+    paths = []
+    for _ in range(count):
+        img = Image.effect_mandelbrot((1200, 900), (-2, -1.2, 1, 1.2), random.randint(20, 200)).convert('RGB')
+        buffer = BytesIO()
+        img.save(buffer, format='JPEG', quality=90)
+        data = buffer.getvalue()
+        key = avatar_key(data)
+        renditions = avatar_renditions(data)
+        AvatarStore.save(key, renditions, app)
+        paths += [f'{AVATAR_DIR}/{rendition_filename(key, size, fmt)}' for size, fmt in renditions]
+    return paths
+
+
+def measure(client, urls, headers_for, expected):
+    """依次请求 urls，返回 (请求/秒, 每请求 CPU ms, 平均响应字节)"""
+    sent = 0
+    wall, cpu = time.perf_counter(), time.process_time()
+    for url in urls:
+        response = client.get(url, headers=headers_for(url))
+        body = response.get_data()
+        assert response.status_code == expected, (url, response.status_code)
+        sent += len(body)
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    return len(urls) / wall, cpu * 1000 / len(urls), sent / len(urls)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='上传文件访问基准测试')
+    parser.add_argument('--images', type=int, default=20, help='头像数量')
+    parser.add_argument('--requests', type=int, default=5000, help='每种场景的请求数')
+    args = parser.parse_args()
+
+    random.seed(1)
+    app = create_app('production')
+
+    # 原来定义在 create_app 里的路由
+    @app.route('/legacy-uploads/<path:filename>')
+    def legacy_uploaded_file(filename):
+        upload_folder = os.path.join(app.root_path, '..', app.config['UPLOAD_FOLDER'])
+        return send_from_directory(upload_folder, filename)
+
+    client = app.test_client()
+    try:
+        print(f"生成 {args.images} 个头像的缩略图...")
+        paths = generate(app, args.images)
+        picks = [random.choice(paths) for _ in range(args.requests)]
+        etags = {path: client.get(f'/uploads/{path}').headers['ETag'] for path in paths}
+        sample = client.get(f'/uploads/{paths[-1]}')
+        print(f"缓存头示例: Cache-Control: {sample.headers['Cache-Control']}")
+
+        results = [
+            ('改造前', measure(client, [f'/legacy-uploads/{p}' for p in picks], lambda url: {}, 200)),
+            ('完整 GET', measure(client, [f'/uploads/{p}' for p in picks], lambda url: {}, 200)),
+            ('304', measure(client, [f'/uploads/{p}' for p in picks],
+                            lambda url: {'If-None-Match': etags[url[len('/uploads/'):]]}, 304)),
+            ('Range', measure(client, [f'/uploads/{p}' for p in picks if '_400.' in p],
+                              lambda url: {'Range': 'bytes=0-1023'}, 206)),
+        ]
+        app.config['UPLOADS_SERVE_MODE'] = 'x-accel'
+        results.append(('x-accel', measure(client, [f'/uploads/{p}' for p in picks], lambda url: {}, 200)))
+    finally:
+        shutil.rmtree(UPLOAD_DIR, ignore_errors=True)
+
+    print(f"\n{'场景':<10} {'请求/秒':>10} {'CPU ms/请求':>12} {'响应字节':>10}")
+    for name, (rate, cpu_ms, size) in results:
+        print(f"{name:<10} {rate:>10.0f} {cpu_ms:>12.3f} {size:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -7,6 +7,15 @@
   python db_manager.py --tables           # 查看所有表
   python db_manager.py --users            # 查看所有用户
   python db_manager.py --songs            # 查看所有歌曲
+  python db_manager.py --rebuild-feeds    # 重建所有用户的好友动态时间线
+  python db_manager.py --trim-feeds       # 裁剪超出上限的时间线条目
+  python db_manager.py --reindex-search   # 重建歌曲/歌手全文搜索索引
+  python db_manager.py --rebuild-conversations  # 重建私信会话列表
+  python db_manager.py --refresh-trending # 汇总播放日志并重新计算热门榜
+  python db_manager.py --reconcile-counters  # 核对并修正点赞数/评论数/关注数/播放次数
+  python db_manager.py --refresh-suggestions # 重新计算关注推荐（可放到 cron 里离线执行）
+  python db_manager.py --train-recommendations # 重新训练歌曲推荐模型
+  python db_manager.py --gc-avatars       # 删除没有用户引用的头像文件
 """
 import sys
 import argparse
@@ -15,6 +24,14 @@ from app.extensions import db
 from app.models.user import User
 from app.models.music import Song, Artist, Album
 from app.models.social import Like, Comment, Follow
+from app.services.avatar_service import AvatarStore
+from app.services.conversation_service import ConversationService
+from app.services.counter_service import CounterService
+from app.services.feed_service import FeedService
+from app.services.recommendation_service import RecommendationService
+from app.services.search_service import SearchService
+from app.services.suggestion_service import SuggestionService
+from app.services.trending_service import TrendingService
 from sqlalchemy import text
 
 app = create_app()
@@ -167,6 +184,75 @@ def show_stats():
         print(f"关注关系:     {follow_count}")
         print("="*50 + "\n")
 
+def rebuild_feeds():
+    """重建所有用户的好友动态时间线"""
+    with app.app_context():
+        user_ids = [user_id for (user_id,) in db.session.query(User.id).all()]
+        for user_id in user_ids:
+            FeedService.rebuild(user_id)
+            db.session.commit()
+        print(f"✅ 已重建 {len(user_ids)} 个用户的时间线")
+
+def trim_feeds():
+    """裁剪超出上限的时间线条目"""
+    with app.app_context():
+        removed = FeedService.trim()
+        db.session.commit()
+        print(f"✅ 已删除 {removed} 条超出上限的时间线条目")
+
+def reindex_search():
+    """重建歌曲/歌手全文搜索索引"""
+    with app.app_context():
+        count = SearchService.reindex()
+        db.session.commit()
+        print(f"✅ 已重建 {count} 条搜索索引")
+
+def rebuild_conversations():
+    """根据私信记录重建会话列表"""
+    with app.app_context():
+        count = ConversationService.rebuild()
+        db.session.commit()
+        print(f"✅ 已重建 {count} 条会话记录")
+
+def refresh_trending():
+    """汇总播放日志并重新计算热门榜"""
+    with app.app_context():
+        count = TrendingService.refresh(force=True)
+        if count is None:
+            print("⚠️ 其他进程正在计算热门榜，已跳过")
+        else:
+            print(f"✅ 已生成 {count} 条热门榜记录")
+
+def reconcile_counters():
+    """核对并修正点赞数/评论数/关注数/播放次数"""
+    with app.app_context():
+        fixed = CounterService.reconcile()
+        print(f"✅ 已修正 歌曲点赞数 {fixed['song_likes']} 条，歌曲评论数 {fixed['song_comments']} 条，"
+              f"歌曲播放次数 {fixed['song_plays']} 条，"
+              f"评论点赞数 {fixed['comment_likes']} 条，粉丝数 {fixed['followers']} 条，"
+              f"关注数 {fixed['following']} 条")
+
+def refresh_suggestions():
+    """重新计算所有用户的关注推荐"""
+    with app.app_context():
+        count = SuggestionService.refresh(force=True)
+        print(f"✅ 已生成 {count} 条关注推荐")
+
+def train_recommendations():
+    """用播放/喜欢数据重新训练歌曲推荐模型"""
+    with app.app_context():
+        meta = RecommendationService.refresh(force=True)
+        if meta is None:
+            print("⚠️ 没有可用的播放/喜欢数据，未训练模型")
+            return
+        print(f"✅ 已训练推荐模型：{meta['users']} 个用户，{meta['songs']} 首歌曲，{meta['factors']} 维因子")
+
+def gc_avatars():
+    """删除没有用户引用的头像文件（跳过宽限期内刚写入的文件）"""
+    with app.app_context():
+        deleted = AvatarStore.collect()
+        print(f"✅ 已删除 {deleted} 个未被引用的头像文件")
+
 def main():
     parser = argparse.ArgumentParser(description='数据库管理工具')
     parser.add_argument('--query', '-q', help='执行SQL查询')
@@ -176,6 +262,15 @@ def main():
     parser.add_argument('--artists', '-a', action='store_true', help='显示所有歌手')
     parser.add_argument('--comments', '-c', action='store_true', help='显示最近评论')
     parser.add_argument('--stats', action='store_true', help='显示统计信息')
+    parser.add_argument('--rebuild-feeds', action='store_true', help='重建好友动态时间线')
+    parser.add_argument('--trim-feeds', action='store_true', help='裁剪超出上限的时间线')
+    parser.add_argument('--reindex-search', action='store_true', help='重建全文搜索索引')
+    parser.add_argument('--rebuild-conversations', action='store_true', help='重建私信会话列表')
+    parser.add_argument('--refresh-trending', action='store_true', help='重新计算热门榜')
+    parser.add_argument('--reconcile-counters', action='store_true', help='核对并修正点赞数/评论数/关注数/播放次数')
+    parser.add_argument('--refresh-suggestions', action='store_true', help='重新计算关注推荐')
+    parser.add_argument('--train-recommendations', action='store_true', help='重新训练歌曲推荐模型')
+    parser.add_argument('--gc-avatars', action='store_true', help='删除未被引用的头像文件')
 
     args = parser.parse_args()
 
@@ -193,6 +288,24 @@ def main():
         show_comments()
     elif args.stats:
         show_stats()
+    elif args.rebuild_feeds:
+        rebuild_feeds()
+    elif args.trim_feeds:
+        trim_feeds()
+    elif args.reindex_search:
+        reindex_search()
+    elif args.rebuild_conversations:
+        rebuild_conversations()
+    elif args.refresh_trending:
+        refresh_trending()
+    elif args.reconcile_counters:
+        reconcile_counters()
+    elif args.refresh_suggestions:
+        refresh_suggestions()
+    elif args.train_recommendations:
+        train_recommendations()
+    elif args.gc_avatars:
+        gc_avatars()
     else:
         # 默认进入交互式shell
         interactive_shell()
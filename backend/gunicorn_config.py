@@ -1,10 +1,19 @@
 """Gunicorn configuration file for production deployment with WebSocket support"""
 
+import os
+import sys
+
 # Server socket
-bind = "127.0.0.1:5000"
+bind = os.getenv("GUNICORN_BIND", "127.0.0.1:5000")
 
 # Worker processes - use gevent for WebSocket support
-workers = 1
+# More than one worker requires SOCKETIO_MESSAGE_QUEUE so that emits reach
+# clients connected to other workers, and CACHE_BACKEND=redis so that cached
+# state adjusted in place (unread message counts) is shared; on_starting
+# refuses to start otherwise. Socket.IO long-polling also needs every
+# request of a session to hit the same worker, so with several workers clients
+# should connect over WebSocket (the frontend tries it first).
+workers = int(os.getenv("GUNICORN_WORKERS", 1))
 worker_class = "geventwebsocket.gunicorn.workers.GeventWebSocketWorker"
 worker_connections = 1000
 
@@ -31,3 +40,29 @@ tmp_upload_dir = None
 # SSL (uncomment if using HTTPS directly with Gunicorn)
 # keyfile = None
 # certfile = None
+
+
+# Server hooks
+def on_starting(server):
+    """Refuse to run several workers on state that only lives in one worker"""
+    if server.cfg.workers <= 1:
+        return
+
+    from app.config import Config  # loads .env
+    missing = []
+    if Config.CACHE_BACKEND != 'redis':
+        missing.append('CACHE_BACKEND=redis (unread counts would drift apart per worker)')
+    if not Config.SOCKETIO_MESSAGE_QUEUE:
+        missing.append('SOCKETIO_MESSAGE_QUEUE (pushes would only reach one worker\'s clients)')
+    if missing:
+        server.log.error(f"{server.cfg.workers} workers require: {'; '.join(missing)}")
+        sys.exit(1)
+
+
+def worker_exit(server, worker):
+    """Flush write-behind buffers before the worker goes away"""
+    from app.services.play_counter import play_counter
+    from app.services.log_sink import behavior_log_sink
+    for flusher in (play_counter, behavior_log_sink):
+        if flusher.app is not None:
+            flusher.shutdown()
@@ -0,0 +1,24 @@
+"""Index lower(username) for case-insensitive login lookups
+
+Revision ID: a8c0e2b4d6f7
+Revises: f6a8c0e2b4d5
+Create Date: 2026-10-18 23:41:07.352918
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a8c0e2b4d6f7'
+down_revision = 'f6a8c0e2b4d5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('idx_username_lower', 'users', [sa.text('lower(username)')], unique=False)
+
+
+def downgrade():
+    op.drop_index('idx_username_lower', table_name='users')
@@ -0,0 +1,74 @@
+"""Shared fixtures: an app on ``TestingConfig`` and a freshly created schema per test
+
+The tests run against ``TEST_DATABASE_URL``; when it is not set, a temporary
+SQLite file is used so the suite runs without a database server.
+"""
+import os
+import tempfile
+
+if 'TEST_DATABASE_URL' not in os.environ:
+    os.environ['TEST_DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'test.db')
+os.environ['UPLOAD_FOLDER'] = tempfile.mkdtemp()
+
+import pytest
+from flask_jwt_extended import create_access_token
+from app import create_app
+from app.extensions import db as _db
+from app.models import User, Artist, Album, Song
+
+
+@pytest.fixture(scope='session')
+def app():
+    return create_app('testing')
+
+
+@pytest.fixture()
+def db(app):
+    with app.app_context():
+        _db.create_all()
+        yield _db
+        _db.session.remove()
+        _db.drop_all()
+
+
+@pytest.fixture()
+def client(app, db):
+    return app.test_client()
+
+
+@pytest.fixture()
+def user(db):
+    user = User(username='alice', email='alice@example.com', nickname='Alice')
+    user.set_password('secret1')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture()
+def auth_headers(app):
+    def headers(user_id):
+        return {'Authorization': 'Bearer ' + create_access_token(identity=str(user_id))}
+    return headers
+
+
+@pytest.fixture()
+def make_songs(db):
+    """Create songs, each by its own artist and on its own album by yet another artist"""
+    def make(count, **fields):
+        songs = []
+        for i in range(count):
+            artist = Artist(name=f'Artist {i}')
+            album_artist = Artist(name=f'Album Artist {i}')
+            db.session.add_all([artist, album_artist])
+            db.session.flush()
+            album = Album(title=f'Album {i}', artist_id=album_artist.id)
+            db.session.add(album)
+            db.session.flush()
+            song = Song(title=fields.get('title', f'Song {i}'), artist_id=artist.id, album_id=album.id,
+                        duration=200, play_count=fields.get('play_count', i))
+            db.session.add(song)
+            songs.append(song)
+        db.session.commit()
+        return songs
+    return make
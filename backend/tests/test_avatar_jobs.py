@@ -0,0 +1,91 @@
+"""Avatar jobs finish in the process pool's result thread and keep their state in the database"""
+import time
+from concurrent.futures import Future
+from io import BytesIO
+
+import pytest
+from PIL import Image
+from app.extensions import db as _db, socketio
+from app.models import User
+from app.services.avatar_service import AvatarStore, avatar_processor
+from app.utils.avatars import avatar_key, avatar_url_for
+
+
+@pytest.fixture()
+def emitted(monkeypatch):
+    events = []
+    monkeypatch.setattr(socketio, 'emit', lambda event, data, room=None: events.append((event, data, room)))
+    return events
+
+
+@pytest.fixture()
+def pool(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'AVATAR_PROCESSING_ASYNC', True)
+    monkeypatch.setitem(app.config, 'AVATAR_PROCESS_WORKERS', 1)
+    yield avatar_processor
+    avatar_processor.shutdown()
+    avatar_processor._executor = None
+
+
+def _image(color):
+    buffer = BytesIO()
+    Image.new('RGB', (64, 64), color).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+def _wait(user_id, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        # A fresh session each poll, as a status request on another worker would see it
+        _db.session.remove()
+        status = avatar_processor.status(user_id)
+        if status['status'] != 'pending':
+            return status
+        time.sleep(0.1)
+    raise AssertionError('avatar job did not finish')
+
+
+def test_completed_job_updates_user_and_notifies(db, user, pool, emitted):
+    data = _image('red')
+    job = pool.submit(user.id, data)
+    assert job['status'] == 'pending'
+    assert pool.status(user.id)['status'] == 'pending'
+
+    status = _wait(user.id)
+
+    assert status['status'] == 'ready'
+    assert status['avatar_url'] == avatar_url_for(avatar_key(data))
+    assert db.session.get(User, user.id).avatar_url == status['avatar_url']
+    assert AvatarStore.claim(avatar_key(data))
+    assert emitted == [('avatar_updated', {**status}, f'user_{user.id}')]
+
+
+def test_failed_job_is_recorded(db, user, pool, emitted):
+    job = pool.submit(user.id, b'not an image')
+
+    status = _wait(user.id)
+
+    assert status['job_id'] == job['job_id']
+    assert status['status'] == 'failed'
+    assert status['error'].startswith('Image compression failed')
+    assert db.session.get(User, user.id).avatar_url is None
+    assert emitted[0][1]['status'] == 'failed'
+
+
+def test_superseded_job_does_not_replace_newer_avatar(db, user, pool, emitted):
+    stale_job = pool.submit(user.id, _image('blue'))
+    current = _wait(user.id) if stale_job['status'] == 'pending' else stale_job
+    db.session.execute(
+        User.__table__.update().values(avatar_job_id='newer', avatar_job_status='pending')
+    )
+    db.session.commit()
+    emitted.clear()
+
+    done = Future()
+    done.set_result({})
+    pool._complete(user.id, stale_job['job_id'], 'stale', done)
+
+    db.session.remove()
+    assert pool.status(user.id) == {'job_id': 'newer', 'status': 'pending'}
+    assert db.session.get(User, user.id).avatar_url == current['avatar_url']
+    assert emitted == []
@@ -0,0 +1,67 @@
+"""The conversations table follows sent, read and deleted messages"""
+import pytest
+from app.models import User
+from app.models.message import Conversation
+
+
+@pytest.fixture()
+def bob(db):
+    bob = User(username='bob', email='bob@example.com', password_hash='x')
+    db.session.add(bob)
+    db.session.commit()
+    return bob
+
+
+def _send(client, auth_headers, sender, receiver, content):
+    response = client.post('/api/messages', json={'receiver_id': receiver.id, 'content': content},
+                           headers=auth_headers(sender.id))
+    assert response.status_code == 201
+    return response.get_json()
+
+
+def _row(db, user, partner):
+    db.session.expire_all()
+    return Conversation.query.filter_by(user_id=user.id, partner_id=partner.id).one_or_none()
+
+
+def test_sending_upserts_both_participants_rows(client, db, user, bob, auth_headers):
+    _send(client, auth_headers, user, bob, 'hi')
+    _send(client, auth_headers, bob, user, 'hello')
+    latest = _send(client, auth_headers, bob, user, 'you there?')
+
+    mine, theirs = _row(db, user, bob), _row(db, bob, user)
+    assert (mine.last_message_id, mine.unread_count) == (latest['id'], 2)
+    # Bob has not read Alice's message
+    assert (theirs.last_message_id, theirs.unread_count) == (latest['id'], 1)
+    assert Conversation.query.count() == 2
+
+    listed = client.get('/api/messages/conversations', headers=auth_headers(user.id)).get_json()
+    assert [(c['user']['id'], c['last_message']['content'], c['unread_count']) for c in listed] == [
+        (bob.id, 'you there?', 2)
+    ]
+
+
+def test_marking_read_clears_unread(client, db, user, bob, auth_headers):
+    first = _send(client, auth_headers, bob, user, 'one')
+    _send(client, auth_headers, bob, user, 'two')
+    _send(client, auth_headers, bob, user, 'three')
+
+    assert client.put(f"/api/messages/{first['id']}/read", headers=auth_headers(user.id)).status_code == 200
+    assert _row(db, user, bob).unread_count == 2
+
+    assert client.put(f'/api/messages/conversation/{bob.id}/read',
+                      headers=auth_headers(user.id)).status_code == 200
+    assert _row(db, user, bob).unread_count == 0
+
+
+def test_deleting_messages_refreshes_the_rows(client, db, user, bob, auth_headers):
+    first = _send(client, auth_headers, user, bob, 'first')
+    last = _send(client, auth_headers, bob, user, 'last')
+
+    assert client.delete(f"/api/messages/{last['id']}", headers=auth_headers(user.id)).status_code == 200
+    mine, theirs = _row(db, user, bob), _row(db, bob, user)
+    assert (mine.last_message_id, mine.unread_count) == (first['id'], 0)
+    assert (theirs.last_message_id, theirs.unread_count) == (first['id'], 1)
+
+    assert client.delete(f"/api/messages/{first['id']}", headers=auth_headers(bob.id)).status_code == 200
+    assert _row(db, user, bob) is None and _row(db, bob, user) is None
@@ -0,0 +1,54 @@
+"""Atomic like/comment counters and their reconciliation"""
+from sqlalchemy import select, update
+from app.models import Comment, Like, Song
+from app.services.counter_service import CounterService
+
+
+def _like_count(db, song):
+    return db.session.scalar(select(Song.like_count).where(Song.id == song.id))
+
+
+def test_double_like_is_rejected_without_counting(client, db, user, make_songs, auth_headers):
+    song = make_songs(1)[0]
+
+    first = client.post(f'/api/songs/{song.id}/like', headers=auth_headers(user.id))
+    second = client.post(f'/api/songs/{song.id}/like', headers=auth_headers(user.id))
+
+    assert first.status_code == 200 and first.get_json()['like_count'] == 1
+    assert second.status_code == 400
+    assert _like_count(db, song) == 1
+    assert Like.query.filter_by(user_id=user.id, song_id=song.id).count() == 1
+
+
+def test_unlike_never_drives_the_count_below_zero(client, db, user, make_songs, auth_headers):
+    song = make_songs(1)[0]
+    db.session.add(Like(user_id=user.id, song_id=song.id))
+    db.session.commit()  # like_count drifted: still 0
+
+    response = client.delete(f'/api/songs/{song.id}/like', headers=auth_headers(user.id))
+
+    assert response.status_code == 200
+    assert response.get_json()['like_count'] == 0
+    assert _like_count(db, song) == 0
+    assert client.delete(f'/api/songs/{song.id}/like', headers=auth_headers(user.id)).status_code == 400
+
+
+def test_reconcile_repairs_drifted_song_counters(db, user, make_songs):
+    drifted, correct = make_songs(2)
+    db.session.add(Like(user_id=user.id, song_id=drifted.id))
+    top = Comment(user_id=user.id, song_id=drifted.id, content='nice')
+    db.session.add(top)
+    db.session.flush()
+    db.session.add(Comment(user_id=user.id, song_id=drifted.id, content='agreed', parent_id=top.id))
+    db.session.execute(update(Song).where(Song.id == drifted.id).values(like_count=5, comment_count=3))
+    db.session.commit()
+    updated_at = drifted.updated_at
+
+    fixed = CounterService.reconcile()
+
+    assert fixed['song_likes'] == 1
+    assert fixed['song_comments'] == 1
+    db.session.expire_all()
+    assert (drifted.like_count, drifted.comment_count) == (1, 1)
+    assert (correct.like_count, correct.comment_count) == (0, 0)
+    assert drifted.updated_at == updated_at
@@ -0,0 +1,63 @@
+"""Friends timeline: fan-out on write, capped on read, trimmed offline"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import delete, func, insert, select
+from app.models import Follow, User
+from app.models.feed import FeedItem
+from app.services.feed_service import FeedService
+
+
+@pytest.fixture()
+def cap(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'FEED_MAX_ITEMS', 3)
+    return 3
+
+
+@pytest.fixture()
+def followers(db, user):
+    users = [User(username=f'fan{i}', email=f'fan{i}@example.com', password_hash='x') for i in range(2)]
+    db.session.add_all(users)
+    db.session.flush()
+    db.session.execute(insert(Follow), [{'follower_id': fan.id, 'following_id': user.id} for fan in users])
+    db.session.commit()
+    return users
+
+
+def _timeline_size(db, owner_id):
+    return db.session.scalar(select(func.count()).select_from(FeedItem).where(FeedItem.owner_id == owner_id))
+
+
+def test_fan_out_does_not_trim_but_reads_stay_capped(client, db, user, followers, cap, make_songs, auth_headers):
+    song = make_songs(1)[0]
+    start = datetime(2026, 1, 1)
+    FeedService.push_activities(user.id, [('play', song.id, start + timedelta(minutes=i)) for i in range(5)])
+    db.session.commit()
+
+    assert _timeline_size(db, followers[0].id) == 5
+    response = client.get('/api/feed/friends-activity', headers=auth_headers(followers[0].id))
+    body = response.get_json()
+    assert body['total'] == cap
+    assert [a['created_at'] for a in body['activities']] == [
+        (start + timedelta(minutes=i)).isoformat() for i in (4, 3, 2)
+    ]
+
+
+def test_trim_only_deletes_rows_past_the_cap(db, user, followers, cap, make_songs):
+    song = make_songs(1)[0]
+    start = datetime(2026, 1, 1)
+    FeedService.push_activities(user.id, [('like', song.id, start + timedelta(minutes=i)) for i in range(5)])
+    db.session.execute(delete(FeedItem).where(FeedItem.owner_id == followers[1].id))
+    db.session.commit()
+    FeedService.push_activity(user.id, 'play', song.id, start)
+
+    assert FeedService.trim() == 3
+    db.session.commit()
+
+    assert _timeline_size(db, followers[0].id) == cap
+    assert _timeline_size(db, followers[1].id) == 1
+    newest = db.session.scalars(
+        select(FeedItem.created_at).where(FeedItem.owner_id == followers[0].id).order_by(FeedItem.created_at)
+    ).all()
+    assert newest == [start + timedelta(minutes=i) for i in (2, 3, 4)]
+
@@ -0,0 +1,99 @@
+"""Follow edge checks must not depend on which worker saw the follow"""
+import threading
+import time
+import pytest
+from sqlalchemy import insert
+from app.models import Follow, User
+from app.services.social_graph import social_graph
+
+
+@pytest.fixture()
+def graph(db):
+    social_graph.build()
+    yield social_graph
+    social_graph._following = social_graph._followers = None
+
+
+@pytest.fixture()
+def bob(db):
+    bob = User(username='bob', email='bob@example.com', password_hash='x')
+    db.session.add(bob)
+    db.session.commit()
+    return bob
+
+
+def _follow_in_another_worker(db, follower_id, following_id):
+    """Commit a follow this worker's graph never hears about"""
+    db.session.execute(insert(Follow).values(follower_id=follower_id, following_id=following_id))
+    db.session.commit()
+
+
+def test_is_following_sees_follows_from_other_workers(client, db, graph, user, bob, auth_headers):
+    _follow_in_another_worker(db, user.id, bob.id)
+
+    assert not graph.following_ids(user.id, [bob.id])
+    response = client.get(f'/api/social/is-following/{bob.id}', headers=auth_headers(user.id))
+    assert response.get_json() == {'is_following': True}
+
+
+def test_mutual_follow_check_for_messages_reads_the_database(client, db, graph, user, bob, auth_headers,
+                                                             app, monkeypatch):
+    monkeypatch.setitem(app.config, 'REQUIRE_MUTUAL_FOLLOW_FOR_MESSAGE', True)
+
+    def send():
+        return client.post('/api/messages', json={'receiver_id': bob.id, 'content': 'hi'},
+                           headers=auth_headers(user.id))
+
+    _follow_in_another_worker(db, user.id, bob.id)
+    assert send().status_code == 403
+
+    _follow_in_another_worker(db, bob.id, user.id)
+    assert send().status_code == 201
+
+
+@pytest.fixture()
+def unbuilt_graph(db):
+    social_graph._following = social_graph._followers = social_graph._pending = None
+    yield social_graph
+    social_graph._following = social_graph._followers = social_graph._pending = None
+
+
+def test_failed_build_stops_collecting_changes(unbuilt_graph, monkeypatch):
+    def broken(edges):
+        raise RuntimeError('database went away')
+
+    monkeypatch.setattr(unbuilt_graph, 'build_from', broken)
+    with pytest.raises(RuntimeError):
+        unbuilt_graph.followees(1)
+
+    assert unbuilt_graph._pending is None
+    for i in range(3):
+        unbuilt_graph.apply(1, i + 2, True)
+    assert unbuilt_graph._pending is None
+
+
+def test_concurrent_first_reads_build_once(app, db, user, bob, unbuilt_graph, monkeypatch):
+    _follow_in_another_worker(db, user.id, bob.id)
+    builds = []
+    build_from = unbuilt_graph.build_from
+
+    def slow_build_from(edges):
+        builds.append(threading.get_ident())
+        time.sleep(0.1)
+        build_from(edges)
+
+    monkeypatch.setattr(unbuilt_graph, 'build_from', slow_build_from)
+    results = []
+
+    def read():
+        with app.app_context():
+            results.append(unbuilt_graph.followees(user.id))
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    for reader in readers:
+        reader.join()
+
+    assert len(builds) == 1
+    assert results == [[bob.id]] * 4
@@ -0,0 +1,20 @@
+"""Liveness is public; worker internals need the internal token"""
+
+
+def test_health_reports_liveness_only(client):
+    response = client.get('/health')
+
+    assert response.status_code == 200
+    assert response.get_json() == {'status': 'healthy'}
+
+
+def test_internal_stats_require_the_token(client, app, monkeypatch):
+    assert client.get('/internal/stats').status_code == 404
+
+    monkeypatch.setitem(app.config, 'INTERNAL_STATS_TOKEN', 's3cret')
+    assert client.get('/internal/stats').status_code == 404
+    assert client.get('/internal/stats', headers={'X-Internal-Token': 'wrong'}).status_code == 404
+
+    response = client.get('/internal/stats', headers={'X-Internal-Token': 's3cret'})
+    assert response.status_code == 200
+    assert set(response.get_json()) == {'behavior_log_sink', 'password_hasher', 'login_limiter'}
@@ -0,0 +1,72 @@
+"""Batched behavior log writes"""
+from datetime import datetime
+import pytest
+from sqlalchemy import event
+from app.models import FeedItem, Follow, User, UserBehaviorLog
+from app.services.log_sink import behavior_log_sink
+
+
+@pytest.fixture()
+def sink(db, monkeypatch):
+    monkeypatch.setattr(behavior_log_sink, 'ensure_started', lambda: None)
+    behavior_log_sink.flush()
+    return behavior_log_sink
+
+
+@pytest.fixture()
+def followed_users(db):
+    """Two actors, each followed by two other users"""
+    users = [User(username=f'user{i}', email=f'user{i}@example.com', password_hash='x') for i in range(4)]
+    db.session.add_all(users)
+    db.session.flush()
+    for actor in users[:2]:
+        for follower in users[2:]:
+            db.session.add(Follow(follower_id=follower.id, following_id=actor.id))
+    db.session.commit()
+    return users[:2]
+
+
+def _row(user_id, action_type, song_id):
+    return {'user_id': user_id, 'action_type': action_type, 'song_id': song_id, 'artist_id': None,
+            'duration': None, 'extra_data': {}, 'ip_address': None, 'user_agent': None,
+            'created_at': datetime.utcnow()}
+
+
+def test_bad_row_only_drops_itself(sink, db, followed_users, make_songs):
+    song = make_songs(1)[0]
+    actor = followed_users[0]
+    rows = [_row(actor.id, 'play', song.id) for _ in range(6)]
+    rows[3]['action_type'] = None  # violates NOT NULL
+    for row in rows:
+        sink.submit(row)
+
+    before = sink.stats()
+    assert sink.flush() == 5
+
+    stats = sink.stats()
+    assert stats['flushed'] - before['flushed'] == 5
+    assert stats['dropped'] - before['dropped'] == 1
+    assert UserBehaviorLog.query.count() == 5
+    assert FeedItem.query.count() == 5 * 2
+
+
+def test_fan_out_runs_one_insert_per_actor(sink, db, followed_users, make_songs):
+    song = make_songs(1)[0]
+    for i in range(10):
+        sink.submit(_row(followed_users[i % 2].id, 'like' if i % 3 else 'play', song.id))
+
+    inserts = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('INSERT INTO FEED_ITEMS'):
+            inserts.append(statement)
+
+    event.listen(db.engine, 'after_cursor_execute', record)
+    try:
+        sink.flush()
+    finally:
+        event.remove(db.engine, 'after_cursor_execute', record)
+
+    assert len(inserts) == 2
+    for actor in followed_users:
+        assert FeedItem.query.filter_by(actor_id=actor.id).count() == 5 * 2
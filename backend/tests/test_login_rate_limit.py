@@ -0,0 +1,47 @@
+"""Login rate limiting buckets"""
+import logging
+
+import pytest
+from app.services.rate_limiter import MemoryBuckets, login_limiter
+
+
+@pytest.fixture()
+def limiter(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'LOGIN_RATE_LIMIT_ENABLED', True)
+    monkeypatch.setitem(app.config, 'LOGIN_ACCOUNT_BURST', 3)
+    monkeypatch.setitem(app.config, 'LOGIN_ACCOUNT_PER_MINUTE', 0.001)
+    monkeypatch.setattr(login_limiter, 'backend', MemoryBuckets())
+    return login_limiter
+
+
+def _login(client, identifier, password='wrong1'):
+    return client.post('/api/auth/login', json={'identifier': identifier, 'password': password})
+
+
+def test_username_and_email_share_the_account_bucket(client, user, limiter):
+    for identifier in ['alice', 'ALICE', 'alice@example.com']:
+        assert _login(client, identifier).status_code == 401
+
+    for identifier in ['Alice', 'alice@example.com', 'ALICE@example.com']:
+        response = _login(client, identifier, 'secret1')
+        assert response.status_code == 429
+        assert int(response.headers['Retry-After']) > 0
+
+
+def test_successful_login_clears_both_forms(client, user, limiter):
+    for _ in range(2):
+        assert _login(client, 'alice@example.com').status_code == 401
+    assert _login(client, 'alice', 'secret1').status_code == 200
+
+    for _ in range(2):
+        assert _login(client, 'alice').status_code == 401
+    assert _login(client, 'alice@example.com', 'secret1').status_code == 200
+
+
+def test_forwarded_request_without_trusted_proxy_warns(client, caplog):
+    assert client.application.config['TRUSTED_PROXY_COUNT'] == 0
+
+    with caplog.at_level(logging.WARNING):
+        client.get('/health', headers={'X-Forwarded-For': '203.0.113.7'})
+
+    assert any('TRUSTED_PROXY_COUNT is 0' in record.getMessage() for record in caplog.records)
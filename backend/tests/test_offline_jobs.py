@@ -0,0 +1,132 @@
+"""Batch jobs run in a child process, not in the web worker"""
+import os
+import threading
+import time
+import pytest
+from app.models import Follow, Like, User, UserBehaviorLog
+from app.models.suggestion import FollowSuggestion
+from app.services import recommendation_service, suggestion_service
+from app.services.cache import cache
+from app.services.recommendation_service import RecommendationService, recommendation_job
+from app.services.suggestion_service import SuggestionService, suggestion_job
+
+
+def test_suggestion_job_computes_in_a_child_process(db, monkeypatch):
+    users = [User(username=f'user{i}', email=f'user{i}@example.com', password_hash='x') for i in range(3)]
+    db.session.add_all(users)
+    db.session.flush()
+    # 0 follows 1, 1 follows 2: 2 is suggested to 0
+    db.session.add_all([Follow(follower_id=users[0].id, following_id=users[1].id),
+                        Follow(follower_id=users[1].id, following_id=users[2].id)])
+    db.session.commit()
+
+    def compute_here(now=None):
+        raise AssertionError(f'computed in the web worker (pid {os.getpid()})')
+
+    monkeypatch.setattr(suggestion_service.SuggestionService, 'compute', staticmethod(compute_here))
+    assert suggestion_job.due()
+    suggestion_job.flush()
+
+    suggestion = FollowSuggestion.query.filter_by(user_id=users[0].id).one()
+    assert suggestion.candidate_id == users[2].id
+    assert not SuggestionService.is_stale()
+    assert not suggestion_job.due()
+
+
+def test_suggestion_job_is_skipped_while_another_worker_runs_it(db, monkeypatch):
+    spawned = []
+    monkeypatch.setattr(suggestion_job, '_spawn', lambda: spawned.append(os.getpid()))
+
+    assert cache.add('offline_job:suggestion_job', 'other worker', 60)
+    suggestion_job.flush()
+    assert spawned == []
+
+    cache.delete('offline_job:suggestion_job')
+    suggestion_job.flush()
+    assert spawned == [os.getpid()]
+    assert cache.get('offline_job:suggestion_job') is None
+
+
+def test_concurrent_flushes_spawn_the_job_once(app, db, monkeypatch):
+    spawned = []
+
+    def slow_spawn():
+        spawned.append(threading.get_ident())
+        time.sleep(0.2)
+
+    monkeypatch.setattr(suggestion_job, '_spawn', slow_spawn)
+
+    def flush():
+        with app.app_context():
+            suggestion_job.flush()
+
+    workers = [threading.Thread(target=flush) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert len(spawned) == 1
+
+
+@pytest.fixture()
+def model_dir(app, monkeypatch, tmp_path):
+    # The child builds its config from the environment
+    monkeypatch.setenv('RECOMMENDATION_MODEL_DIR', str(tmp_path))
+    monkeypatch.setitem(app.config, 'RECOMMENDATION_MODEL_DIR', str(tmp_path))
+    yield tmp_path
+    RecommendationService._model = RecommendationService._version = RecommendationService._checked_at = None
+
+
+def test_recommendation_job_trains_in_a_child_process(db, user, make_songs, model_dir, monkeypatch):
+    songs = make_songs(3)
+    db.session.add_all([UserBehaviorLog(user_id=user.id, action_type='play', song_id=song.id)
+                        for song in songs])
+    db.session.commit()
+
+    def train_here(*args, **kwargs):
+        raise AssertionError(f'trained in the web worker (pid {os.getpid()})')
+
+    monkeypatch.setattr(recommendation_service.RecommendationService, 'train', staticmethod(train_here))
+    assert recommendation_job.due()
+    recommendation_job.flush()
+
+    model = RecommendationService.model()
+    assert model is not None and model.meta['users'] == 1
+    assert not recommendation_job.due()
+
+
+def test_recommendation_job_trains_once_across_workers(app, db, user, make_songs, model_dir, monkeypatch):
+    songs = make_songs(2)
+    db.session.add_all([UserBehaviorLog(user_id=user.id, action_type='play', song_id=song.id)
+                        for song in songs])
+    db.session.commit()
+
+    # Another worker holds the lock and its child saves a model meanwhile
+    assert cache.add('offline_job:recommendation_job', 'other worker', 60)
+    recommendation_job.flush()
+    assert RecommendationService.current_version() is None
+
+    with app.app_context():
+        RecommendationService.refresh(force=True)
+    cache.delete('offline_job:recommendation_job')
+
+    # This worker still remembers there was no model, but must not train again
+    RecommendationService._checked_at = time.monotonic()
+    RecommendationService._model = None
+    trained = []
+    monkeypatch.setattr(recommendation_job, '_spawn', lambda: trained.append(True))
+    recommendation_job.flush()
+    assert trained == []
+
+
+def test_popular_top_up_skips_liked_songs(client, db, user, make_songs, auth_headers):
+    songs = make_songs(5)
+    liked = songs[-1]  # the most played
+    db.session.add(Like(user_id=user.id, song_id=liked.id))
+    db.session.commit()
+
+    data = client.get('/api/recommendations?limit=10', headers=auth_headers(user.id)).get_json()
+
+    assert data['source'] == 'popular'
+    assert [song['id'] for song in data['songs']] == [song.id for song in reversed(songs[:-1])]
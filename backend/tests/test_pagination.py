@@ -0,0 +1,95 @@
+"""Keyset cursors of the message, comment and user list endpoints"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+from app.models import Comment, Follow, User
+from app.models.message import Message
+from app.utils.pagination import InvalidCursor, decode_cursor, encode_cursor
+
+START = datetime(2026, 1, 1)
+
+
+@pytest.fixture()
+def others(db):
+    users = [User(username=f'fan{i}', email=f'fan{i}@example.com', password_hash='x') for i in range(5)]
+    db.session.add_all(users)
+    db.session.commit()
+    return users
+
+
+def _walk(client, url, items, headers=None):
+    """Follow next_cursor two items at a time; returns the ids seen"""
+    seen, cursor = [], ''
+    for _ in range(10):
+        data = client.get(f'{url}per_page=2&cursor={cursor}', headers=headers).get_json()
+        seen += [item['id'] for item in data[items]]
+        cursor = data['next_cursor']
+        if not cursor:
+            return seen
+    pytest.fail('cursor did not reach the end')
+
+
+# Not issued by the server: undecodable, and well-formed but with wrongly typed keys
+BAD_CURSORS = ['not-a-cursor', encode_cursor(['2026-01-01T00:00:00', 'x']), encode_cursor([None, 1])]
+
+
+def test_messages(client, db, user, others, auth_headers):
+    bob = others[0]
+    db.session.execute(insert(Message), [
+        {'sender_id': (user.id, bob.id)[i % 2], 'receiver_id': (bob.id, user.id)[i % 2],
+         'content': str(i), 'is_read': False, 'created_at': START + timedelta(minutes=i // 2)}
+        for i in range(5)
+    ])
+    db.session.commit()
+    url = f'/api/messages/conversation/{bob.id}?'
+    expected = [m.id for m in Message.query.order_by(Message.created_at.desc(), Message.id.desc())]
+
+    assert _walk(client, url, 'messages', auth_headers(user.id)) == expected
+    for cursor in BAD_CURSORS:
+        assert client.get(f'{url}cursor={cursor}', headers=auth_headers(user.id)).status_code == 400
+
+
+def test_comments(client, db, user, make_songs):
+    song = make_songs(1)[0]
+    db.session.execute(insert(Comment), [
+        {'user_id': user.id, 'song_id': song.id, 'content': str(i), 'like_count': 0,
+         'created_at': START, 'updated_at': START}
+        for i in range(5)
+    ])
+    db.session.commit()
+    url = f'/api/songs/{song.id}/comments?'
+
+    assert _walk(client, url, 'comments') == sorted((c.id for c in Comment.query), reverse=True)
+    for cursor in BAD_CURSORS:
+        assert client.get(f'{url}cursor={cursor}').status_code == 400
+
+
+def test_followers(client, db, user, others):
+    db.session.execute(insert(Follow), [
+        {'follower_id': fan.id, 'following_id': user.id, 'created_at': START + timedelta(minutes=i)}
+        for i, fan in enumerate(others)
+    ])
+    db.session.execute(User.__table__.update().where(User.id == user.id).values(followers_count=len(others)))
+    db.session.commit()
+    url = f'/api/social/followers/{user.id}?'
+
+    assert _walk(client, url, 'followers') == [fan.id for fan in reversed(others)]
+    for cursor in BAD_CURSORS:
+        assert client.get(f'{url}cursor={cursor}').status_code == 400
+
+
+def test_user_search(client, db, others):
+    url = '/api/users/search?q=fan&'
+
+    assert _walk(client, url, 'users') == [fan.id for fan in others]
+    for cursor in ['not-a-cursor', encode_cursor(['1']), encode_cursor([True]), encode_cursor([1.5])]:
+        assert client.get(f'{url}cursor={cursor}').status_code == 400
+
+
+def test_decode_cursor_checks_key_types():
+    columns = (Message.created_at, Message.id)
+    assert decode_cursor(encode_cursor([START, 3]), columns) == [START, 3]
+    for values in (['2026-01-01', '3'], [1767225600, 3], ['2026-01-01', False], ['2026-01-01', [3]]):
+        with pytest.raises(InvalidCursor):
+            decode_cursor(encode_cursor(values), columns)
@@ -0,0 +1,67 @@
+"""Play count buffering, reconciliation and cache invalidation"""
+from datetime import datetime, timedelta
+import pytest
+from app.models.log import UserBehaviorLog
+from app.services.cache import cache
+from app.services.counter_service import CounterService
+from app.services.play_counter import play_counter
+from app.services.response_cache import tag_versions
+
+
+@pytest.fixture()
+def response_cache_on(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'RESPONSE_CACHE_ENABLED', True)
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def _log_plays(db, user_id, song_id, count, age):
+    created_at = datetime.utcnow() - age
+    db.session.add_all([
+        UserBehaviorLog(user_id=user_id, action_type='play', song_id=song_id, created_at=created_at)
+        for _ in range(count)
+    ])
+    db.session.commit()
+
+
+def test_reconcile_restores_lost_play_counts(db, user, make_songs):
+    lost, seeded = make_songs(2)
+    lost.play_count = 1
+    seeded.play_count = 50
+    db.session.commit()
+
+    _log_plays(db, user.id, lost.id, 4, timedelta(hours=1))
+    _log_plays(db, user.id, seeded.id, 4, timedelta(hours=1))
+    # Too recent: may still be buffered in a worker
+    _log_plays(db, user.id, lost.id, 3, timedelta(seconds=1))
+
+    fixed = CounterService.reconcile()
+
+    assert fixed['song_plays'] == 1
+    db.session.refresh(lost)
+    db.session.refresh(seeded)
+    assert lost.play_count == 4
+    assert seeded.play_count == 50
+
+
+def test_play_flush_only_expires_responses_showing_the_song(client, db, make_songs, response_cache_on,
+                                                             monkeypatch, app):
+    monkeypatch.setitem(app.config, 'PLAY_COUNT_BUFFER_ENABLED', True)
+    monkeypatch.setattr(play_counter, 'ensure_started', lambda: None)
+    played, other = make_songs(2)
+    paths = {song.id: f'/api/artists/{song.artist_id}/songs' for song in (played, other)}
+    for path in paths.values():
+        assert client.get(path).status_code == 200
+
+    def is_fresh(song):
+        entry = cache.get(f'resp:music.get_artist_songs:{paths[song.id]}?')
+        return entry['versions'] == tag_versions(entry['tags'])
+
+    assert is_fresh(played) and is_fresh(other)
+
+    play_counter.increment(played.id, 5)
+    play_counter.flush()
+
+    assert not is_fresh(played)
+    assert is_fresh(other)
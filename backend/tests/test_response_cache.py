@@ -0,0 +1,44 @@
+"""Cached catalog responses: invalidated entries are recomputed, expired ones revalidated"""
+import pytest
+from sqlalchemy import update
+from app.models import Song
+from app.services.cache import cache
+from app.services.response_cache import response_cache
+
+
+@pytest.fixture()
+def response_cache_on(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'RESPONSE_CACHE_ENABLED', True)
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def _song(client, song):
+    songs = client.get(f'/api/artists/{song.artist_id}/songs').get_json()['songs']
+    return next(row for row in songs if row['id'] == song.id)
+
+
+def test_like_shows_up_on_the_next_read(client, db, user, make_songs, auth_headers, response_cache_on):
+    song = make_songs(1)[0]
+    assert _song(client, song)['like_count'] == 0
+
+    assert client.post(f'/api/songs/{song.id}/like', headers=auth_headers(user.id)).status_code == 200
+
+    assert _song(client, song)['like_count'] == 1
+
+
+def test_expired_entry_is_served_stale_while_refreshed(client, db, make_songs, response_cache_on,
+                                                       app, monkeypatch):
+    monkeypatch.setitem(app.config, 'RESPONSE_CACHE_TTL', 0)
+    song = make_songs(1, play_count=7)[0]
+    assert _song(client, song)['play_count'] == 7
+
+    # Written without invalidating: only the TTL expires the entry
+    db.session.execute(update(Song).where(Song.id == song.id).values(play_count=8))
+    db.session.commit()
+
+    assert _song(client, song)['play_count'] == 7
+    for refreshing in list(response_cache._inflight.values()):
+        refreshing.wait(timeout=10)
+    assert _song(client, song)['play_count'] == 8
@@ -0,0 +1,48 @@
+"""Keyset pagination of ranked search results"""
+import pytest
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from app.schemas.music import song_rows_query
+from app.services.search_service import FTS_TABLES, SearchService
+
+
+@pytest.fixture()
+def search_index(db):
+    sqlite = db.engine.dialect.name == 'sqlite'
+    if sqlite:
+        SearchService.create_fts5_tables()
+        db.session.commit()
+    yield
+    if sqlite:
+        for fts_table in FTS_TABLES.values():
+            db.session.execute(text(f'DROP TABLE IF EXISTS {fts_table}'))
+        db.session.commit()
+    SearchService._fts5_ready = None
+
+
+def test_cursor_pages_through_tied_ranks(client, make_songs, search_index):
+    # Same title and play count: rank and popularity tie, only the id orders them
+    songs = make_songs(7, title='Yellow Submarine', play_count=3)
+    make_songs(2, title='Something Else')
+
+    seen = []
+    cursor = ''
+    for _ in range(len(songs) + 1):
+        data = client.get(f'/api/search?q=yellow&type=songs&per_page=2&cursor={cursor}').get_json()
+        seen += [song['id'] for song in data['songs']]
+        cursor = data['songs_next_cursor']
+        if not cursor:
+            break
+    else:
+        pytest.fail('cursor did not advance past tied ranks')
+
+    assert seen == sorted(song.id for song in songs)[::-1]
+
+
+def test_postgres_rank_is_double_precision(app, db, monkeypatch):
+    monkeypatch.setitem(app.config, 'SEARCH_BACKEND', 'postgres')
+    _, rank = SearchService.search_songs(song_rows_query(), 'yellow')
+
+    sql = str(rank.compile(dialect=postgresql.dialect()))
+    assert 'CAST(ts_rank(' in sql
+    assert 'AS DOUBLE PRECISION)' in sql
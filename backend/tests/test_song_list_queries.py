@@ -0,0 +1,67 @@
+"""The song list must not issue per-song queries"""
+import pytest
+from sqlalchemy import event
+
+
+@pytest.fixture()
+def count_queries(db):
+    """Return a function running a callable and counting the SQL statements it executes"""
+    def count(fn):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        engine = db.engine
+        event.listen(engine, 'after_cursor_execute', record)
+        try:
+            fn()
+        finally:
+            event.remove(engine, 'after_cursor_execute', record)
+        return len(statements)
+    return count
+
+
+def _get(client, url, headers=None):
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+@pytest.mark.parametrize('url', [
+    '/api/songs?per_page=50',
+    '/api/songs?per_page=50&cursor=',
+    '/api/songs/latest?limit=50',
+])
+def test_song_list_query_count_is_constant(client, make_songs, count_queries, url):
+    make_songs(3)
+    few = count_queries(lambda: _get(client, url))
+
+    make_songs(30)
+    many = count_queries(lambda: _get(client, url))
+
+    assert len(_get(client, url)['songs']) == 33
+    assert many == few
+
+
+def test_song_list_with_like_status_query_count_is_constant(client, user, make_songs, count_queries,
+                                                            auth_headers):
+    url = '/api/songs?per_page=50&include_liked=true'
+    headers = auth_headers(user.id)
+
+    make_songs(3)
+    few = count_queries(lambda: _get(client, url, headers))
+
+    make_songs(30)
+    many = count_queries(lambda: _get(client, url, headers))
+
+    assert many == few
+
+
+def test_song_list_payload_includes_joined_rows(client, make_songs):
+    make_songs(1)
+    song = _get(client, '/api/songs')['songs'][0]
+
+    assert song['artist']['name'] == 'Artist 0'
+    assert song['album']['title'] == 'Album 0'
+    assert song['album']['artist']['name'] == 'Album Artist 0'
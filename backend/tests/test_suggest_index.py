@@ -0,0 +1,49 @@
+"""Search-as-you-type suggestions"""
+import pytest
+from app.models.music import Song
+from app.services.suggest_index import suggest_index
+
+
+@pytest.fixture()
+def index(db):
+    suggest_index.build()
+    yield suggest_index
+    suggest_index._keys = suggest_index._entries = suggest_index._top = None
+
+
+def _titles(results):
+    return [song['title'] for song in results['songs']]
+
+
+def test_most_played_match_wins_wherever_it_sorts(index, db, make_songs):
+    # 200 "a..." titles; the most played one sorts last alphabetically
+    songs = make_songs(200, play_count=1)
+    for i, song in enumerate(songs):
+        song.title = f'a{i:03d}'
+    songs[-1].play_count = 1000
+    db.session.commit()
+    index.build()
+
+    for prefix in ('a', 'a1', 'a19'):
+        assert _titles(index.suggest(prefix, kinds=('songs',), limit=3))[0] == 'a199'
+
+
+def test_exact_match_comes_first(index, db, make_songs):
+    songs = make_songs(3, play_count=1)
+    songs[0].title, songs[1].title, songs[2].title = 'Love', 'Love Story', 'Lovely'
+    songs[1].play_count = songs[2].play_count = 100
+    db.session.commit()
+
+    assert _titles(index.suggest('love', kinds=('songs',)))[0] == 'Love'
+
+
+def test_cached_prefix_sees_committed_changes(index, db, make_songs):
+    make_songs(5, title='Blue', play_count=1)
+    assert 'Bluebird' not in _titles(index.suggest('b', kinds=('songs',), limit=3))
+
+    song = make_songs(1, title='Bluebird', play_count=500)[0]
+    assert _titles(index.suggest('b', kinds=('songs',), limit=3))[0] == 'Bluebird'
+
+    db.session.delete(db.session.get(Song, song.id))
+    db.session.commit()
+    assert 'Bluebird' not in _titles(index.suggest('b', kinds=('songs',), limit=3))
@@ -0,0 +1,63 @@
+"""Trending charts are refreshed once at a time, off the web worker, and count late events"""
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+from app.models import UserBehaviorLog
+from app.models.trending import SongHourlyStat, TrendingEntry
+from app.services import trending_service
+from app.services.cache import cache
+from app.services.trending_service import REFRESH_LOCK, TrendingService, trending_job
+
+
+def _plays(db, user, song, at, count=1):
+    db.session.add_all([UserBehaviorLog(user_id=user.id, action_type='play', song_id=song.id, created_at=at)
+                        for _ in range(count)])
+    db.session.commit()
+
+
+def test_late_events_are_aggregated_on_the_next_run(db, user, make_songs):
+    song = make_songs(1)[0]
+    now = datetime.utcnow()
+    _plays(db, user, song, now)
+    TrendingService.refresh(force=True)
+
+    # Written by the log sink after the run, but timestamped an hour earlier
+    late = now - timedelta(hours=1)
+    _plays(db, user, song, late, count=2)
+    TrendingService.refresh(force=True)
+
+    plays = db.session.scalars(
+        select(SongHourlyStat.plays).where(SongHourlyStat.song_id == song.id).order_by(SongHourlyStat.bucket_start)
+    ).all()
+    assert plays == [2, 1]
+
+
+def test_refresh_is_skipped_while_another_process_refreshes(db, user, make_songs):
+    song = make_songs(1)[0]
+    _plays(db, user, song, datetime.utcnow())
+
+    assert cache.add(REFRESH_LOCK, 'other process', 60)
+    try:
+        assert TrendingService.refresh(force=True) is None
+        assert db.session.scalars(select(TrendingEntry)).first() is None
+    finally:
+        cache.delete(REFRESH_LOCK)
+
+    assert TrendingService.refresh(force=True) > 0
+    assert cache.get(REFRESH_LOCK) is None
+
+
+def test_trending_job_computes_in_a_child_process(db, user, make_songs, monkeypatch):
+    song = make_songs(1)[0]
+    _plays(db, user, song, datetime.utcnow())
+
+    def compute_here(now=None):
+        raise AssertionError(f'computed in the web worker (pid {os.getpid()})')
+
+    monkeypatch.setattr(trending_service.TrendingService, 'compute', staticmethod(compute_here))
+    assert trending_job.due()
+    trending_job.flush()
+
+    assert TrendingService.chart('24h') == [song.id]
+    assert not trending_job.due()
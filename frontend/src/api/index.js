@@ -104,6 +104,7 @@ export const userAPI = {
   uploadAvatar: (formData) => api.post('/users/me/avatar', formData, {
     headers: { 'Content-Type': 'multipart/form-data' },
   }),
+  getAvatarStatus: () => api.get('/users/me/avatar/status'),
   getFollowers: (userId) => api.get(`/users/${userId}/followers`),
   getFollowing: (userId) => api.get(`/users/${userId}/following`),
   searchUsers: (query) => api.get('/users/search', { params: { q: query } }),
@@ -114,8 +115,9 @@ export const socialAPI = {
   followUser: (userId) => api.post(`/social/follow/${userId}`),
   unfollowUser: (userId) => api.delete(`/social/follow/${userId}`),
   isFollowing: (userId) => api.get(`/social/is-following/${userId}`),
-  getFollowers: (userId) => api.get(`/social/followers/${userId}`),
-  getFollowing: (userId) => api.get(`/social/following/${userId}`),
+  getSuggestions: (limit = 10) => api.get('/social/suggestions', { params: { limit } }),
+  getFollowers: (userId, params) => api.get(`/social/followers/${userId}`, { params }),
+  getFollowing: (userId, params) => api.get(`/social/following/${userId}`, { params }),
 };
 
 // Music API
@@ -124,6 +126,7 @@ export const musicAPI = {
   getSongDetail: (songId) => api.get(`/songs/${songId}`),
   getTrendingSongs: () => api.get('/songs/trending'),
   getLatestSongs: () => api.get('/songs/latest'),
+  getRecommendations: (limit = 20) => api.get('/recommendations', { params: { limit } }),
   getArtists: () => api.get('/artists'),
   getArtist: (artistId) => api.get(`/artists/${artistId}`),
   getArtistSongs: (artistId) => api.get(`/artists/${artistId}/songs`),
@@ -135,9 +138,11 @@ export const interactionAPI = {
   likeSong: (songId) => api.post(`/songs/${songId}/like`),
   unlikeSong: (songId) => api.delete(`/songs/${songId}/like`),
   getLikeStatus: (songId) => api.get(`/songs/${songId}/like/status`),
+  getLikeStatuses: (songIds) => api.get('/songs/like-status', { params: { ids: songIds.join(',') } }),
   playSong: (songId, data) => api.post(`/songs/${songId}/play`, data),
   addComment: (songId, data) => api.post(`/songs/${songId}/comments`, data),
   getComments: (songId, params) => api.get(`/songs/${songId}/comments`, { params }),
+  getReplies: (commentId, params) => api.get(`/comments/${commentId}/replies`, { params }),
   deleteComment: (commentId) => api.delete(`/comments/${commentId}`),
   likeComment: (commentId) => api.post(`/comments/${commentId}/like`),
   unlikeComment: (commentId) => api.delete(`/comments/${commentId}/like`),
@@ -6,9 +6,9 @@ import { useSelector, useDispatch } from 'react-redux';
 import { useNavigate } from 'react-router-dom';
 import { Layout, Button, Avatar, Space, Typography, Badge, Input } from 'antd';
 import { UserOutlined, LogoutOutlined, MessageOutlined, SearchOutlined } from '@ant-design/icons';
-import { logout } from '../store/authSlice';
-import { fetchUnreadCount } from '../store/messageSlice';
-import { getAvatarUrl } from '../utils/url';
+import { logout, getCurrentUser } from '../store/authSlice';
+import { fetchUnreadCount, setUnreadCount } from '../store/messageSlice';
+import { getAvatarSrc } from '../utils/url';
 import io from 'socket.io-client';
 
 const { Header } = Layout;
@@ -75,7 +75,7 @@ const MainLayout = ({ children }) => {
 
     const socket = io(socketUrl, {
       auth: { token },
-      transports: ['polling', 'websocket'], // Try polling first, then upgrade to websocket
+      transports: ['websocket', 'polling'], // Prefer websocket so any backend worker can serve the session
       reconnection: true,
       reconnectionDelay: 1000,
       reconnectionAttempts: 5
@@ -85,12 +85,20 @@ const MainLayout = ({ children }) => {
 
     socket.on('connect', () => {
       console.log('MainLayout WebSocket connected');
+      // Catch up on changes missed while disconnected
+      dispatch(fetchUnreadCount());
     });
 
-    socket.on('new_message', (message) => {
-      console.log('MainLayout received new message:', message);
-      // Refresh unread count when new message arrives
-      dispatch(fetchUnreadCount());
+    // The server pushes the unread count whenever it changes
+    socket.on('unread_count', ({ count }) => {
+      dispatch(setUnreadCount(count));
+    });
+
+    // A background avatar upload finished
+    socket.on('avatar_updated', ({ status }) => {
+      if (status === 'ready') {
+        dispatch(getCurrentUser());
+      }
     });
 
     return () => {
@@ -207,7 +215,7 @@ const MainLayout = ({ children }) => {
             <Avatar
               size="large"
               icon={<UserOutlined />}
-              src={getAvatarUrl(user?.avatar_url)}
+              src={getAvatarSrc(user, 40)}
             />
             {/* 移动端隐藏用户信息文字 */}
             <div style={{ lineHeight: '1.2' }} className="user-info-text">
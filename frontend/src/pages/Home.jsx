@@ -5,7 +5,7 @@ import { Tabs, Card, Button, Avatar, Space, Typography, List, Tag, Row, Col, Sta
 import { UserOutlined, CustomerServiceOutlined, FireOutlined, StarOutlined, PlayCircleOutlined, HeartOutlined, MessageOutlined, ShareAltOutlined, DownOutlined, UpOutlined } from '@ant-design/icons';
 import { musicAPI, feedAPI, socialAPI, messageAPI } from '../api';
 import MusicPlayer from '../components/MusicPlayer';
-import { getAvatarUrl } from '../utils/url';
+import { getAvatarSrc } from '../utils/url';
 
 const { Title, Text, Paragraph } = Typography;
 
@@ -436,7 +436,7 @@ const Home = () => {
                   <List.Item.Meta
                     avatar={
                       <Avatar
-                        src={activity.user.avatar_url}
+                        src={getAvatarSrc(activity.user, 32)}
                         icon={!activity.user.avatar_url && <UserOutlined />}
                       />
                     }
@@ -626,7 +626,7 @@ const Home = () => {
                 <List.Item.Meta
                   avatar={
                     <Avatar
-                      src={getAvatarUrl(followUser.avatar_url)}
+                      src={getAvatarSrc(followUser, 32)}
                       icon={<UserOutlined />}
                     />
                   }
@@ -38,7 +38,7 @@ import {
   addMessageToConversation,
 } from '../store/messageSlice';
 import { userAPI } from '../api';
-import { getAvatarUrl } from '../utils/url';
+import { getAvatarSrc } from '../utils/url';
 import io from 'socket.io-client';
 import MusicPlayer from '../components/MusicPlayer';
 
@@ -120,7 +120,7 @@ const Messages = () => {
 
     const socket = io(socketUrl, {
       auth: { token },
-      transports: ['polling', 'websocket'], // Try polling first, then upgrade to websocket
+      transports: ['websocket', 'polling'], // Prefer websocket so any backend worker can serve the session
       reconnection: true,
       reconnectionDelay: 1000,
       reconnectionAttempts: 5
@@ -381,7 +381,7 @@ const Messages = () => {
             <Avatar
               size={40}
               icon={<UserOutlined />}
-              src={getAvatarUrl(currentUser.avatar_url)}
+              src={getAvatarSrc(currentUser, 40)}
             />
             <Typography.Title level={4} style={{ margin: 0, fontSize: 'clamp(16px, 4vw, 20px)' }}>
               与 {currentUser.nickname || currentUser.username} 的对话
@@ -430,7 +430,7 @@ const Messages = () => {
                         <Avatar
                           size={48}
                           icon={<UserOutlined />}
-                          src={getAvatarUrl(conversation.user.avatar_url)}
+                          src={getAvatarSrc(conversation.user, 48)}
                         />
                       </Badge>
                     }
@@ -535,9 +535,7 @@ const Messages = () => {
                                 <Avatar
                                   size={36}
                                   icon={<UserOutlined />}
-                                  src={getAvatarUrl(
-                                    isFromMe ? user?.avatar_url : msg.sender?.avatar_url
-                                  )}
+                                  src={getAvatarSrc(isFromMe ? user : msg.sender, 36)}
                                 />
                                 <div style={{ flex: 1 }}>
                                   {renderSongCard(messageContent.data)}
@@ -581,9 +579,7 @@ const Messages = () => {
                               <Avatar
                                 size={36}
                                 icon={<UserOutlined />}
-                                src={getAvatarUrl(
-                                  isFromMe ? user?.avatar_url : msg.sender?.avatar_url
-                                )}
+                                src={getAvatarSrc(isFromMe ? user : msg.sender, 36)}
                               />
                               <div style={{ flex: 1 }}>
                                 <div
@@ -11,7 +11,7 @@ import {
 } from '@ant-design/icons';
 import { userAPI, socialAPI } from '../api';
 import { getCurrentUser } from '../store/authSlice';
-import { getAvatarUrl } from '../utils/url';
+import { getAvatarSrc } from '../utils/url';
 
 const { Content } = Layout;
 const { Title, Text } = Typography;
@@ -50,9 +50,10 @@ const Profile = () => {
   const fetchFollowStats = async () => {
     if (user) {
       try {
+        // 只取一条记录，总数来自用户表上维护的计数
         const [followersRes, followingRes] = await Promise.all([
-          socialAPI.getFollowers(user.id),
-          socialAPI.getFollowing(user.id)
+          socialAPI.getFollowers(user.id, { cursor: '', per_page: 1 }),
+          socialAPI.getFollowing(user.id, { cursor: '', per_page: 1 })
         ]);
         setFollowersCount(followersRes.data.total);
         setFollowingCount(followingRes.data.total);
@@ -119,8 +120,18 @@ const Profile = () => {
       const formData = new FormData();
       formData.append('avatar', file);
 
-      await userAPI.uploadAvatar(formData);
-      message.success('头像上传成功');
+      const res = await userAPI.uploadAvatar(formData);
+      // 202：头像在后台处理，轮询直到完成
+      let job = res.data;
+      for (let i = 0; job.status === 'pending' && i < 30; i++) {
+        await new Promise((resolve) => setTimeout(resolve, 1000));
+        job = (await userAPI.getAvatarStatus()).data;
+      }
+      if (job.status === 'failed') {
+        message.error(job.error || '头像处理失败');
+        return false;
+      }
+      message.success(job.status === 'pending' ? '头像正在处理中，稍后自动更新' : '头像上传成功');
       setAvatarModalVisible(false);
       dispatch(getCurrentUser());
     } catch (error) {
@@ -141,7 +152,7 @@ const Profile = () => {
     );
   }
 
-  const avatarUrl = getAvatarUrl(user.avatar_url);
+  const avatarUrl = getAvatarSrc(user, 120);
 
   return (
     <Layout style={{ minHeight: '100vh', background: '#f0f2f5' }}>
@@ -392,7 +403,7 @@ const Profile = () => {
                   avatar={
                     <Avatar
                       icon={<UserOutlined />}
-                      src={getAvatarUrl(item.avatar_url)}
+                      src={getAvatarSrc(item, 32)}
                     />
                   }
                   title={item.nickname || item.username}
@@ -426,7 +437,7 @@ const Profile = () => {
                   avatar={
                     <Avatar
                       icon={<UserOutlined />}
-                      src={getAvatarUrl(item.avatar_url)}
+                      src={getAvatarSrc(item, 32)}
                     />
                   }
                   title={item.nickname || item.username}
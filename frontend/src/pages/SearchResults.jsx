@@ -4,7 +4,7 @@ import { Tabs, Card, List, Avatar, Empty, Spin, Typography, Tag, Space, Divider,
 import { CustomerServiceOutlined, UserOutlined, PlayCircleOutlined, HeartOutlined, MessageOutlined, CheckOutlined, PlusOutlined, DownOutlined, RightOutlined } from '@ant-design/icons';
 import { musicAPI, userAPI } from '../api';
 import { socialAPI } from '../api';
-import { getAvatarUrl } from '../utils/url';
+import { getAvatarSrc } from '../utils/url';
 import { useNavigate } from 'react-router-dom';
 import { useSelector } from 'react-redux';
 
@@ -255,7 +255,7 @@ const SearchResults = () => {
             >
               <Avatar
                 size={48}
-                src={getAvatarUrl(userItem.avatar_url)}
+                src={getAvatarSrc(userItem, 48)}
                 icon={<UserOutlined />}
               />
               <div style={{ marginLeft: 12 }}>
@@ -386,7 +386,7 @@ const SearchResults = () => {
             >
               <Avatar
                 size={48}
-                src={getAvatarUrl(userItem.avatar_url)}
+                src={getAvatarSrc(userItem, 48)}
                 icon={<UserOutlined />}
               />
             </div>
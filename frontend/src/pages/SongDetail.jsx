@@ -11,7 +11,7 @@ import {
 } from '@ant-design/icons';
 import { musicAPI, interactionAPI } from '../api';
 import MusicPlayer from '../components/MusicPlayer';
-import { getAvatarUrl } from '../utils/url';
+import { getAvatarSrc } from '../utils/url';
 
 const { Content } = Layout;
 const { Title, Text, Paragraph } = Typography;
@@ -80,6 +80,24 @@ const SongDetail = () => {
     }
   };
 
+  const loadMoreReplies = async (comment) => {
+    try {
+      const res = await interactionAPI.getReplies(comment.id, {
+        cursor: comment.replies_next_cursor,
+        per_page: 20,
+      });
+      setComments(prev => prev.map(c => (c.id === comment.id
+        ? {
+          ...c,
+          replies: [...c.replies, ...(res.data.replies || [])],
+          replies_next_cursor: res.data.next_cursor,
+        }
+        : c)));
+    } catch (error) {
+      console.error('获取回复失败', error);
+    }
+  };
+
   const handleLike = async () => {
     if (!isAuthenticated) {
       message.warning('请先登录');
@@ -415,7 +433,7 @@ const SongDetail = () => {
                   avatar={
                     <Avatar
                       icon={<CustomerServiceOutlined />}
-                      src={getAvatarUrl(comment.user?.avatar_url)}
+                      src={getAvatarSrc(comment.user, 32)}
                       style={{ cursor: 'pointer' }}
                       onClick={() => navigate(`/user/${comment.user.id}`)}
                     />
@@ -474,7 +492,7 @@ const SongDetail = () => {
                             onClick={() => setCollapsedComments(prev => ({ ...prev, [comment.id]: !prev[comment.id] }))}
                             style={{ padding: 0 }}
                           >
-                            {comment.replies.length} 条回复
+                            {comment.reply_count ?? comment.replies.length} 条回复
                           </Button>
                         )}
                       </Space>
@@ -542,6 +560,16 @@ const SongDetail = () => {
                               </div>
                             </div>
                           ))}
+                          {comment.replies_next_cursor && (
+                            <Button
+                              type="link"
+                              size="small"
+                              onClick={() => loadMoreReplies(comment)}
+                              style={{ padding: 0, fontSize: 12 }}
+                            >
+                              查看更多回复
+                            </Button>
+                          )}
                         </div>
                       )}
                     </div>
@@ -9,7 +9,7 @@ import {
   UserOutlined, ArrowLeftOutlined, UserAddOutlined, UserDeleteOutlined, MessageOutlined
 } from '@ant-design/icons';
 import { userAPI, socialAPI } from '../api';
-import { getAvatarUrl } from '../utils/url';
+import { getAvatarSrc } from '../utils/url';
 
 const { Content } = Layout;
 const { Title, Text } = Typography;
@@ -118,7 +118,7 @@ const UserDetail = () => {
   }
 
   const isOwnProfile = currentUser && currentUser.id === parseInt(id);
-  const avatarUrl = getAvatarUrl(user.avatar_url);
+  const avatarUrl = getAvatarSrc(user, 120);
 
   return (
     <Layout style={{ minHeight: '100vh', background: '#f0f2f5' }}>
@@ -238,7 +238,7 @@ const UserDetail = () => {
                   avatar={
                     <Avatar
                       icon={<UserOutlined />}
-                      src={getAvatarUrl(item.avatar_url)}
+                      src={getAvatarSrc(item, 32)}
                     />
                   }
                   title={item.nickname || item.username}
@@ -272,7 +272,7 @@ const UserDetail = () => {
                   avatar={
                     <Avatar
                       icon={<UserOutlined />}
-                      src={getAvatarUrl(item.avatar_url)}
+                      src={getAvatarSrc(item, 32)}
                     />
                   }
                   title={item.nickname || item.username}
@@ -102,6 +102,9 @@ const messageSlice = createSlice({
     clearError: (state) => {
       state.error = null;
     },
+    setUnreadCount: (state, action) => {
+      state.unreadCount = action.payload;
+    },
   },
   extraReducers: (builder) => {
     builder
@@ -177,6 +180,7 @@ export const {
   clearMessages,
   addMessageToConversation,
   clearError,
+  setUnreadCount,
 } = messageSlice.actions;
 
 export default messageSlice.reducer;
@@ -28,6 +28,24 @@ export const getAvatarUrl = (avatarUrl) => {
   return getFullUrl(avatarUrl);
 };
 
+/**
+ * 按显示尺寸选择头像缩略图（优先 WebP，没有缩略图时退回 avatar_url）
+ * @param {object} user - 含 avatar_url / avatar_srcset 的用户对象
+ * @param {number} size - 显示尺寸（px）
+ * @returns {string} 完整的头像 URL
+ */
+export const getAvatarSrc = (user, size = 32) => {
+  if (!user) return null;
+  const srcset = user.avatar_srcset;
+  if (!srcset) return getAvatarUrl(user.avatar_url);
+
+  const renditions = srcset.webp || srcset.jpg;
+  const target = size * (window.devicePixelRatio || 1);
+  const sizes = Object.keys(renditions).map(Number).sort((a, b) => a - b);
+  const chosen = sizes.find((s) => s >= target) ?? sizes[sizes.length - 1];
+  return getFullUrl(renditions[chosen]);
+};
+
 /**
  * 获取封面图 URL
  * @param {string} coverUrl - 封面图路径